@@ -0,0 +1,107 @@
+"""
+Latency of `main.py` commands, and how often each command loads the session.
+
+Commands run in `SCENARIO` order, so that each of them finds a session it can act
+on (e.g. 'resume' runs after 'stop'). 'Cold' runs start with an empty bytecode cache
+(`PYTHONPYCACHEPREFIX`), so everything is compiled first - like the first command
+after an upgrade. 'Warm' runs reuse the cache and report the median of `WARM_RUNS`.
+"""
+
+import os
+import sys
+import time
+import runpy
+import statistics
+import subprocess
+
+from pathlib import Path
+
+import pytest
+
+import yapom.session as session
+
+MAIN_PY = Path(__file__).parent.parent / "main.py"
+WARM_RUNS = 5
+
+# (name, arguments) - in an order in which every command has something to do
+SCENARIO = [
+    ("help", ["help"]),
+    ("tomato", ["tomato"]),
+    ("status_idle", ["status"]),
+    ("start", ["start", "1h"]),
+    ("status_running", ["status"]),
+    ("stop", ["stop"]),
+    ("status_paused", ["status"]),
+    ("resume", ["resume"]),
+    ("restart", ["restart"]),
+    ("cancel", ["cancel"]),
+    ("repeat", ["repeat"]),
+    ("cancel_repeated", ["cancel"]),
+    ("report", ["report"]),
+    ("export", ["export"]),
+    ("history_check_rollups", ["history", "check-rollups"]),
+    ("session_format", ["session-format"]),
+]
+
+
+def run_scenario(pycache: Path | None) -> dict[str, float]:
+    """
+    Run every command of `SCENARIO` in a fresh interpreter and return the wall time
+    per command (in seconds).
+
+    With `pycache=None`, each command gets its own, empty bytecode cache.
+    """
+    timings = {}
+    for name, args in SCENARIO:
+        cache = pycache or Path(os.environ["YAPOM_HOME"]) / f"pycache_{name}"
+        env = {**os.environ, "PYTHONPYCACHEPREFIX": str(cache)}
+        # Warm runs need the bytecode written by earlier runs
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(MAIN_PY), *args],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def test_cli_latency(yapom_home, bench):
+    cold = run_scenario(pycache=None)
+    warm_cache = yapom_home / "pycache_warm"
+    # Fill the cache first
+    run_scenario(pycache=warm_cache)
+    warm_runs = [run_scenario(pycache=warm_cache) for _ in range(WARM_RUNS)]
+    for name, _ in SCENARIO:
+        bench(f"cli.{name}.cold", cold[name] * 1000, "ms")
+        warm = statistics.median(run[name] for run in warm_runs)
+        bench(f"cli.{name}.warm", warm * 1000, "ms")
+
+
+@pytest.fixture
+def count_loads(monkeypatch):
+    """
+    Count calls of `session.load()` (i.e. reads of the session file).
+    """
+    calls = []
+    load = session.load
+
+    def counting_load(*args, **kwargs):
+        calls.append(args)
+        return load(*args, **kwargs)
+
+    monkeypatch.setattr(session, "load", counting_load)
+    return calls
+
+
+def test_session_loads_per_command(yapom_home, count_loads, monkeypatch, bench):
+    for name, args in SCENARIO:
+        count_loads.clear()
+        monkeypatch.setattr(sys, "argv", [str(MAIN_PY), *args])
+        try:
+            runpy.run_path(str(MAIN_PY), run_name="__main__")
+        except SystemExit as ex:
+            assert not ex.code, f"{name} failed: {ex.code}"
+        bench(f"cli.{name}.session_loads", len(count_loads), "calls")
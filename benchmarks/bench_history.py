@@ -0,0 +1,108 @@
+"""
+History throughput: archiving and importing sessions, and reports / stats / exports
+on synthetic histories (see `synthetic_history` in conftest.py).
+"""
+
+import time
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import yapom.stats as stats
+import yapom.report as report
+import yapom.export as export
+import yapom.history as history
+import yapom.importer as importer
+
+from yapom.utils import DATETIME_FORMAT
+from yapom.tests.helpers import NullWriter
+
+ARCHIVE_ROWS = 5_000
+IMPORT_ROWS = 100_000
+# Lower bound for import throughput (rows per second)
+MIN_IMPORT_THROUGHPUT = 20_000
+# Reports are timed as the best of several runs, to keep scheduler noise out
+REPORT_RUNS = 5
+# Reports have to stay interactive on large histories
+REPORT_BUDGET_SECONDS = 0.05
+# Lower bound for export throughput (rows per second)
+MIN_EXPORT_THROUGHPUT = 50_000
+
+
+def best_of(runs: int, function, *args) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def test_archive_throughput(yapom_home, bench):
+    history.ensure_schema()
+    first = datetime(2025, 1, 1)
+    sessions = [
+        {
+            "start": (first + timedelta(minutes=30 * i)).strftime(DATETIME_FORMAT),
+            "end": (first + timedelta(minutes=30 * i + 25)).strftime(DATETIME_FORMAT),
+            "runtime": 1500,
+            "status": "finished",
+        }
+        for i in range(ARCHIVE_ROWS)
+    ]
+    start = time.perf_counter()
+    for session_data in sessions:
+        history.archive_pomodoro_session(session_data)
+    elapsed = time.perf_counter() - start
+    bench("history.archive", ARCHIVE_ROWS / elapsed, "rows/s")
+
+
+def test_import_throughput(yapom_home, bench):
+    history_file = yapom_home / "history"
+    with history_file.open("w") as fp:
+        for i in range(IMPORT_ROWS):
+            fp.write(f"{datetime.fromtimestamp(i * 1800).isoformat()} duration=25\n")
+    start = time.perf_counter()
+    inserted, _ = importer.import_file(history_file)
+    elapsed = time.perf_counter() - start
+    assert inserted == IMPORT_ROWS
+    bench("history.import", IMPORT_ROWS / elapsed, "rows/s")
+    assert IMPORT_ROWS / elapsed > MIN_IMPORT_THROUGHPUT
+
+
+@pytest.mark.parametrize(
+    "name, args",
+    [
+        ("day", ["--day"]),
+        ("month", ["--month"]),
+        ("range_partial", ["--range", "2016-03-01..2016-09-30"]),
+        ("all", ["--range", ".."]),
+    ],
+)
+def test_report(synthetic_history, name, args, bench):
+    _, rows = synthetic_history
+    label, since, until = report.parse_period(args)
+    elapsed = best_of(REPORT_RUNS, report.report, label, since, until)
+    bench(f"report.{name}.{rows}", elapsed * 1000, "ms")
+    assert elapsed < REPORT_BUDGET_SECONDS
+
+
+def test_stats(synthetic_history, bench):
+    _, rows = synthetic_history
+    # The first run builds the columnar cache
+    start = time.perf_counter()
+    stats.stats()
+    bench(f"stats.cold.{rows}", (time.perf_counter() - start) * 1000, "ms")
+    elapsed = best_of(REPORT_RUNS, stats.stats)
+    bench(f"stats.warm.{rows}", elapsed * 1000, "ms")
+
+
+@pytest.mark.parametrize("format", export.FORMATS)
+def test_export(synthetic_history, format, bench):
+    _, rows = synthetic_history
+    start = time.perf_counter()
+    export.export(NullWriter(), format)
+    elapsed = time.perf_counter() - start
+    bench(f"export.{format}.{rows}", rows / elapsed, "rows/s")
+    assert rows / elapsed > MIN_EXPORT_THROUGHPUT
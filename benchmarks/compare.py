@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files (see conftest.py), e.g. from two commits:
+
+    python benchmarks/compare.py old.json new.json [--threshold 10]
+
+Prints the relative change of every result and exits with status 1 if any result
+got worse by more than the threshold (in percent).
+"""
+
+import sys
+import json
+import argparse
+
+# Units where more is better - for everything else (times, calls) less is better
+HIGHER_IS_BETTER = {"rows/s"}
+DEFAULT_THRESHOLD = 10.0
+
+
+def load(path: str) -> dict:
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def compare(old: dict, new: dict, threshold: float) -> tuple[list[str], int]:
+    """
+    Returns the report lines and the number of regressions.
+    """
+    lines = [f"{old.get('commit') or '?'} -> {new.get('commit') or '?'}"]
+    regressions = 0
+    for name, result in new["results"].items():
+        value, unit = result["value"], result["unit"]
+        if (previous := old["results"].get(name)) is None:
+            lines.append(f"  {name:<40} {value:>12.2f} {unit:<6} (new)")
+            continue
+        before = previous["value"]
+        change = (value - before) / before * 100 if before else 0.0
+        worse = -change if unit in HIGHER_IS_BETTER else change
+        marker = ""
+        if worse > threshold:
+            marker = "  REGRESSION"
+            regressions += 1
+        lines.append(
+            f"  {name:<40} {before:>12.2f} -> {value:>12.2f} {unit:<6} ({change:+.1f}%){marker}"
+        )
+    return lines, regressions
+
+
+def main(args: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    options = parser.parse_args(args)
+    lines, regressions = compare(
+        load(options.old), load(options.new), options.threshold
+    )
+    print("\n".join(lines))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
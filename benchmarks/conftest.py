@@ -0,0 +1,95 @@
+"""
+Fixtures for the benchmarks: an isolated yapom HOME, synthetic histories and the
+`bench` recorder, which collects results and writes them to a JSON file at the end
+of the run (see `benchmarks/compare.py`).
+"""
+
+import sys
+import json
+import platform
+import subprocess
+
+from pathlib import Path
+from datetime import datetime
+
+import pytest
+
+import yapom.utils as utils
+import yapom.history as history
+
+from yapom.tests.helpers import fill_history
+
+# The same isolated HOME as in the test suite
+from yapom.tests.conftest import yapom_home  # noqa: F401
+
+ROOT = Path(__file__).parent.parent
+DEFAULT_OUTPUT = Path(__file__).parent / "results.json"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-output",
+        default=str(DEFAULT_OUTPUT),
+        help=f"JSON file for benchmark results (default: {DEFAULT_OUTPUT})",
+    )
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+class Recorder:
+    def __init__(self):
+        self.results = {}
+
+    def __call__(self, name: str, value: float, unit: str):
+        self.results[name] = {"value": round(value, 6), "unit": unit}
+
+    def to_dict(self) -> dict:
+        return {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": dict(sorted(self.results.items())),
+        }
+
+
+@pytest.fixture(scope="session")
+def bench(request):
+    """
+    Record a benchmark result: `bench(name, value, unit)`.
+    """
+    recorder = Recorder()
+    yield recorder
+    if recorder.results:
+        output = Path(request.config.getoption("--bench-output"))
+        output.write_text(json.dumps(recorder.to_dict(), indent=2) + "\n")
+        print(f"\nBenchmark results written to {output}", file=sys.stderr)
+
+
+@pytest.fixture(scope="module", params=[10_000, 1_000_000], ids=["10k", "1M"])
+def synthetic_history(request, tmp_path_factory):
+    """
+    A HOME directory with a synthetic history of 10k and 1M sessions respectively.
+
+    Yields (home, number of sessions).
+    """
+    rows = request.param
+    home = tmp_path_factory.mktemp(f"history_{rows}")
+    fill_history(home, rows)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(utils, "HOME_DIR", str(home))
+        monkeypatch.setenv("YAPOM_HOME", str(home))
+        yield home, rows
+        history.close_db_connection()
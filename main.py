@@ -2,11 +2,8 @@
 
 import sys
 
-import yapom.pomodoro as pomodoro
-import yapom.utils as utils
 
-
-HELP = """Usage: yapom [COMMAND]
+HELP = """Usage: yapom [--trace] [COMMAND]
 
 Manage Pomodoro sessions from the comforts of the command line.
 
@@ -21,7 +18,52 @@ Commands:
   reset            Reset the current session (same as 'restart')
   restart          Restart the current session (same as 'reset')
   repeat           Repeat the last session (i.e. new session, same runtime)
+  --name NAME      (with start, status, stop / pause, resume, cancel, reset / restart)
+                   Use the named timer NAME instead of the current session - named
+                   timers run in parallel, fired by a single scheduler process
+  --all            (with status, stop / pause, resume, cancel, reset / restart)
+                   Apply to the current session and all named timers
+  --tag TAG        (with start and plan, can be repeated)
+                   Label the session, e.g. with the project it's for
+  plan [PLAN]      Run a whole Pomodoro cycle as one session: PLAN is
+                   [N]x<WORK>[/<SHORT BREAK>[/<LONG BREAK>]] (default: 4x25m/5m/15m);
+                   pause / resume / cancel / reset apply to the whole plan
+  watch [--format FORMAT]
+                   Print a live countdown (one line per second) for status bars;
+                   FORMAT fields: {status} {remaining} {elapsed} {runtime} {clock}
+                   {start} {tomato} (default: "{tomato} {status} {remaining}")
+  report [PERIOD]  Show statistics for archived sessions, where PERIOD is one of
+                   --day (default), --week, --month or --range YYYY-MM-DD..YYYY-MM-DD
+                   (includes how late timers went off: p50 / p90 / p99 / max);
+                   --by-tag breaks the time down by tag, --tag TAG only counts
+                   sessions with that tag
+  stats            Show streaks, a heatmap of the last year and runtimes per weekday
+                   for finished sessions
+  export [OPTIONS]  Export the session history to stdout (or --output FILE)
+                   --format csv|jsonl, --since DATE, --until DATE (YYYY-MM-DD)
+  import FILE      Import sessions from a CSV export or an open-pomodoro history file
+                   (--format csv|openpomodoro, detected automatically by default)
+  history rebuild-rollups
+                   Rebuild the daily statistics (rollups) from the session history
+  history check-rollups
+                   Check the daily statistics (rollups) against the session history
+  history compact --older-than AGE
+                   Move sessions older than AGE (e.g. 30d, 8w or 1y) into one
+                   database per year in ~/.yapom/archive/ (still used by reports,
+                   exports and stats)
+  history merge DATABASE...
+                   Copy the sessions of other history databases (e.g. from other
+                   machines) that aren't in the session history yet
+  trace [summary|clear]
+                   Summarize (or delete) the timings recorded with --trace (or the
+                   YAPOM_TRACE environment variable) in ~/.yapom/trace.jsonl
   tomato           Print tomato emoji
+  daemon [start|stop|run]
+                   Start or stop yapomd, which runs all timers in a single background
+                   process ('run' keeps it in the foreground)
+  session-format [binary|json]
+                   Switch the session file to a binary record (faster for frequent
+                   'status' polling) or back to JSON; prints the current format
                                                           
 Time format: [HOURS]h[MINUTES]m[SECONDS]s
   * At least one must be specified
@@ -35,17 +77,165 @@ Examples:
 """
 
 
+DEFAULT_PLAN = "4x25m/5m/15m"
+
+
+def session_format() -> str:
+    import yapom.utils as utils
+    import yapom.record as record
+
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    match target, record.exists():
+        case None, is_binary:
+            return utils.pomtext(f"Session format: {'binary' if is_binary else 'json'}")
+        case "binary", False:
+            return utils.pomtext(
+                f"Session migrated to binary record: {record.migrate()}"
+            )
+        case "json", True:
+            return utils.pomtext(f"Session exported to JSON: {record.export()}")
+        case "binary" | "json", _:
+            return utils.pomtext(f"Session format is already '{target}'.")
+    sys.exit(f"Unknown session format: '{target}'")
+
+
+def daemon_command() -> str:
+    import yapom.utils as utils
+    import yapom.daemon as daemon
+
+    match sys.argv[2] if len(sys.argv) > 2 else "start":
+        case "start":
+            return daemon.start()
+        case "stop":
+            return daemon.stop()
+        case "run":
+            daemon.run()
+            return utils.pomtext("yapomd stopped.")
+        case action:
+            sys.exit(f"Unknown daemon command: '{action}'")
+
+
+def history_command() -> str:
+    import yapom.utils as utils
+    import yapom.history as history
+
+    history.ensure_schema()
+    match sys.argv[2] if len(sys.argv) > 2 else None:
+        case "rebuild-rollups":
+            rows = history.rebuild_rollups()
+            return utils.pomtext(f"Daily rollups rebuilt ({rows} rows).")
+        case "check-rollups":
+            if not (mismatches := history.check_rollups()):
+                return utils.pomtext("Daily rollups are consistent.")
+            lines = [utils.pomtext(f"{len(mismatches)} inconsistent daily rollups:")]
+            for day, status, raw, rollup in mismatches:
+                status_str = status.value if status else "-"
+                lines.append(
+                    f"  {day} {status_str:<10} sessions (count, time) {raw} != rollup {rollup}"
+                )
+            lines.append("Run 'yapom history rebuild-rollups' to fix them.")
+            sys.exit("\n".join(lines))
+        case "compact":
+            from datetime import datetime
+
+            try:
+                if not (age := utils.get_option(sys.argv[3:], "--older-than")):
+                    raise ValueError("Usage: yapom history compact --older-than AGE")
+                before = datetime.now() - utils.parse_age(age)
+            except ValueError as ex:
+                sys.exit(utils.pomtext(str(ex)))
+            if not (moved := history.compact(before)):
+                return utils.pomtext(f"No sessions older than {age}.")
+            lines = [
+                utils.pomtext(f"Moved {sum(moved.values())} sessions to the archive:")
+            ]
+            for year, count in moved.items():
+                lines.append(
+                    f"  {history.get_archive_dirpath() / f'{year}.db'}: {count}"
+                )
+            return "\n".join(lines)
+        case "merge":
+            if not (paths := sys.argv[3:]):
+                sys.exit(utils.pomtext("Usage: yapom history merge DATABASE..."))
+            import sqlite3
+
+            lines = []
+            for path in paths:
+                try:
+                    merged = history.merge(path)
+                except (OSError, ValueError, sqlite3.DatabaseError) as ex:
+                    sys.exit(utils.pomtext(f"Failed to merge {path}: {ex}"))
+                lines.append(utils.pomtext(f"Merged {merged} new sessions from {path}"))
+            return "\n".join(lines)
+        case action:
+            sys.exit(f"Unknown history command: '{action}'")
+
+
 def main():
+    if sys.argv[1] == "--trace":
+        import yapom.trace as trace
+
+        # Before any other yapom import: instrumented functions are only wrapped if
+        # tracing is enabled when they're defined (see `yapom.trace`)
+        trace.enable()
+        del sys.argv[1]
     command = sys.argv[1]
 
+    # Status bars call 'yapom status' every second or so, so every command only
+    # imports what it needs (see yapom/tests/test_startup.py for the budget).
+    if command == "help":
+        print(HELP)
+        return
+
+    import yapom.trace as trace
+
+    trace.process = f"yapom {command}"
+    with trace.span("import yapom.utils"):
+        import yapom.utils as utils
+
+    if command in {"tomato", "pomodoro"}:
+        print(utils.TOMATO)
+        return
+
+    tags = ()
+    try:
+        name = utils.pop_option(sys.argv, "--name")
+        if command in {"start", "plan"}:
+            tags = tuple(tag.strip() for tag in utils.pop_options(sys.argv, "--tag"))
+            if not all(tags):
+                raise ValueError("Tags must not be empty.")
+    except ValueError as ex:
+        sys.exit(utils.pomtext(str(ex)))
+    if name or utils.pop_flag(sys.argv, "--all"):
+        import yapom.timers as timers
+
+        print(timers.main(command, name, every=name is None, tags=tags))
+        return
+
+    with trace.span("import yapom.client"):
+        import yapom.client as client
+
+    if command in client.COMMANDS:
+        # Let yapomd handle the command if it's running
+        runtime = utils.determine_runtime() if command == "start" else None
+        try:
+            if (
+                output := client.request(command, runtime=runtime, tags=tags)
+            ) is not None:
+                print(output)
+                return
+        except client.DaemonError as ex:
+            sys.exit(utils.pomtext(str(ex)))
+
+    with trace.span("import yapom.pomodoro"):
+        import yapom.pomodoro as pomodoro
+
     match command:
-        case "help":
-            print(HELP)
         case "status":
             print(pomodoro.status())
         case "start":
             runtime = utils.determine_runtime()
-            print(pomodoro.start(runtime))
+            print(pomodoro.start(runtime, tags=tags))
         case "stop" | "pause":
             print(pomodoro.stop())
         case "resume":
@@ -56,11 +246,37 @@ def main():
             print(pomodoro.reset())
         case "repeat":
             print(pomodoro.repeat())
+        case "plan":
+            spec = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PLAN
+            print(pomodoro.start_plan(spec, tags=tags))
         case "report":
-            # TODO
-            print(utils.pomtext("This feature hasn't been implemented yet!"))
-        case "tomato" | "pomodoro":
-            print(utils.TOMATO)
+            import yapom.report as report
+
+            print(report.main(sys.argv[2:]))
+        case "stats":
+            import yapom.stats as stats
+
+            print(stats.main(sys.argv[2:]))
+        case "export":
+            import yapom.export as export
+
+            export.main(sys.argv[2:])
+        case "import":
+            import yapom.importer as importer
+
+            print(importer.main(sys.argv[2:]))
+        case "watch":
+            import yapom.watch as watch
+
+            watch.main(sys.argv[2:])
+        case "history":
+            print(history_command())
+        case "trace":
+            print(trace.main(sys.argv[2:]))
+        case "daemon":
+            print(daemon_command())
+        case "session-format":
+            print(session_format())
         case _:
             sys.exit(f"Unknown command: '{command}'")
 
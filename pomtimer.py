@@ -1,24 +1,51 @@
 import sys
 
-import yapom.utils as utils
-import yapom.pomodoro as pomodoro
+import yapom.trace as trace
+import yapom.supervisor as supervisor
 
-from os import getpid
-from time import sleep
-from datetime import datetime
+# Queue pause / resume / restart signals right away (see `yapom.supervisor`)
+supervisor.block_signals()
+
+# This process sleeps for the whole session - everything else (history, session
+# files, notifications) is only imported once the timer goes off.
+
+
+def fire(latency: float):
+    """
+    Finish the current session and notify the user.
+    """
+    with trace.span("import yapom.pomodoro"):
+        import yapom.notify as notify
+        import yapom.pomodoro as pomodoro
+
+    from os import getpid
+    from datetime import datetime
+
+    try:
+        pomodoro.finish(end_time=datetime.now(), latency=latency)
+    except ValueError:
+        sys.exit(f"No such PID in pomodoro sessions file: {getpid()}")
+
+    # Notifications are delivered asynchronously, so the timer can exit right away
+    with trace.span("pomtimer.notify"):
+        notify.session_finished()
 
 
 if __name__ == "__main__":
-    pid = getpid()
     try:
         runtime = int(sys.argv[1])
-        sleep(runtime)
+        requested_at = float(sys.argv[2]) if len(sys.argv) > 2 else None
+        if "--plan" in sys.argv[3:]:
+            import yapom.cycle as cycle
+
+            with trace.span("pomtimer.plan", runtime=runtime):
+                latency = cycle.run(runtime, requested_at=requested_at)
+        else:
+            with trace.span("pomtimer.countdown", runtime=runtime):
+                latency = supervisor.countdown(runtime, requested_at=requested_at)
     except Exception as ex:
-        error_message = pomodoro.pomtext(f"Pomodoro session failed: {ex} (pid={pid})")
-        sys.exit(error_message)
-    try:
-        pomodoro.finish(end_time=datetime.now())
-    except ValueError:
-        sys.exit(f"No such PID in pomodoro sessions file: {pid}")
+        from os import getpid
+        from yapom.utils import pomtext
 
-    utils.notify_session_finished()
+        sys.exit(pomtext(f"Pomodoro session failed: {ex} (pid={getpid()})"))
+    fire(latency)
@@ -0,0 +1,75 @@
+"""
+Thin client for `yapomd` (see `yapom.daemon`).
+
+This module is imported on every CLI call, so it must stay cheap: `socket` is only
+imported if there's a daemon socket to talk to.
+"""
+
+import json
+
+import yapom.utils as utils
+
+from pathlib import Path
+
+SOCKET_FILE = "yapomd.sock"
+TIMEOUT = 5.0
+
+# Commands that are forwarded to yapomd if it's running
+COMMANDS = {
+    "status",
+    "start",
+    "stop",
+    "pause",
+    "resume",
+    "cancel",
+    "reset",
+    "restart",
+    "repeat",
+}
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+def get_socket_path() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / SOCKET_FILE
+
+
+def send(request: dict, timeout: float = TIMEOUT) -> dict | None:
+    """
+    Send a request to yapomd and return its response.
+
+    Returns `None` if yapomd isn't running.
+    """
+    if not (socket_path := get_socket_path()).exists():
+        return None
+    import socket
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as response:
+                line = response.readline()
+    except (ConnectionRefusedError, FileNotFoundError):
+        # Stale socket file - yapomd isn't running (anymore)
+        return None
+    if not line:
+        raise DaemonError("yapomd closed the connection without a response.")
+    return json.loads(line)
+
+
+def request(command: str, **arguments) -> str | None:
+    """
+    Run a command in yapomd and return its output.
+
+    Returns `None` if yapomd isn't running, so that callers can fall back to running
+    the command themselves.
+    """
+    if (response := send({"command": command, **arguments})) is None:
+        return None
+    if error := response.get("error"):
+        raise DaemonError(error)
+    return response["output"]
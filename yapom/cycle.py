@@ -0,0 +1,235 @@
+"""
+Cycle plans: work phases and breaks (e.g. `yapom plan 4x25m/5m/15m`) that run as a
+single session, walked through by a single timer process.
+
+The session (see `yapom.session`) covers the whole plan - its runtime is the sum of
+all phases - so pause, resume and cancel apply to the plan as a whole. The plan
+itself (its phases and when each of them began) is kept in `~/.yapom/.plan` while it
+runs. It's written once by `yapom plan` and then once per phase by the timer process,
+and removed when the plan ends - the session keeps the plan's spec, so that it can
+be repeated.
+"""
+
+import os
+import json
+
+import yapom.utils as utils
+
+from pathlib import Path
+from datetime import datetime
+
+from yapom.utils import Status, WORK, DATETIME_FORMAT
+
+PLAN_FILE = ".plan"
+# Number of upcoming phases shown by `yapom status`
+UPCOMING_PHASES = 3
+
+
+class Plan:
+    """
+    The phases of a cycle plan and its progress.
+
+    `start` is the (epoch) start time of the session that runs the plan, `started`
+    holds the (epoch) start time of every phase that has begun so far.
+    """
+
+    __slots__ = ("start", "spec", "phases", "started")
+
+    def __init__(
+        self,
+        start: int,
+        spec: str,
+        phases: list[tuple[str, int]],
+        started: list[float] | None = None,
+    ):
+        self.start = start
+        self.spec = spec
+        self.phases = phases
+        self.started = started or []
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Plan":
+        return cls(
+            start=data["start"],
+            spec=data["spec"],
+            phases=[(kind, runtime) for kind, runtime in data["phases"]],
+            started=data.get("started"),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "start": self.start,
+            "spec": self.spec,
+            "phases": self.phases,
+            "started": self.started,
+        }
+
+    def belongs_to(self, state) -> bool:
+        return bool(state.start) and int(state.start.timestamp()) == self.start
+
+    def total_runtime(self) -> int:
+        return sum(runtime for _, runtime in self.phases)
+
+    def current(self) -> int:
+        return max(len(self.started) - 1, 0)
+
+    def locate(self, elapsed: int | float) -> tuple[int, int | float]:
+        """
+        Return the phase that's running `elapsed` seconds into the plan, and how far
+        into that phase (in seconds) it is.
+        """
+        for index, (_, runtime) in enumerate(self.phases):
+            if elapsed < runtime:
+                return index, max(elapsed, 0)
+            elapsed -= runtime
+        return len(self.phases) - 1, self.phases[-1][1]
+
+    def paused_in(self, index: int) -> int:
+        """
+        Return how long (in seconds) the plan was paused during phase `index`, which
+        has to be over - i.e. by how much the phase overran its runtime.
+        """
+        _, runtime = self.phases[index]
+        return max(round(self.started[index + 1] - self.started[index] - runtime), 0)
+
+    def paused_before(self, index: int) -> int:
+        return sum(self.paused_in(before) for before in range(index))
+
+
+def get_filepath() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / PLAN_FILE
+
+
+def load() -> Plan | None:
+    try:
+        with get_filepath().open("r") as fp:
+            return Plan.from_dict(json.load(fp))
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return None
+
+
+def load_for(state) -> Plan | None:
+    """
+    Return the plan that's run by the session `state` - if it is a plan.
+    """
+    if not state or (plan := load()) is None:
+        return None
+    return plan if plan.belongs_to(state) else None
+
+
+def save(plan: Plan) -> Plan:
+    # The timer process updates the plan while `yapom status` may be reading it
+    path = get_filepath()
+    tmp_path = path.with_name(f"{PLAN_FILE}.{os.getpid()}.tmp")
+    with tmp_path.open("w") as fp:
+        json.dump(plan.to_dict(), fp)
+    os.replace(tmp_path, path)
+    return plan
+
+
+def remove():
+    get_filepath().unlink(missing_ok=True)
+
+
+def describe(plan: Plan, state, now: datetime | None = None) -> str:
+    """
+    Describe the current phase of `plan` and what comes next (for `yapom status`).
+    """
+    index = plan.current()
+    kind, runtime = plan.phases[index]
+    phase_start = plan.started[index] if plan.started else plan.start
+    time_ref = state.stop or now or datetime.now()
+    # Pauses of earlier phases are part of their (wall clock) durations already
+    paused = max(state.paused - plan.paused_before(index), 0)
+    elapsed = int(time_ref.timestamp() - phase_start) - paused
+    remaining = max(runtime - elapsed, 0)
+    line = f"  phase {index + 1}/{len(plan.phases)}: {kind} ({utils.format_runtime(remaining) or '0s'} left)"
+    upcoming = plan.phases[index + 1 :]
+    if not upcoming:
+        return line
+    next_phases = ", ".join(
+        f"{kind} {utils.format_runtime(runtime)}"
+        for kind, runtime in upcoming[:UPCOMING_PHASES]
+    )
+    if len(upcoming) > UPCOMING_PHASES:
+        next_phases += f" (+{len(upcoming) - UPCOMING_PHASES} more)"
+    return f"{line} | next: {next_phases}"
+
+
+def history_rows(
+    plan: Plan,
+    end_time: datetime,
+    with_status: Status,
+    latency_ms: int | None = None,
+    paused: int = 0,
+) -> list[dict]:
+    """
+    Return the work phases of `plan` that have begun, as sessions for the history
+    (see `history.archive_pomodoro_sessions()`). Breaks aren't archived.
+
+    All phases before the current one are finished; the current one ends at
+    `end_time` with status `with_status`. `paused` is the time the whole plan has
+    been paused for (see `SessionState.paused`) - each phase gets its share.
+    """
+    rows = []
+    last = len(plan.started) - 1
+    for index, started_at in enumerate(plan.started):
+        kind, runtime = plan.phases[index]
+        if kind != WORK:
+            continue
+        if index < last:
+            end, status = (
+                datetime.fromtimestamp(plan.started[index + 1]),
+                Status.FINISHED,
+            )
+            phase_paused = plan.paused_in(index)
+        else:
+            end, status = end_time, with_status
+            phase_paused = max(paused - plan.paused_before(index), 0)
+        rows.append(
+            {
+                "start": datetime.fromtimestamp(started_at).strftime(DATETIME_FORMAT),
+                "end": end.strftime(DATETIME_FORMAT),
+                "runtime": runtime,
+                "status": status.value,
+                "latency_ms": latency_ms if index == last else None,
+                "paused": phase_paused,
+            }
+        )
+    return rows
+
+
+def run(remaining: int, requested_at: float | None = None) -> float:
+    """
+    Walk through the phases of the current plan - starting `remaining` seconds before
+    its end - and notify the user at the end of every phase but the last.
+
+    This is the timer process's side of a plan (see `pomtimer.py`). Returns the
+    firing latency of the last phase.
+    """
+    import time
+
+    import yapom.supervisor as supervisor
+
+    if (plan := load()) is None:
+        raise ValueError(f"No plan found in {get_filepath()}")
+    first, offset = plan.locate(plan.total_runtime() - remaining)
+    latency = 0.0
+    for index in range(first, len(plan.phases)):
+        kind, runtime = plan.phases[index]
+        if len(plan.started) <= index:
+            plan.started.extend([time.time()] * (index + 1 - len(plan.started)))
+            save(plan)
+        # Lateness of the previous phase is made up for in this one
+        latency = supervisor.countdown(
+            runtime - offset - latency, requested_at=requested_at
+        )
+        requested_at, offset = None, 0
+        if index + 1 < len(plan.phases):
+            import yapom.notify as notify
+
+            next_kind, next_runtime = plan.phases[index + 1]
+            notify.notify(
+                f"{kind.capitalize()} finished - next: {next_kind} ({utils.format_runtime(next_runtime)})"
+            )
+    return latency
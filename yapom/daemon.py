@@ -0,0 +1,244 @@
+"""
+yapomd - a long-lived process that owns Pomodoro timers.
+
+Without yapomd, every `start` and `resume` spawns a new `pomtimer.py` interpreter
+that just sleeps until the session is over. yapomd instead schedules timers in its
+own asyncio event loop and serves CLI commands over a Unix domain socket
+(see `yapom.client`), so there's one resident process no matter how many sessions
+get started.
+
+yapomd is opt-in (`yapom daemon start`); without it, the CLI falls back to spawning
+timer processes.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import contextlib
+
+import yapom.utils as utils
+import yapom.trace as trace
+import yapom.client as client
+import yapom.notify as notify
+import yapom.session as session
+import yapom.pomodoro as pomodoro
+
+from pathlib import Path
+from datetime import datetime
+
+from yapom.utils import pomtext
+
+LOG_FILE = "yapomd.log"
+STARTUP_POLLS = 50
+STARTUP_POLL_INTERVAL = 0.1
+
+
+class Timers:
+    """
+    Timer backend for `session.start_timer()` and `session.kill_current()` that
+    schedules timers in yapomd's event loop.
+
+    Timers owned by yapomd are recorded with yapomd's own PID in the session file.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.handle: asyncio.TimerHandle | None = None
+        # Time left on a paused timer
+        self.remaining: float | None = None
+
+    def start(self, runtime: int | float) -> tuple[int, datetime]:
+        self.cancel()
+        self.handle = self.loop.call_later(max(runtime, 0), self.fire)
+        return os.getpid(), datetime.now()
+
+    def cancel(self):
+        self.remaining = None
+        if self.handle:
+            self.handle.cancel()
+            self.handle = None
+
+    def pause(self) -> bool:
+        if not self.handle:
+            return False
+        remaining = self.handle.when() - self.loop.time()
+        self.cancel()
+        self.remaining = remaining
+        return True
+
+    def resume(self) -> bool:
+        if self.remaining is None:
+            return False
+        self.start(self.remaining)
+        return True
+
+    def owns(self, state: session.SessionState) -> bool:
+        return state.is_running() and state.pid == os.getpid()
+
+    def fire(self):
+        assert self.handle is not None
+        latency = self.loop.time() - self.handle.when()
+        self.handle = None
+        state = session.load()
+        if not self.owns(state):
+            # The session was changed behind yapomd's back (e.g. by a CLI call that
+            # didn't go through yapomd) - it's not our timer anymore.
+            return
+        pomodoro.finish(end_time=datetime.now(), state=state, latency=latency)
+        # Doesn't block - message boxes are shown by separate processes
+        notify.session_finished()
+
+    def adopt(self):
+        """
+        Take over a running session whose timer process is gone (e.g. because a
+        previous yapomd instance was killed).
+        """
+        state = session.load()
+        if not state.is_running() or (state.pid and is_alive(state.pid)):
+            return
+        _, remaining = session.get_runtimes(state)
+        state.pid, _ = self.start(remaining)
+        session.save(state, event="adopt")
+
+    def hand_over(self):
+        """
+        Hand a running session over to a `pomtimer.py` process (i.e. the default
+        timer model) before yapomd shuts down.
+        """
+        state = session.load()
+        self.cancel()
+        session.timer_backend = None
+        if state.pid != os.getpid() or not state.is_running():
+            return
+        _, remaining = session.get_runtimes(state)
+        state.pid, _ = session.start_timer(remaining)
+        session.save(state, event="hand-over")
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def execute(request: dict) -> dict:
+    """
+    Run a CLI command and return its output (or error) as a response.
+    """
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            match request.get("command"):
+                case "status":
+                    result = pomodoro.status()
+                case "start":
+                    result = pomodoro.start(
+                        int(request["runtime"]), tags=tuple(request.get("tags") or ())
+                    )
+                case "stop" | "pause":
+                    result = pomodoro.stop()
+                case "resume":
+                    result = pomodoro.resume()
+                case "cancel":
+                    result = pomodoro.cancel()
+                case "reset" | "restart":
+                    result = pomodoro.reset()
+                case "repeat":
+                    result = pomodoro.repeat()
+                case command:
+                    return {"error": f"Unknown command: '{command}'"}
+    except SystemExit as ex:
+        return {"error": str(ex.code)}
+    except Exception as ex:
+        return {"error": f"yapomd failed to run '{request.get('command')}': {ex}"}
+    return {"output": output.getvalue() + result}
+
+
+async def serve():
+    socket_path = client.get_socket_path()
+    if client.send({"command": "status"}) is not None:
+        sys.exit(pomtext(f"yapomd is already running ({socket_path})."))
+    socket_path.unlink(missing_ok=True)
+    utils.home_dir()
+
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+
+    def shutdown():
+        if not stopped.done():
+            stopped.set_result(None)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(await reader.readline())
+            if request.get("command") == "shutdown":
+                response = {"output": pomtext("yapomd stopped.")}
+                shutdown()
+            else:
+                with trace.span("yapomd.execute", command=request.get("command")):
+                    response = execute(request)
+                # yapomd runs for days - write traces as they happen
+                trace.flush()
+        except ValueError as ex:
+            response = {"error": f"Invalid request: {ex}"}
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+        writer.close()
+
+    timers = Timers(loop)
+    session.timer_backend = timers
+    timers.adopt()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, shutdown)
+
+    server = await asyncio.start_unix_server(handle, path=str(socket_path))
+    print(pomtext(f"yapomd listening on {socket_path} (pid={os.getpid()})"), flush=True)
+    async with server:
+        await stopped
+    timers.hand_over()
+    socket_path.unlink(missing_ok=True)
+
+
+def run():
+    asyncio.run(serve())
+
+
+def start() -> str:
+    """
+    Start yapomd as a detached background process.
+    """
+    import subprocess
+
+    if client.send({"command": "status"}) is not None:
+        return pomtext("yapomd is already running.")
+    yapomd_file = Path(__file__).parent / Path("../yapomd.py")
+    with (utils.home_dir() / LOG_FILE).open("a") as log:
+        process = subprocess.Popen(
+            [sys.executable, str(yapomd_file)],
+            stdout=log,
+            stderr=log,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    # Wait for yapomd to accept connections, so that the next command uses it
+    for _ in range(STARTUP_POLLS):
+        if client.send({"command": "status"}) is not None:
+            return pomtext(f"yapomd started (pid={process.pid})")
+        if process.poll() is not None:
+            break
+        time.sleep(STARTUP_POLL_INTERVAL)
+    sys.exit(pomtext(f"yapomd failed to start - see {utils.home_dir() / LOG_FILE}"))
+
+
+def stop() -> str:
+    if (output := client.request("shutdown")) is None:
+        return pomtext("yapomd isn't running.")
+    return output
@@ -0,0 +1,83 @@
+"""
+`yapom export` - stream the session history as CSV or JSON Lines.
+"""
+
+import sys
+import json
+
+import yapom.utils as utils
+import yapom.history as history
+
+from datetime import datetime, timedelta
+
+from yapom.utils import pomtext
+
+FORMATS = ("csv", "jsonl")
+
+
+def write_csv(rows, fp):
+    import csv
+
+    writer = csv.writer(fp, lineterminator="\n")
+    writer.writerow(history.EXPORT_COLUMNS)
+    writer.writerows(rows)
+
+
+def write_jsonl(rows, fp):
+    columns = history.EXPORT_COLUMNS
+    for row in rows:
+        session = dict(zip(columns, row))
+        session["tags"] = json.loads(session["tags"]) if session["tags"] else []
+        fp.write(json.dumps(session))
+        fp.write("\n")
+
+
+def export(
+    fp,
+    export_format: str = "csv",
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> None:
+    """
+    Write the sessions that started in [`since`, `until`) to `fp`.
+    """
+    history.ensure_schema()
+    rows = history.iter_sessions(since=since, until=until)
+    match export_format:
+        case "csv":
+            write_csv(rows, fp)
+        case "jsonl":
+            write_jsonl(rows, fp)
+        case _:
+            raise ValueError(
+                f"Unknown export format: '{export_format}' (expected one of: {', '.join(FORMATS)})"
+            )
+
+
+def main(args: list[str]) -> None:
+    """
+    `yapom export [--format csv|jsonl] [--since DATE] [--until DATE] [--output FILE]`
+
+    `--until` is inclusive when given as a date (YYYY-MM-DD).
+    """
+    try:
+        export_format = utils.get_option(args, "--format", "csv")
+        if export_format not in FORMATS:
+            raise ValueError(f"Unknown export format: '{export_format}'")
+        since = until = None
+        if since_str := utils.get_option(args, "--since"):
+            since = utils.parse_date(since_str)
+        if until_str := utils.get_option(args, "--until"):
+            until = utils.parse_date(until_str)
+            if len(until_str) == len("YYYY-MM-DD"):
+                until += timedelta(days=1)
+        output = utils.get_option(args, "--output")
+    except ValueError as ex:
+        sys.exit(pomtext(str(ex)))
+
+    if not output:
+        export(sys.stdout, export_format, since=since, until=until)
+        return
+    with open(output, "w", newline="") as fp:
+        export(fp, export_format, since=since, until=until)
+    print(pomtext(f"Sessions exported to {output}"), file=sys.stderr)
@@ -1,9 +1,27 @@
+import os
 import sqlite3
 import yapom.utils as utils
+import yapom.trace as trace
 
 from pathlib import Path
+from datetime import datetime
+from contextlib import closing, contextmanager, nullcontext
+from collections import Counter
+
+from yapom.utils import STATUS_CODES
 
 DATABASE = "pomodoro.db"
+# Seconds to wait for a lock held by another process before giving up
+BUSY_TIMEOUT = 10.0
+# Number of prepared statements kept per connection - queries are module-level
+# constants, so that they're prepared once per process
+CACHED_STATEMENTS = 64
+
+# One connection per process (see `get_db_connection()`)
+_connection: sqlite3.Connection | None = None
+_connection_key: tuple[int, Path] | None = None
+
+STATUS_BY_CODE = {code: status for status, code in STATUS_CODES.items()}
 
 
 def get_db_path() -> Path:
@@ -14,29 +32,1187 @@ def get_db_path() -> Path:
 
 
 def get_db_connection() -> sqlite3.Connection:
-    return sqlite3.connect(get_db_path())
+    """
+    Return this process's connection to the history database.
 
+    The connection is opened once and reused afterwards. It runs in WAL mode, so that
+    readers don't block writers (and vice versa), and waits up to `BUSY_TIMEOUT` for
+    other writers - e.g. several timers finishing at the same time.
+    """
+    global _connection, _connection_key
+    db_path = Path(utils.HOME_DIR).expanduser() / DATABASE
+    # Connections must not be shared with forked child processes
+    key = (os.getpid(), db_path)
+    if _connection is not None and _connection_key == key:
+        return _connection
+    with trace.span("history.connect"):
+        conn = sqlite3.connect(
+            get_db_path(), timeout=BUSY_TIMEOUT, cached_statements=CACHED_STATEMENTS
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        # Durable as of the last checkpoint, which is plenty for session history
+        conn.execute("PRAGMA synchronous = NORMAL")
+    _connection, _connection_key = conn, key
+    return conn
 
-def create_db_table():
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        query = """CREATE TABLE IF NOT EXISTS sessions (
-        start TEXT,
-        end TEXT,
-        runtime INTEGER,
-        status TEXT)"""
-        cursor.execute(query)
+
+def close_db_connection():
+    global _connection, _connection_key
+    if (
+        _connection is not None
+        and _connection_key is not None
+        and _connection_key[0] == os.getpid()
+    ):
+        _connection.close()
+    _connection = _connection_key = None
+
+
+# --- Schema migrations ---
+#
+# The schema version is stored in `PRAGMA user_version`. Migration N (1-based) takes
+# a database from version N - 1 to version N; `migrate()` runs all migrations that
+# haven't been applied yet. New migrations are appended to `MIGRATIONS` - existing
+# ones must never change.
+
+
+def _status_case(column: str) -> str:
+    """
+    SQL expression that maps a status (string) column to its `STATUS_CODES` code.
+    """
+    cases = " ".join(
+        f"WHEN '{status.value}' THEN {code}" for status, code in STATUS_CODES.items()
+    )
+    return f"CASE {column} {cases} END"
+
+
+def _migrate_v1(conn: sqlite3.Connection):
+    """
+    Integer epoch timestamps, a rowid primary key, status codes and indexes.
+
+    Databases created before schema versioning had `sessions(start TEXT, end TEXT,
+    runtime INTEGER, status TEXT)` (and maybe additional columns), with timestamps in
+    local time - those are converted in place.
+    """
+    legacy = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions'"
+    ).fetchone()
+    if legacy:
+        conn.execute("DROP INDEX IF EXISTS sessions_start")
+        conn.execute("DROP INDEX IF EXISTS sessions_status")
+        conn.execute("ALTER TABLE sessions RENAME TO sessions_legacy")
+    conn.execute(
+        """CREATE TABLE sessions (
+        id INTEGER PRIMARY KEY,
+        start INTEGER NOT NULL,
+        end INTEGER,
+        runtime INTEGER NOT NULL,
+        status INTEGER NOT NULL)"""
+    )
+    # Reports select sessions by start time and group them by status
+    conn.execute(
+        "CREATE INDEX sessions_start ON sessions (start, status, runtime, end)"
+    )
+    conn.execute("CREATE INDEX sessions_status ON sessions (status)")
+    if legacy:
+        conn.execute(
+            f"""INSERT INTO sessions (start, end, runtime, status)
+            SELECT CAST(strftime('%s', start, 'utc') AS INTEGER),
+                   CAST(strftime('%s', NULLIF(end, ''), 'utc') AS INTEGER),
+                   runtime,
+                   {_status_case("status")}
+            FROM sessions_legacy
+            WHERE start != ''
+            ORDER BY start"""
+        )
+        conn.execute("DROP TABLE sessions_legacy")
+
+
+# Time spent in a session (see `summarize()`) - NULL (i.e. unknown) counts as 0
+_TIME_SPENT = "IFNULL(MIN({0}runtime, {0}end - {0}start - {0}paused), 0)"
+# ... as it was computed before sessions had a `paused` column (see `_migrate_v5()`)
+_TIME_SPENT_V2 = "IFNULL(MIN({0}runtime, {0}end - {0}start), 0)"
+_DAY = "date({0}start, 'unixepoch', 'localtime')"
+
+
+def _create_rollup_triggers(conn: sqlite3.Connection, time_spent: str):
+    conn.execute(
+        f"""CREATE TRIGGER sessions_rollup_insert AFTER INSERT ON sessions
+        BEGIN
+            INSERT INTO daily_rollup (day, status, count, total)
+            VALUES ({_DAY.format("NEW.")}, NEW.status, 1, {time_spent.format("NEW.")})
+            ON CONFLICT (day, status) DO UPDATE
+            SET count = count + 1, total = total + excluded.total;
+        END"""
+    )
+    _create_rollup_delete_trigger(conn, time_spent)
+
+
+def _create_rollup_delete_trigger(conn: sqlite3.Connection, time_spent: str):
+    conn.execute(
+        f"""CREATE TRIGGER sessions_rollup_delete AFTER DELETE ON sessions
+        BEGIN
+            UPDATE daily_rollup
+            SET count = count - 1, total = total - {time_spent.format("OLD.")}
+            WHERE day = {_DAY.format("OLD.")} AND status = OLD.status;
+            DELETE FROM daily_rollup WHERE count <= 0;
+        END"""
+    )
+
+
+def _migrate_v2(conn: sqlite3.Connection):
+    """
+    Daily rollups: number of sessions and time spent per (local) day and status.
+
+    The rollups are maintained by triggers, i.e. in the same transaction as the
+    insert (or delete) of a session.
+    """
+    conn.execute(
+        """CREATE TABLE daily_rollup (
+        day TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (day, status)) WITHOUT ROWID"""
+    )
+    _create_rollup_triggers(conn, _TIME_SPENT_V2)
+    conn.execute(
+        f"""INSERT INTO daily_rollup (day, status, count, total)
+        SELECT {_DAY.format("")}, status, COUNT(*), SUM({_TIME_SPENT_V2.format("")})
+        FROM sessions
+        GROUP BY 1, 2"""
+    )
+
+
+def _migrate_v3(conn: sqlite3.Connection):
+    """
+    Firing latency: how late (in milliseconds) the timer of a session went off.
+
+    NULL for sessions that didn't finish by their timer (or were archived by an older
+    yapom).
+    """
+    conn.execute("ALTER TABLE sessions ADD COLUMN latency_ms INTEGER")
+    conn.execute(
+        """CREATE INDEX sessions_latency ON sessions (start, latency_ms)
+        WHERE latency_ms IS NOT NULL"""
+    )
+
+
+def _migrate_v4(conn: sqlite3.Connection):
+    """
+    Named timers: the name of the timer a session ran in (see `yapom.timers`) - NULL
+    for the current (i.e. unnamed) session.
+    """
+    conn.execute("ALTER TABLE sessions ADD COLUMN timer TEXT")
+
+
+def _migrate_v5(conn: sqlite3.Connection):
+    """
+    Paused time: the number of seconds a session was paused for (see
+    `yapom.journal`), which doesn't count as time spent anymore - the rollup
+    triggers and the rollups are updated accordingly.
+
+    0 for sessions archived by an older yapom (which didn't keep track of it).
+    """
+    conn.execute("ALTER TABLE sessions ADD COLUMN paused INTEGER NOT NULL DEFAULT 0")
+    conn.execute("DROP TRIGGER sessions_rollup_insert")
+    conn.execute("DROP TRIGGER sessions_rollup_delete")
+    _create_rollup_triggers(conn, _TIME_SPENT)
+    conn.execute("DELETE FROM daily_rollup")
+    conn.execute(REBUILD_ROLLUPS)
+
+
+def _migrate_v6(conn: sqlite3.Connection):
+    """
+    Merge sources: the highest session id that has been merged from each other
+    history database (see `merge()`).
+    """
+    conn.execute(
+        """CREATE TABLE merge_sources (
+        source TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL) WITHOUT ROWID"""
+    )
+
+
+def _migrate_v7(conn: sqlite3.Connection):
+    """
+    Session tags (`yapom start --tag TAG`): one row per tag of a session.
+
+    The primary key serves reports on a tag (`yapom report --tag TAG`), the index on
+    `session_id` the lookup of the tags of given sessions (`yapom report --by-tag`).
+    Tags go away with their session.
+    """
+    conn.execute(
+        """CREATE TABLE session_tags (
+        session_id INTEGER NOT NULL,
+        tag TEXT NOT NULL,
+        PRIMARY KEY (tag, session_id)) WITHOUT ROWID"""
+    )
+    conn.execute("CREATE INDEX session_tags_session ON session_tags (session_id)")
+    conn.execute(
+        """CREATE TRIGGER sessions_tags_delete AFTER DELETE ON sessions
+        BEGIN
+            DELETE FROM session_tags WHERE session_id = OLD.id;
+        END"""
+    )
+
+
+def _migrate_v8(conn: sqlite3.Connection):
+    """
+    Session ids that are never reused (`AUTOINCREMENT`), so that they can serve as
+    the high-water mark of a merge (see `merge()`): otherwise, the id of the latest
+    session is given out again once that session has been deleted (e.g. moved to a
+    partition).
+
+    SQLite can't add `AUTOINCREMENT` to a table, so the table is rebuilt (keeping the
+    ids) along with its indexes and triggers.
+    """
+    conn.execute("DROP TRIGGER sessions_rollup_insert")
+    conn.execute("DROP TRIGGER sessions_rollup_delete")
+    conn.execute("DROP TRIGGER sessions_tags_delete")
+    conn.execute(
+        """CREATE TABLE sessions_v8 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        start INTEGER NOT NULL,
+        end INTEGER,
+        runtime INTEGER NOT NULL,
+        status INTEGER NOT NULL,
+        latency_ms INTEGER,
+        timer TEXT,
+        paused INTEGER NOT NULL DEFAULT 0)"""
+    )
+    conn.execute(
+        """INSERT INTO sessions_v8
+        SELECT id, start, end, runtime, status, latency_ms, timer, paused
+        FROM sessions"""
+    )
+    conn.execute("DROP TABLE sessions")
+    conn.execute("ALTER TABLE sessions_v8 RENAME TO sessions")
+    conn.execute(
+        "CREATE INDEX sessions_start ON sessions (start, status, runtime, end)"
+    )
+    conn.execute("CREATE INDEX sessions_status ON sessions (status)")
+    conn.execute(
+        """CREATE INDEX sessions_latency ON sessions (start, latency_ms)
+        WHERE latency_ms IS NOT NULL"""
+    )
+    _create_rollup_triggers(conn, _TIME_SPENT)
+    conn.execute(
+        """CREATE TRIGGER sessions_tags_delete AFTER DELETE ON sessions
+        BEGIN
+            DELETE FROM session_tags WHERE session_id = OLD.id;
+        END"""
+    )
+
+
+def _migrate_v9(conn: sqlite3.Connection):
+    """
+    Latency rollups: the firing latencies of compacted sessions (see `compact()`) as
+    a histogram per (local) day, so that reports on whole days don't need the
+    partitions for them either.
+    """
+    conn.execute(
+        """CREATE TABLE latency_rollup (
+        day TEXT NOT NULL,
+        latency_ms INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (day, latency_ms)) WITHOUT ROWID"""
+    )
+    # Partitions can't be attached within the migration's transaction - they're read
+    # by connections of their own, which attach the history database instead
+    (path,) = [
+        file for _, name, file in conn.execute("PRAGMA database_list") if name == "main"
+    ]
+    for partition in partitions().values():
+        with closing(sqlite3.connect(partition)) as cold:
+            cold.execute("ATTACH DATABASE ? AS main_db", (path,))
+            conn.executemany(
+                "INSERT INTO latency_rollup (day, latency_ms, count) VALUES (?, ?, ?)",
+                cold.execute(COMPACTED_LATENCIES).fetchall(),
+            )
+
+
+MIGRATIONS = [
+    _migrate_v1,
+    _migrate_v2,
+    _migrate_v3,
+    _migrate_v4,
+    _migrate_v5,
+    _migrate_v6,
+    _migrate_v7,
+    _migrate_v8,
+    _migrate_v9,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+REBUILD_ROLLUPS = f"""INSERT INTO daily_rollup (day, status, count, total)
+                     SELECT {_DAY.format("")}, status, COUNT(*), SUM({_TIME_SPENT.format("")})
+                     FROM sessions
+                     GROUP BY 1, 2"""
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Bring the database schema up to date and return the (new) schema version.
+
+    This is cheap if there's nothing to do: a single `PRAGMA user_version` read.
+    """
+    if get_schema_version(conn) == SCHEMA_VERSION:
+        return SCHEMA_VERSION
+    # Take the write lock first: another process might be migrating right now
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = get_schema_version(conn)
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"History database schema v{version} is newer than this yapom (v{SCHEMA_VERSION})"
+            )
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
         conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return SCHEMA_VERSION
 
 
-def archive_pomodoro_session(session_data: dict):
-    start_str = session_data["start"]
-    end_str = session_data["end"]
+@trace.traced("history.ensure_schema")
+def ensure_schema():
+    with get_db_connection() as conn:
+        migrate(conn)
+
+
+def to_epoch(value: str | datetime) -> int:
+    if isinstance(value, str):
+        value = datetime.strptime(value, utils.DATETIME_FORMAT)
+    return int(value.timestamp())
+
+
+INSERT_SESSION = """INSERT INTO sessions (start, end, runtime, status, latency_ms, timer, paused)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+
+def session_row(session_data: dict) -> tuple:
+    """
+    Convert a session (as in the session file) into a row of the sessions table.
+    """
+    start = to_epoch(session_data["start"])
+    end = to_epoch(session_data["end"]) if session_data.get("end") else None
     runtime = int(session_data["runtime"])
-    status_str = utils.Status(session_data["status"]).value
+    status_code = STATUS_CODES[utils.Status(session_data["status"])]
+    latency_ms = session_data.get("latency_ms")
+    paused = int(session_data.get("paused") or 0)
+    return (
+        start,
+        end,
+        runtime,
+        status_code,
+        latency_ms,
+        session_data.get("timer"),
+        paused,
+    )
+
+
+INSERT_TAG = "INSERT OR IGNORE INTO session_tags (session_id, tag) VALUES (?, ?)"
+
+
+def insert_session(conn: sqlite3.Connection, session_data: dict):
+    """
+    Insert a session (as in the session file) and its tags.
+    """
+    session_id = conn.execute(INSERT_SESSION, session_row(session_data)).lastrowid
+    if tags := session_data.get("tags"):
+        conn.executemany(INSERT_TAG, [(session_id, tag) for tag in tags])
+
+
+def update_stats_cache(conn: sqlite3.Connection):
+    """
+    Append newly archived sessions to the cache of `yapom stats` (if there is one).
+    """
+    import yapom.stats as stats
+
+    stats.append(conn)
+
+
+@trace.traced("history.archive_pomodoro_session")
+def archive_pomodoro_session(session_data: dict):
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        query = """INSERT INTO sessions (start, end, runtime, status)
-                   VALUES (?, ?, ?, ?)"""
-        cursor.execute(query, (start_str, end_str, runtime, status_str))
-        conn.commit()
+        insert_session(conn, session_data)
+    update_stats_cache(conn)
+
+
+@trace.traced("history.archive_pomodoro_sessions")
+def archive_pomodoro_sessions(sessions: list[dict]):
+    """
+    Archive several sessions at once (e.g. the phases of a cycle plan) - in a single
+    transaction.
+    """
+    with get_db_connection() as conn:
+        for session_data in sessions:
+            insert_session(conn, session_data)
+    update_stats_cache(conn)
+
+
+SUMMARIZE_SESSIONS = f"""SELECT status, COUNT(*), SUM({_TIME_SPENT.format("")})
+                         FROM {{sessions}}
+                         WHERE start >= ? AND start < ?
+                         GROUP BY status"""
+# Sessions with a tag are found via the primary key of `session_tags` (`{schema}` is
+# the database - see `iter_tagged()`)
+SUMMARIZE_TAG = f"""SELECT s.status, COUNT(*), SUM({_TIME_SPENT.format("s.")})
+                    FROM {{schema}}.session_tags AS t
+                    JOIN {{schema}}.sessions AS s ON s.id = t.session_id
+                    WHERE t.tag = ?3 AND s.start >= ?1 AND s.start < ?2 {{unique}}
+                    GROUP BY s.status"""
+SUMMARIZE_ROLLUPS = """SELECT status, SUM(count), SUM(total)
+                       FROM daily_rollup
+                       WHERE day >= ? AND day < ?
+                       GROUP BY status"""
+
+
+def is_midnight(value: datetime | None) -> bool:
+    return value is None or value.time() == datetime.min.time()
+
+
+@trace.traced("history.summarize")
+def summarize(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    tag: str | None = None,
+) -> dict[utils.Status, tuple[int, int]]:
+    """
+    Aggregate the sessions that started in [`since`, `until`) - and have the tag
+    `tag`, if given - by status.
+
+    Returns a mapping of `Status` to (number of sessions, time spent in seconds).
+    A session's time spent is its runtime - or less, if it was cancelled early.
+
+    Whole days are summarized from the daily rollups (a few rows per day), anything
+    else from the sessions themselves (see `iter_partitioned()`). There are no
+    rollups per tag - sessions with a tag are looked up by it (see `iter_tagged()`).
+    """
+    if tag is not None:
+        rows = iter_tagged(SUMMARIZE_TAG, since, until, (tag,))
+    elif is_midnight(since) and is_midnight(until):
+        bounds = (
+            since.strftime("%Y-%m-%d") if since else "",
+            until.strftime("%Y-%m-%d") if until else "9999",
+        )
+        with get_db_connection() as conn:
+            rows = conn.execute(SUMMARIZE_ROLLUPS, bounds).fetchall()
+    else:
+        rows = iter_partitioned(SUMMARIZE_SESSIONS, since, until)
+    summary = {}
+    for code, count, total in rows:
+        status = STATUS_BY_CODE[code]
+        previous_count, previous_total = summary.get(status, (0, 0))
+        summary[status] = (previous_count + count, previous_total + (total or 0))
+    return summary
+
+
+SUMMARIZE_BY_TAG = f"""SELECT t.tag, COUNT(*), SUM({_TIME_SPENT.format("s.")})
+                       FROM {{schema}}.sessions AS s
+                       JOIN {{schema}}.session_tags AS t ON t.session_id = s.id
+                       WHERE s.start >= ?1 AND s.start < ?2 {{unique}}
+                       GROUP BY t.tag"""
+
+
+@trace.traced("history.summarize_by_tag")
+def summarize_by_tag(
+    since: datetime | None = None, until: datetime | None = None
+) -> dict[str, tuple[int, int]]:
+    """
+    Aggregate the sessions that started in [`since`, `until`) by tag: a mapping of
+    tag to (number of sessions, time spent in seconds). Sessions with several tags
+    count for each of them, sessions without tags don't count at all.
+    """
+    summary = {}
+    for tag, count, total in iter_tagged(SUMMARIZE_BY_TAG, since, until):
+        previous_count, previous_total = summary.get(tag, (0, 0))
+        summary[tag] = (previous_count + count, previous_total + (total or 0))
+    return summary
+
+
+# A histogram rather than single values - latencies repeat a lot (they're in ms)
+LATENCY_HISTOGRAM = """SELECT latency_ms, COUNT(*)
+                       FROM {sessions}
+                       WHERE start >= ? AND start < ? AND latency_ms IS NOT NULL
+                       GROUP BY latency_ms
+                       ORDER BY latency_ms"""
+# ... of whole days: the sessions in the history database (via the `sessions_latency`
+# index) and the rollups of those that have been compacted
+LATENCY_HISTOGRAM_DAYS = """SELECT latency_ms, COUNT(*)
+                            FROM sessions
+                            WHERE start >= ? AND start < ? AND latency_ms IS NOT NULL
+                            GROUP BY latency_ms
+                            UNION ALL
+                            SELECT latency_ms, SUM(count)
+                            FROM latency_rollup
+                            WHERE day >= ? AND day < ?
+                            GROUP BY latency_ms"""
+
+
+@trace.traced("history.latencies")
+def latencies(
+    since: datetime | None = None, until: datetime | None = None
+) -> list[tuple[int, int]]:
+    """
+    Firing latencies of the sessions that started in [`since`, `until`), as tuples
+    (latency in milliseconds, number of sessions) in ascending order of latency.
+
+    Like `summarize()`, whole days don't need the partitions (see `_migrate_v9()`).
+    """
+    histogram = Counter()
+    if is_midnight(since) and is_midnight(until):
+        bounds = (
+            to_epoch(since) if since else 0,
+            to_epoch(until) if until else MAX_EPOCH,
+            since.strftime("%Y-%m-%d") if since else "",
+            until.strftime("%Y-%m-%d") if until else "9999",
+        )
+        with get_db_connection() as conn:
+            rows = conn.execute(LATENCY_HISTOGRAM_DAYS, bounds).fetchall()
+    else:
+        rows = iter_partitioned(LATENCY_HISTOGRAM, since, until)
+    for latency_ms, count in rows:
+        histogram[latency_ms] += count
+    return sorted(histogram.items())
+
+
+RAW_ROLLUPS = f"""SELECT {_DAY.format("")}, status, COUNT(*), SUM({_TIME_SPENT.format("")})
+                  FROM {{sessions}}
+                  WHERE start >= ? AND start < ?
+                  GROUP BY 1, 2"""
+ADD_TO_ROLLUP = """INSERT INTO daily_rollup (day, status, count, total)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT (day, status) DO UPDATE
+                   SET count = count + excluded.count, total = total + excluded.total"""
+
+
+def raw_rollups() -> dict[tuple[str, int], tuple[int, int]]:
+    """
+    Compute the daily rollups from the sessions (including the archived ones): a
+    mapping of (day, status code) to (count, total).
+    """
+    rollups = {}
+    for day, code, count, total in iter_partitioned(RAW_ROLLUPS):
+        previous_count, previous_total = rollups.get((day, code), (0, 0))
+        rollups[day, code] = (previous_count + count, previous_total + total)
+    return rollups
+
+
+def rebuild_rollups() -> int:
+    """
+    Recompute the daily rollups from scratch and return the number of rollup rows.
+    """
+    rows = [(*key, *value) for key, value in raw_rollups().items()]
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM daily_rollup")
+        conn.executemany(ADD_TO_ROLLUP, rows)
+        return conn.execute("SELECT COUNT(*) FROM daily_rollup").fetchone()[0]
+
+
+def check_rollups() -> list[tuple]:
+    """
+    Compare the daily rollups with the sessions (including the archived ones).
+
+    Returns the mismatches as tuples (day, status, (count, total) according to the
+    sessions, (count, total) according to the rollups) - i.e. an empty list if the
+    rollups are consistent.
+    """
+    raw = raw_rollups()
+    rollups = {
+        (day, code): (count, total)
+        for day, code, count, total in get_db_connection().execute(
+            "SELECT day, status, count, total FROM daily_rollup"
+        )
+    }
+    mismatches = []
+    for day, code in sorted(raw.keys() | rollups.keys()):
+        counts, rollup_counts = raw.get((day, code)), rollups.get((day, code))
+        if counts != rollup_counts:
+            mismatches.append(
+                (
+                    day,
+                    STATUS_BY_CODE.get(code),
+                    counts or (None, None),
+                    rollup_counts or (None, None),
+                )
+            )
+    return mismatches
+
+
+# Columns (and their format) as passed to `archive_pomodoro_session()` - everything
+# that's archived, so that nothing gets lost by an export and an import. `tags` is a
+# JSON array (or NULL if the session has no tags).
+EXPORT_COLUMNS = (
+    "start",
+    "end",
+    "runtime",
+    "status",
+    "latency_ms",
+    "timer",
+    "paused",
+    "tags",
+)
+# Exports of older yapom versions (which can still be imported)
+LEGACY_EXPORT_COLUMNS = EXPORT_COLUMNS[:4]
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_query() -> str:
+    # Formatting is done by SQLite - a lot faster than doing it row by row in Python
+    def datetime_str(column: str) -> str:
+        return (
+            f"strftime('{utils.DATETIME_FORMAT}', {column}, 'unixepoch', 'localtime')"
+        )
+
+    cases = " ".join(
+        f"WHEN {code} THEN '{status.value}'" for status, code in STATUS_CODES.items()
+    )
+    return f"""SELECT {datetime_str("start")},
+                      COALESCE({datetime_str("end")}, ''),
+                      runtime,
+                      CASE status {cases} END,
+                      latency_ms,
+                      timer,
+                      paused,
+                      tags
+               FROM {{sessions}}
+               WHERE start >= ? AND start < ?
+               ORDER BY start"""
+
+
+EXPORT_SESSIONS = _export_query()
+
+
+def iter_sessions(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    """
+    Yield the sessions that started in [`since`, `until`) as tuples of
+    `EXPORT_COLUMNS`, oldest first.
+
+    Rows are fetched in batches, so memory usage doesn't depend on the size of the
+    history.
+    """
+    yield from iter_partitioned(EXPORT_SESSIONS, since, until, batch_size, tagged=True)
+
+
+IMPORT_BATCH_SIZE = 50_000
+# Sessions are identified by their content - a session that's already in the history
+# (or earlier in the same import) is skipped. The lookup uses the `sessions_start`
+# index. Sessions of a year that has a partition are looked up in the (attached)
+# partition, too (`{partitioned}`, see `import_sessions()`).
+IMPORT_SESSION = """INSERT INTO main.sessions (start, end, runtime, status, latency_ms, timer, paused)
+                    SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM main.sessions
+                        WHERE start = ?1 AND status = ?4 AND runtime = ?3
+                          AND end IS ?2
+                    ){partitioned}"""
+IMPORT_PARTITIONED = """ AND NOT EXISTS (
+                        SELECT 1 FROM cold.sessions
+                        WHERE start = ?1 AND status = ?4 AND runtime = ?3
+                          AND end IS ?2
+                    )"""
+# Tags go to the session with the same content (i.e. the imported one - or the one
+# that was already there, in the history database or in a partition `{schema}`)
+IMPORT_TAG = """INSERT OR IGNORE INTO {schema}.session_tags (session_id, tag)
+                SELECT id, ?5 FROM {schema}.sessions
+                WHERE start = ?1 AND status = ?4 AND runtime = ?3 AND end IS ?2"""
+
+
+def import_sessions(rows, batch_size: int = IMPORT_BATCH_SIZE) -> int:
+    """
+    Insert sessions, given as tuples (start, end, runtime, status code, latency_ms,
+    timer, paused, tags) with epoch timestamps, skipping duplicates - including
+    those that have been moved to a partition (see `compact()`).
+
+    Rows are inserted with `executemany()`, one transaction per `batch_size` rows
+    (and partition). Returns the number of inserted sessions.
+    """
+    from itertools import islice
+
+    conn = get_db_connection()
+    years = partitions()
+    rows = iter(rows)
+    inserted = 0
+    while batch := list(islice(rows, batch_size)):
+        # Partitions can't be attached within a transaction - the batch is split up
+        by_partition = {}
+        for row in batch:
+            path = years.get(datetime.fromtimestamp(row[0]).year) if years else None
+            by_partition.setdefault(path, []).append(row)
+        for path, group in by_partition.items():
+            with attached(conn, path) if path else nullcontext():
+                schemas = schemas_with_tags(conn, path is not None)
+                query = IMPORT_SESSION.format(
+                    partitioned=IMPORT_PARTITIONED if path else ""
+                )
+                tags = [(*row[:4], tag) for row in group for tag in row[7]]
+                with conn:
+                    inserted += conn.executemany(
+                        query, [row[:7] for row in group]
+                    ).rowcount
+                    for schema in schemas:
+                        conn.executemany(IMPORT_TAG.format(schema=schema), tags)
+    return inserted
+
+
+# Columns that are copied by `merge()` - as far as the other database has them
+MERGE_COLUMNS = ("start", "end", "runtime", "status", "latency_ms", "timer", "paused")
+# Like `IMPORT_SESSION`, sessions are identified by their content, which is looked up
+# via the `sessions_start` index - in the history database and, for the years that
+# have one, in the (attached) partition. Only sessions past the high-water mark of
+# the other database (i.e. its session ids) are read at all, up to the mark this
+# merge ends with. The other database's partitions are read in full (see
+# `merge_sessions()`).
+MERGE_SESSIONS = """INSERT INTO main.sessions ({columns})
+                    SELECT {columns} FROM {source}.sessions AS s
+                    WHERE s.id > ?1 AND s.id <= ?2
+                      AND s.start >= ?3 AND s.start < ?4
+                      AND NOT EXISTS (
+                        SELECT 1 FROM main.sessions AS m
+                        WHERE m.start = s.start AND m.status = s.status
+                          AND m.runtime = s.runtime AND m.end IS s.end
+                    ){partitioned}
+                    ORDER BY s.id"""
+MERGE_PARTITIONED = """ AND NOT EXISTS (
+                        SELECT 1 FROM cold.sessions AS c
+                        WHERE c.start = s.start AND c.status = s.status
+                          AND c.runtime = s.runtime AND c.end IS s.end
+                    )"""
+# The tags of the other database's sessions (in `{source}`, i.e. the other database
+# or one of its partitions) go to the sessions with the same content (in the history
+# database or in a partition `{schema}`)
+MERGE_TAGS = """INSERT OR IGNORE INTO {schema}.session_tags (session_id, tag)
+                SELECT m.id, t.tag FROM {source}.sessions AS s
+                JOIN {source}.session_tags AS t ON t.session_id = s.id
+                JOIN {schema}.sessions AS m
+                  ON m.start = s.start AND m.status = s.status
+                 AND m.runtime = s.runtime AND m.end IS s.end
+                WHERE s.id > ?1 AND s.id <= ?2 AND s.start >= ?3 AND s.start < ?4"""
+# The highest session id the other database has ever given out (see `_migrate_v8()`)
+# - or, if it's older than that, its highest session id
+MERGE_LAST_ID = """SELECT IFNULL(
+                       (SELECT seq FROM other.sqlite_sequence WHERE name = 'sessions'),
+                       (SELECT MAX(id) FROM other.sessions)
+                   )"""
+MERGE_LAST_ID_LEGACY = "SELECT MAX(id) FROM other.sessions"
+MERGE_HIGH_WATER_MARK = """INSERT INTO merge_sources (source, last_id) VALUES (?, ?)
+                           ON CONFLICT (source) DO UPDATE SET last_id = excluded.last_id"""
+
+
+def has_table(conn: sqlite3.Connection, schema: str, table: str) -> bool:
+    """
+    Return whether the (attached) database `schema` has the table `table` - e.g. an
+    older one might not.
+    """
+    return (
+        conn.execute(
+            f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        ).fetchone()
+        is not None
+    )
+
+
+def schemas_with_tags(conn: sqlite3.Connection, partitioned: bool) -> list[str]:
+    """
+    The databases that have tags: the history database - and the attached partition
+    if `partitioned` (unless it's from an older yapom).
+    """
+    if partitioned and has_table(conn, "cold", "session_tags"):
+        return ["main", "cold"]
+    return ["main"]
+
+
+def merge_sessions(
+    conn: sqlite3.Connection, source: str, ids: tuple[int, int], since: int, until: int
+) -> int:
+    """
+    Copy the sessions of the attached database `source` (the other database or one
+    of its partitions) with an id in (`ids[0]`, `ids[1]`] that start in [`since`,
+    `until`) into this history and return the number of copied sessions.
+
+    Partitions don't have a high-water mark (their ids are their own), so they're
+    read in full - the sessions that are already here are skipped, as always.
+    """
+    available = {
+        row[1] for row in conn.execute(f"PRAGMA {source}.table_info(sessions)")
+    }
+    columns = ", ".join(column for column in MERGE_COLUMNS if column in available)
+    tagged = has_table(conn, source, "session_tags")
+    merged = 0
+    # One transaction per segment: partitions can't be attached within one. An
+    # interrupted merge reads the same sessions again (and skips those it copied).
+    for start, end, partition in segments(since, until):
+        with attached(conn, partition) if partition else nullcontext():
+            schemas = schemas_with_tags(conn, partition is not None)
+            sessions = MERGE_SESSIONS.format(
+                source=source,
+                columns=columns,
+                partitioned=MERGE_PARTITIONED if partition else "",
+            )
+            params = (*ids, start, end)
+            with conn:
+                merged += conn.execute(sessions, params).rowcount
+                if tagged:
+                    for schema in schemas:
+                        tags = MERGE_TAGS.format(source=source, schema=schema)
+                        conn.execute(tags, params)
+    return merged
+
+
+def merge(path: str | Path) -> int:
+    """
+    Copy the sessions of another history database (e.g. from another machine) into
+    this one and return the number of copied sessions.
+
+    Sessions that are already in this history (or in its partitions) are skipped.
+    Every database remembers how far it got with each other database (by its
+    resolved path), so merging the same database again only reads the sessions that
+    have been added to it since - and merging this database into itself doesn't read
+    anything at all.
+
+    The sessions in the other database's partitions (in the `archive` directory next
+    to it, see `compact()`) are copied as well - into the history database.
+    """
+    source = Path(path).expanduser().resolve()
+    if not source.is_file():
+        raise FileNotFoundError(f"No such history database: {source}")
+    if source.samefile(get_db_path()):
+        return 0
+    conn = get_db_connection()
+    conn.execute("ATTACH DATABASE ? AS other", (str(source),))
+    try:
+        if conn.execute("PRAGMA other.user_version").fetchone()[0] < 1:
+            raise ValueError(f"{source} isn't an (up-to-date) yapom history database")
+        row = conn.execute(
+            "SELECT last_id FROM merge_sources WHERE source = ?", (str(source),)
+        ).fetchone()
+        last_id = row[0] if row else 0
+        # Sessions that are added to the other database while this merge runs are
+        # left for the next one
+        query = (
+            MERGE_LAST_ID
+            if has_table(conn, "other", "sqlite_sequence")
+            else MERGE_LAST_ID_LEGACY
+        )
+        mark = conn.execute(query).fetchone()[0] or last_id
+        merged = 0
+        # The sessions that the other database has moved to its partitions (see
+        # `compact()`) first - they're the oldest ones. Unless these are the
+        # partitions of this history (i.e. the databases share their directory).
+        other_archive = source.parent / ARCHIVE_DIR
+        if other_archive.resolve() != get_archive_dirpath().resolve():
+            for _, other_partition in sorted(partitions(other_archive).items()):
+                with attached(conn, other_partition, "other_cold"):
+                    first, last = conn.execute(
+                        "SELECT MIN(start), MAX(start) FROM other_cold.sessions"
+                    ).fetchone()
+                    if first is not None:
+                        merged += merge_sessions(
+                            conn, "other_cold", (0, MAX_EPOCH), first, last + 1
+                        )
+        merged += merge_sessions(conn, "other", (last_id, mark), 0, MAX_EPOCH)
+        with conn:
+            conn.execute(MERGE_HIGH_WATER_MARK, (str(source), mark))
+    finally:
+        conn.execute("DETACH DATABASE other")
+    return merged
+
+
+# --- Partitions ---
+#
+# `yapom history compact` moves old sessions out of the history database into one
+# database per (local) year in `~/.yapom/archive/` (e.g. `archive/2019.db`) - a
+# partition, which only has the tables `sessions` and `session_tags`. The daily
+# rollups of those sessions stay in the history database, so reports on whole days
+# don't need the partitions at all. Queries on the sessions themselves (see
+# `iter_partitioned()`) attach only the partitions of the years they cover - one at
+# a time, since SQLite limits the number of attached databases.
+
+ARCHIVE_DIR = "archive"
+PARTITION_COLUMNS = "start, end, runtime, status, latency_ms, timer, paused"
+# Sessions of the history database that are in the attached partition as well (after
+# an interrupted compaction, see `compact()`) - they're read from the partition only
+_NOT_IN_PARTITION = """NOT EXISTS (
+                           SELECT 1 FROM cold.sessions AS c
+                           WHERE c.start = s.start AND c.status = s.status
+                             AND c.runtime = s.runtime AND c.end IS s.end
+                       )"""
+# The sessions of a year: those that are still in the history database, and those in
+# the (attached) partition
+PARTITIONED_SESSIONS = f"""(SELECT {PARTITION_COLUMNS} FROM main.sessions AS s
+                            WHERE {_NOT_IN_PARTITION}
+                            UNION ALL
+                            SELECT {PARTITION_COLUMNS} FROM cold.sessions)"""
+# The tags of a session `s` (in the database `{0}`) as a JSON array - NULL if it has
+# none. Only used by queries that need them (see `iter_partitioned()`).
+_TAGS = """(SELECT NULLIF(json_group_array(tag), '[]')
+           FROM {0}.session_tags WHERE session_id = s.id)"""
+CREATE_PARTITION = """CREATE TABLE IF NOT EXISTS cold.sessions (
+                      id INTEGER PRIMARY KEY,
+                      start INTEGER NOT NULL,
+                      end INTEGER,
+                      runtime INTEGER NOT NULL,
+                      status INTEGER NOT NULL,
+                      latency_ms INTEGER,
+                      timer TEXT,
+                      paused INTEGER NOT NULL DEFAULT 0)"""
+CREATE_PARTITION_INDEX = """CREATE INDEX IF NOT EXISTS cold.sessions_start
+                            ON sessions (start, status, runtime, end)"""
+CREATE_PARTITION_TAGS = """CREATE TABLE IF NOT EXISTS cold.session_tags (
+                           session_id INTEGER NOT NULL,
+                           tag TEXT NOT NULL,
+                           PRIMARY KEY (tag, session_id)) WITHOUT ROWID"""
+CREATE_PARTITION_TAGS_INDEX = """CREATE INDEX IF NOT EXISTS cold.session_tags_session
+                                 ON session_tags (session_id)"""
+# Sessions that are already in the partition (e.g. from an interrupted compaction)
+# aren't copied again
+MOVE_TO_PARTITION = f"""INSERT INTO cold.sessions ({PARTITION_COLUMNS})
+                        SELECT {PARTITION_COLUMNS} FROM main.sessions AS s
+                        WHERE start >= ? AND start < ? AND NOT EXISTS (
+                            SELECT 1 FROM cold.sessions AS c
+                            WHERE c.start = s.start AND c.status = s.status
+                              AND c.runtime = s.runtime AND c.end IS s.end
+                        )"""
+# The latencies of the sessions in a partition (that aren't in the history database
+# as well) - as of `_migrate_v9()`, they're added up by `compact()` instead
+COMPACTED_LATENCIES = f"""SELECT {_DAY.format("")}, latency_ms, COUNT(*)
+                          FROM sessions AS c
+                          WHERE latency_ms IS NOT NULL AND NOT EXISTS (
+                              SELECT 1 FROM main_db.sessions AS m
+                              WHERE m.start = c.start AND m.status = c.status
+                                AND m.runtime = c.runtime AND m.end IS c.end
+                          )
+                          GROUP BY 1, 2"""
+# The latencies of the sessions that are moved (see `_migrate_v9()`)
+ADD_TO_LATENCY_ROLLUP = f"""INSERT INTO latency_rollup (day, latency_ms, count)
+                            SELECT {_DAY.format("")}, latency_ms, COUNT(*)
+                            FROM main.sessions
+                            WHERE start >= ? AND start < ? AND latency_ms IS NOT NULL
+                            GROUP BY 1, 2
+                            ON CONFLICT (day, latency_ms) DO UPDATE
+                            SET count = count + excluded.count"""
+# Session ids differ between the history database and the partition - tags are moved
+# to the sessions with the same content
+MOVE_TAGS_TO_PARTITION = """INSERT OR IGNORE INTO cold.session_tags (session_id, tag)
+                            SELECT c.id, t.tag FROM main.sessions AS s
+                            JOIN main.session_tags AS t ON t.session_id = s.id
+                            JOIN cold.sessions AS c
+                              ON c.start = s.start AND c.status = s.status
+                             AND c.runtime = s.runtime AND c.end IS s.end
+                            WHERE s.start >= ? AND s.start < ?"""
+MAX_EPOCH = 2**63 - 1
+
+
+def get_archive_dirpath() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / ARCHIVE_DIR
+
+
+def partitions(directory: Path | None = None) -> dict[int, Path]:
+    """
+    Return the partitions (in `directory` - by default, those of this history) by
+    year.
+    """
+    directory = directory or get_archive_dirpath()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return {}
+    return {
+        int(year): directory / name
+        for name in names
+        if (year := name.removesuffix(".db")) != name and year.isdigit()
+    }
+
+
+def year_bounds(year: int) -> tuple[int, int]:
+    return to_epoch(datetime(year, 1, 1)), to_epoch(datetime(year + 1, 1, 1))
+
+
+def segments(since: int, until: int) -> list[tuple[int, int, Path | None]]:
+    """
+    Split [`since`, `until`) (epoch seconds) at the boundaries of the partitions'
+    years into segments (start, end, partition or `None`), in ascending order.
+    """
+    result: list[tuple[int, int, Path | None]] = []
+    for year, path in sorted(partitions().items()):
+        start, end = year_bounds(year)
+        if end <= since or start >= until:
+            continue
+        if since < start:
+            result.append((since, start, None))
+        result.append((max(since, start), min(end, until), path))
+        since = min(end, until)
+    if since < until:
+        result.append((since, until, None))
+    return result
+
+
+@contextmanager
+def attached(conn: sqlite3.Connection, path: Path, schema: str = "cold"):
+    """
+    Attach the partition `path` as `schema`.
+    """
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+    try:
+        yield conn
+    finally:
+        conn.execute(f"DETACH DATABASE {schema}")
+
+
+def sessions_source(
+    conn: sqlite3.Connection, partitioned: bool, tagged: bool = False
+) -> str:
+    """
+    The sessions of a segment (see `iter_partitioned()`): those of the history
+    database - and those of the attached partition if `partitioned`. With `tagged`,
+    they have an additional column `tags` (see `_TAGS`).
+    """
+    if not tagged:
+        return PARTITIONED_SESSIONS if partitioned else "sessions"
+    hot = f"SELECT {PARTITION_COLUMNS}, {_TAGS.format('main')} AS tags FROM main.sessions AS s"
+    if not partitioned:
+        return f"({hot})"
+    # Partitions of an older yapom don't have tags
+    tags = _TAGS.format("cold") if has_table(conn, "cold", "session_tags") else "NULL"
+    return f"""({hot}
+               WHERE {_NOT_IN_PARTITION}
+               UNION ALL
+               SELECT {PARTITION_COLUMNS}, {tags} AS tags FROM cold.sessions AS s)"""
+
+
+def iter_partitioned(
+    query: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    tagged: bool = False,
+):
+    """
+    Run `query` on the sessions that started in [`since`, `until`) - in the history
+    database and in the partitions of that period - and yield the resulting rows.
+
+    `query` selects from `{sessions}` (which has a `tags` column if `tagged`, see
+    `sessions_source()`) and takes the (epoch) bounds of the period as its
+    parameters. It's run once per segment of the period (see `segments()`) - so
+    aggregates may have to be combined by the caller.
+    """
+    conn = get_db_connection()
+    bounds = (to_epoch(since) if since else 0, to_epoch(until) if until else MAX_EPOCH)
+    for start, end, path in segments(*bounds):
+        with attached(conn, path) if path else nullcontext():
+            sessions = sessions_source(conn, path is not None, tagged)
+            cursor = conn.execute(query.format(sessions=sessions), (start, end))
+            try:
+                while rows := cursor.fetchmany(batch_size):
+                    yield from rows
+            finally:
+                cursor.close()
+
+
+def iter_tagged(
+    query: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    params: tuple = (),
+):
+    """
+    Like `iter_partitioned()`, but for queries that join the sessions with their tags
+    - which can't be done across databases (session ids are per database). `query`
+    selects from `{schema}.sessions AS s` and `{schema}.session_tags`, and takes the
+    bounds of the period, followed by `params`, as its parameters. It's run on the
+    history database and on the partitions of the period (that have tags) - and has
+    to add the condition `{unique}` to its `WHERE` clause.
+    """
+    conn = get_db_connection()
+    bounds = (to_epoch(since) if since else 0, to_epoch(until) if until else MAX_EPOCH)
+    for start, end, path in segments(*bounds):
+        with attached(conn, path) if path else nullcontext():
+            schemas = schemas_with_tags(conn, path is not None)
+            for schema in schemas:
+                # Sessions that are in both databases count for the partition only
+                unique = f"AND {_NOT_IN_PARTITION}" if schema != schemas[-1] else ""
+                yield from conn.execute(
+                    query.format(schema=schema, unique=unique), (start, end, *params)
+                ).fetchall()
+
+
+def iter_partitions(query: str, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Run `query`, which selects from `cold.sessions`, on every partition and yield the
+    resulting rows.
+    """
+    conn = get_db_connection()
+    for _, path in sorted(partitions().items()):
+        with attached(conn, path):
+            cursor = conn.execute(query)
+            try:
+                while rows := cursor.fetchmany(batch_size):
+                    yield from rows
+            finally:
+                cursor.close()
+
+
+def compact(before: datetime) -> dict[int, int]:
+    """
+    Move the sessions that started before `before` into the partitions of their
+    years and return the number of moved sessions per year.
+
+    Each year is moved in a transaction of its own. SQLite doesn't guarantee that a
+    transaction spanning a WAL database (i.e. the history) and an attached one is
+    atomic across both - if a compaction is interrupted, its sessions may end up in
+    both of them until the next compaction. Queries read such sessions from the
+    partition only (see `PARTITIONED_SESSIONS`), and everything that's kept in the
+    history database about compacted sessions (the rollups) is updated along with
+    deleting them there.
+    """
+    cutoff = to_epoch(before)
+    conn = get_db_connection()
+    (first,) = conn.execute(
+        "SELECT MIN(start) FROM sessions WHERE start < ?", (cutoff,)
+    ).fetchone()
+    if first is None:
+        return {}
+    get_archive_dirpath().mkdir(exist_ok=True)
+    moved = {}
+    for year in range(datetime.fromtimestamp(first).year, before.year + 1):
+        start, end = year_bounds(year)
+        end = min(end, cutoff)
+        (found,) = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM sessions WHERE start >= ? AND start < ?)",
+            (start, end),
+        ).fetchone()
+        if not found:
+            continue
+        with attached(conn, get_archive_dirpath() / f"{year}.db"):
+            conn.execute(CREATE_PARTITION)
+            conn.execute(CREATE_PARTITION_INDEX)
+            conn.execute(CREATE_PARTITION_TAGS)
+            conn.execute(CREATE_PARTITION_TAGS_INDEX)
+            with conn:
+                conn.execute(MOVE_TO_PARTITION, (start, end))
+                conn.execute(MOVE_TAGS_TO_PARTITION, (start, end))
+                conn.execute(ADD_TO_LATENCY_ROLLUP, (start, end))
+                # The daily rollups keep counting the archived sessions
+                conn.execute("DROP TRIGGER sessions_rollup_delete")
+                moved[year] = conn.execute(
+                    "DELETE FROM main.sessions WHERE start >= ? AND start < ?",
+                    (start, end),
+                ).rowcount
+                _create_rollup_delete_trigger(conn, _TIME_SPENT)
+    if moved:
+        # Give the space back
+        conn.execute("VACUUM")
+    return moved
@@ -0,0 +1,231 @@
+"""
+Hooks: executables in `~/.yapom/hooks/` that are run whenever the current session
+changes its state (e.g. to set a chat status or to turn "do not disturb" on).
+
+A hook is called `on_<event>` - or `on_<event>.<anything>`, so that there can be
+several hooks per event (e.g. `on_start.slack` and `on_start.dnd`) - where the event
+is one of `EVENTS`. It gets the session (in the format of the session journal, see
+`yapom.journal`) as JSON on stdin, and the event in `YAPOM_EVENT`.
+
+Hooks never hold up the command that fired them: `fire()` only looks for hooks and,
+if there are any, queues the event (in `~/.yapom/.hooks.queue/`) and starts a
+detached runner process (`python -m yapom.hooks`). Runners take turns (see
+`locked()`): the one whose turn it is works through the queue, one event after the
+other in the order they happened - so that, e.g., the `pause` hooks never run before
+the `start` hooks, and a burst of commands doesn't start an unbounded number of
+hooks. The hooks of an event run in a pool of at most `MAX_WORKERS` at once; hooks
+that take longer than `HOOK_TIMEOUT` get killed. How each of them went (and how long
+it took) is logged to `~/.yapom/hooks.log`.
+"""
+
+import os
+import sys
+import json
+import time
+
+import yapom.utils as utils
+import yapom.trace as trace
+
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+HOOKS_DIR = "hooks"
+LOG_FILE = "hooks.log"
+LOCK_FILE = ".hooks.lock"
+QUEUE_DIR = ".hooks.queue"
+EVENTS = {"start", "pause", "resume", "reset", "cancel", "finish"}
+# Number of hooks that run at the same time
+MAX_WORKERS = 4
+# Seconds after which a hook gets killed
+HOOK_TIMEOUT = 30.0
+# The log starts over (keeping the previous one as `hooks.log.1`) beyond this size
+LOG_SIZE = 256 * 1024
+
+
+def get_dirpath() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / HOOKS_DIR
+
+
+def get_log_path() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / LOG_FILE
+
+
+def get_queue_dirpath() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / QUEUE_DIR
+
+
+def find(event: str) -> list[Path]:
+    """
+    Return the (executable) hooks of `event`, sorted by name.
+    """
+    prefix = f"on_{event}"
+    try:
+        entries = os.scandir(get_dirpath())
+    except FileNotFoundError:
+        return []
+    with entries:
+        return sorted(
+            Path(entry.path)
+            for entry in entries
+            if (entry.name == prefix or entry.name.startswith(f"{prefix}."))
+            and entry.is_file()
+            and os.access(entry.path, os.X_OK)
+        )
+
+
+@trace.traced("hooks.fire")
+def fire(event: str, state):
+    """
+    Run the hooks of `event` with the session state `state` - in the background.
+
+    This is cheap if there are no hooks: a single directory lookup.
+    """
+    if event not in EVENTS or not find(event):
+        return
+    import subprocess
+
+    at = time.time_ns()
+    payload = json.dumps({"event": event, "at": round(at / 1e9, 3), **state.to_dict()})
+    try:
+        enqueue(at, payload)
+        subprocess.Popen(
+            [sys.executable, "-S", "-m", "yapom.hooks"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            start_new_session=True,
+            cwd=Path(__file__).parent.parent,
+        )
+    except OSError as ex:
+        print(utils.pomtext(f"[WARNING] Can't run '{event}' hooks: {ex}"))
+
+
+def enqueue(at: int, payload: str):
+    """
+    Add the payload of an event that happened `at` (epoch nanoseconds) to the queue.
+    """
+    directory = get_queue_dirpath()
+    directory.mkdir(exist_ok=True)
+    # The names sort in the order the events happened
+    path = directory / f"{at:020d}.{os.getpid()}.json"
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(payload)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def locked():
+    """
+    Hold the (exclusive) lock of the hook runners.
+    """
+    import fcntl
+
+    with open(utils.home_dir() / LOCK_FILE, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def run(path: Path, event: str, payload: bytes, timeout: float) -> str:
+    """
+    Run the hook `path` and return how it went (e.g. "exit 0").
+    """
+    import signal
+    import subprocess
+
+    try:
+        process = subprocess.Popen(
+            [str(path)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            # The hook and everything it starts can be killed at once
+            start_new_session=True,
+            env={**os.environ, "YAPOM_EVENT": event},
+        )
+    except OSError as ex:
+        return f"failed to start: {ex}"
+    try:
+        _, stderr = process.communicate(payload, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+        return f"timed out after {timeout:g}s"
+    if process.returncode == 0:
+        return "exit 0"
+    # The last line of the error output is usually the one that matters
+    message = stderr.decode(errors="replace").strip().splitlines()
+    return f"exit {process.returncode}" + (f": {message[-1]}" if message else "")
+
+
+def log(line: str):
+    path = get_log_path()
+    try:
+        if path.stat().st_size > LOG_SIZE:
+            os.replace(path, path.with_name(f"{LOG_FILE}.1"))
+    except FileNotFoundError:
+        pass
+    with path.open("a") as fp:
+        fp.write(line + "\n")
+
+
+def run_all(event: str, payload: bytes, timeout: float = HOOK_TIMEOUT) -> list[str]:
+    """
+    Run the hooks of `event` (at most `MAX_WORKERS` at once) and log their outcomes.
+
+    Returns the log lines.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    lines = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+
+        def timed(path: Path) -> tuple[Path, str, float]:
+            started = time.monotonic()
+            outcome = run(path, event, payload, timeout)
+            return path, outcome, time.monotonic() - started
+
+        futures = [pool.submit(timed, path) for path in find(event)]
+        for future in as_completed(futures):
+            path, outcome, duration = future.result()
+            now = datetime.now().strftime(utils.DATETIME_FORMAT)
+            lines.append(f"{now} {event} {path.name}: {outcome} ({duration:.2f}s)")
+            log(lines[-1])
+    return lines
+
+
+def drain(timeout: float = HOOK_TIMEOUT):
+    """
+    Run the hooks of the queued events, oldest first, until the queue is empty.
+    """
+    directory = get_queue_dirpath()
+    with locked():
+        while True:
+            try:
+                names = sorted(
+                    name for name in os.listdir(directory) if name.endswith(".json")
+                )
+            except FileNotFoundError:
+                return
+            if not names:
+                return
+            for name in names:
+                path = directory / name
+                payload = path.read_bytes()
+                # Hooks run at most once per event - even if one of them crashes the
+                # runner
+                path.unlink()
+                try:
+                    event = json.loads(payload)["event"]
+                except (ValueError, KeyError) as ex:
+                    now = datetime.now().strftime(utils.DATETIME_FORMAT)
+                    log(f"{now} {name}: invalid event: {ex}")
+                    continue
+                run_all(event, payload, timeout)
+
+
+if __name__ == "__main__":
+    # Runner process started by `fire()`
+    drain()
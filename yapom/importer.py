@@ -0,0 +1,198 @@
+"""
+`yapom import` - bulk import of session histories.
+
+Supported formats:
+
+- `csv`: the format written by `yapom export --format csv` (also by older versions,
+  which only had the columns `start,end,runtime,status`)
+- `openpomodoro`: the history file of open-pomodoro (`~/.pomodoro/history`), one
+  session per line: `<RFC 3339 start time> duration=<minutes> [key=value ...]`
+
+Input is parsed as a stream, so files of any size can be imported.
+"""
+
+import sys
+import json
+import time
+
+import yapom.utils as utils
+import yapom.history as history
+
+from pathlib import Path
+from datetime import datetime, timedelta
+
+from yapom.utils import Status, STATUS_CODES, pomtext
+
+FORMATS = ("csv", "openpomodoro")
+OPEN_POMODORO_DEFAULT_DURATION = 25
+
+
+class ImportStats:
+    """
+    Counts rows while they're streamed from the parser into the history database.
+    """
+
+    __slots__ = ("parsed", "invalid", "errors")
+
+    MAX_ERRORS = 10
+
+    def __init__(self):
+        self.parsed = 0
+        self.invalid = 0
+        self.errors: list[str] = []
+
+    def error(self, line_number: int, message: str):
+        self.invalid += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(f"line {line_number}: {message}")
+
+
+def parse_tags(value: str) -> tuple[str, ...]:
+    """
+    Parse the `tags` column of an export (a JSON array, or empty).
+    """
+    if not value:
+        return ()
+    tags = json.loads(value)
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError(f"Invalid tags: {value}")
+    return tuple(tags)
+
+
+def parse_csv(lines, stats: ImportStats):
+    """
+    Yield (start, end, runtime, status code, latency_ms, timer, paused, tags) tuples
+    from CSV lines.
+    """
+    import csv
+
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    if tuple(header) not in {history.EXPORT_COLUMNS, history.LEGACY_EXPORT_COLUMNS}:
+        raise ValueError(
+            f"Unexpected CSV header: {','.join(header)} (expected: {','.join(history.EXPORT_COLUMNS)})"
+        )
+    # Older exports don't have the additional columns
+    missing = [""] * (len(history.EXPORT_COLUMNS) - len(header))
+    for line_number, row in enumerate(reader, start=2):
+        try:
+            if len(row) != len(header):
+                raise ValueError(f"expected {len(header)} columns, got {len(row)}")
+            start, end, runtime, status, latency_ms, timer, paused, tags = row + missing
+            yield (
+                history.to_epoch(start),
+                history.to_epoch(end) if end else None,
+                int(runtime),
+                STATUS_CODES[Status(status)],
+                int(latency_ms) if latency_ms else None,
+                timer or None,
+                int(paused or 0),
+                parse_tags(tags),
+            )
+            stats.parsed += 1
+        except ValueError as ex:
+            stats.error(line_number, str(ex))
+
+
+def parse_openpomodoro(lines, stats: ImportStats):
+    """
+    Yield tuples like `parse_csv()` from open-pomodoro history lines.
+
+    open-pomodoro only records completed sessions, so all of them are 'finished'.
+    """
+    finished = STATUS_CODES[Status.FINISHED]
+    for line_number, line in enumerate(lines, start=1):
+        if not (line := line.strip()):
+            continue
+        try:
+            start_str, *attributes = line.split()
+            start = datetime.fromisoformat(start_str.replace("Z", "+00:00"))
+            fields = dict(
+                attribute.partition("=")[::2]
+                for attribute in attributes
+                if "=" in attribute
+            )
+            duration = int(fields.get("duration", OPEN_POMODORO_DEFAULT_DURATION))
+            runtime = duration * 60
+            end = start + timedelta(seconds=runtime)
+            yield (
+                int(start.timestamp()),
+                int(end.timestamp()),
+                runtime,
+                finished,
+                None,
+                None,
+                0,
+                (),
+            )
+            stats.parsed += 1
+        except ValueError as ex:
+            stats.error(line_number, str(ex))
+
+
+def detect_format(path: Path) -> str:
+    if path.suffix.lower() == ".csv":
+        return "csv"
+    with path.open() as fp:
+        first_line = fp.readline().strip()
+    if first_line in {
+        ",".join(history.EXPORT_COLUMNS),
+        ",".join(history.LEGACY_EXPORT_COLUMNS),
+    }:
+        return "csv"
+    return "openpomodoro"
+
+
+def import_file(
+    path: Path, import_format: str | None = None
+) -> tuple[int, ImportStats]:
+    """
+    Import sessions from `path` and return the number of inserted sessions together
+    with the parser's statistics.
+    """
+    import_format = import_format or detect_format(path)
+    match import_format:
+        case "csv":
+            parse = parse_csv
+        case "openpomodoro":
+            parse = parse_openpomodoro
+        case _:
+            raise ValueError(f"Unknown import format: '{import_format}'")
+    history.ensure_schema()
+    stats = ImportStats()
+    with path.open(newline="") as fp:
+        inserted = history.import_sessions(parse(fp, stats))
+    return inserted, stats
+
+
+def main(args: list[str]) -> str:
+    """
+    `yapom import FILE [--format csv|openpomodoro]`
+    """
+    try:
+        import_format = utils.get_option(args, "--format")
+        if import_format and import_format not in FORMATS:
+            raise ValueError(f"Unknown import format: '{import_format}'")
+        if not args or args[0].startswith("--"):
+            raise ValueError("Usage: yapom import FILE [--format csv|openpomodoro]")
+        path = Path(args[0]).expanduser()
+        start = time.perf_counter()
+        inserted, stats = import_file(path, import_format)
+    except (OSError, ValueError) as ex:
+        sys.exit(pomtext(str(ex)))
+    duration = time.perf_counter() - start
+
+    rate = stats.parsed / duration if duration else 0
+    lines = [
+        pomtext(
+            f"Imported {inserted} sessions from {path} in {duration:.2f}s ({rate:,.0f} rows/s)"
+        )
+    ]
+    if duplicates := stats.parsed - inserted:
+        lines.append(f"  skipped {duplicates} duplicate sessions")
+    if stats.invalid:
+        lines.append(f"  skipped {stats.invalid} invalid rows:")
+        lines.extend(f"    {error}" for error in stats.errors)
+    return "\n".join(lines)
@@ -0,0 +1,115 @@
+"""
+Append-only session journal (`~/.yapom/.session.journal`).
+
+Every state transition of the current session (start, pause, resume, cancel, finish,
+...) is appended to the journal as a single JSON line: the event, when it happened
+and the complete session state afterwards. A write is one `write()` (plus `fsync()`)
+of one line - nothing is read and nothing is rewritten, so two processes that update
+the session at the same time (e.g. the timer process finishing while the user pauses
+it) can't clobber each other's writes, and a crash leaves at most a partial last line.
+
+The current state is the last complete line (see `tail()`). Once the journal grows
+beyond `COMPACT_SIZE`, it's compacted: the current state is written to the JSON
+session file (atomically) and the journal starts over.
+"""
+
+import os
+import json
+import time
+import fcntl
+
+import yapom.utils as utils
+
+from pathlib import Path
+
+JOURNAL_FILE = ".session.journal"
+# Compact the journal once it's bigger than this (in bytes) - a few hundred records
+COMPACT_SIZE = 64 * 1024
+# How much of the end of the journal is read to find its last (complete) record
+TAIL_SIZE = 4096
+# Make every record durable before the command returns
+FSYNC = True
+
+
+def get_filepath() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / JOURNAL_FILE
+
+
+def append(event: str, data: dict, at: float | None = None) -> dict:
+    """
+    Append a record of the event `event` (at epoch time `at`, default: now), with the
+    session state `data`, to the journal. Returns the record.
+    """
+    entry = {"event": event, "at": round(at or time.time(), 3), **data}
+    line = (json.dumps(entry) + "\n").encode()
+    fd = os.open(
+        utils.home_dir() / JOURNAL_FILE, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644
+    )
+    try:
+        # Appends of a single line don't interleave - the lock only keeps them apart
+        # from a compaction (which truncates the journal)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            # Don't glue the record to a partial line left behind by a crash
+            line = b"\n" + line
+        os.write(fd, line)
+        if FSYNC:
+            os.fsync(fd)
+        if os.fstat(fd).st_size > COMPACT_SIZE:
+            compact(fd, data)
+    finally:
+        os.close(fd)
+    return entry
+
+
+def compact(fd: int, data: dict):
+    """
+    Write the session state `data` (i.e. the last record of the journal `fd`) to the
+    JSON session file and truncate the journal. Must be called while holding the
+    journal's lock.
+
+    If this is interrupted before the journal is truncated, the journal's last record
+    and the session file agree - so there's nothing to recover from.
+    """
+    import yapom.session as session
+
+    session.write_json(data)
+    os.ftruncate(fd, 0)
+    if FSYNC:
+        os.fsync(fd)
+
+
+def tail(path: Path | None = None) -> dict | None:
+    """
+    Return the last complete record of the journal - or `None` if the journal is
+    missing or empty (or has no intact record at all).
+
+    Only the end of the journal is read. A partial (or otherwise broken) last line,
+    e.g. from a crash in the middle of a write, is skipped.
+    """
+    try:
+        fp = (path or get_filepath()).open("rb")
+    except FileNotFoundError:
+        return None
+    with fp:
+        size = fp.seek(0, os.SEEK_END)
+        offset = max(size - TAIL_SIZE, 0)
+        while True:
+            fp.seek(offset)
+            lines = fp.read(size - offset).split(b"\n")
+            if offset > 0:
+                # The first line is (most likely) cut off
+                lines = lines[1:]
+            for line in reversed(lines):
+                try:
+                    return json.loads(line)
+                except ValueError:
+                    continue
+            if offset == 0:
+                return None
+            offset = 0
+
+
+def remove():
+    get_filepath().unlink(missing_ok=True)
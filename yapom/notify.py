@@ -0,0 +1,290 @@
+"""
+Notifications: telling the user that a Pomodoro session has finished.
+
+Notifiers (i.e. backends):
+
+- `tk`: a small Tk message box (the default)
+- `notify-send`: a desktop notification (libnotify)
+- `bell`: the terminal bell plus a message on the terminal
+- `file:<PATH>`: appends the message to a file or FIFO (e.g. for tests or scripts)
+- `none`: no notifications
+
+Notifications are delivered asynchronously: message boxes and desktop notifications
+are shown by detached processes that close themselves after a timeout, so that the
+timer process can archive the session and exit right away.
+
+The available notifier is detected once and cached in `~/.yapom/.notifier`. It can be
+set explicitly with the `YAPOM_NOTIFIER` environment variable.
+"""
+
+import os
+import sys
+import json
+
+import yapom.utils as utils
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from yapom.utils import pomtext, NOTIFY_TOOL
+
+NOTIFIER_ENV = "YAPOM_NOTIFIER"
+CACHE_FILE = ".notifier"
+# Seconds after which message boxes and desktop notifications close themselves
+NOTIFY_TIMEOUT = 10 * 60
+SESSION_FINISHED = "Pomodoro session finished!"
+BG_DARK = "#2e2e2e"
+
+
+class Notifier(ABC):
+    name = ""
+
+    @abstractmethod
+    def notify(self, message: str, timeout: int = NOTIFY_TIMEOUT):
+        """
+        Deliver `message` without waiting for the user.
+        """
+
+
+class TkNotifier(Notifier):
+    name = "tk"
+
+    def notify(self, message: str, timeout: int = NOTIFY_TIMEOUT):
+        spawn_detached(
+            [sys.executable, "-m", "yapom.notify", self.name, message, str(timeout)]
+        )
+
+
+class NotifySendNotifier(Notifier):
+    name = NOTIFY_TOOL
+
+    def notify(self, message: str, timeout: int = NOTIFY_TIMEOUT):
+        spawn_detached(
+            [NOTIFY_TOOL, "--expire-time", str(timeout * 1000), pomtext(message)]
+        )
+
+
+class BellNotifier(Notifier):
+    name = "bell"
+
+    def notify(self, message: str, timeout: int = NOTIFY_TIMEOUT):
+        try:
+            with open("/dev/tty", "w") as tty:
+                tty.write(f"\a{pomtext(message)}\n")
+        except OSError:
+            print(f"\a{pomtext(message)}", flush=True)
+
+
+class FileNotifier(Notifier):
+    """
+    Append messages to a file - or write them to a FIFO, if somebody's reading it.
+    """
+
+    name = "file"
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def notify(self, message: str, timeout: int = NOTIFY_TIMEOUT):
+        try:
+            # Non-blocking, so that a FIFO without a reader can't block the timer
+            fd = os.open(
+                self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_NONBLOCK
+            )
+        except OSError as ex:
+            # ENXIO: FIFO without a reader
+            print(pomtext(f"[WARNING] Can't write notification to {self.path}: {ex}"))
+            return
+        try:
+            os.write(fd, f"{message}\n".encode())
+        finally:
+            os.close(fd)
+
+
+class NullNotifier(Notifier):
+    name = "none"
+
+    def notify(self, message: str, timeout: int = NOTIFY_TIMEOUT):
+        pass
+
+
+def spawn_detached(args: list[str]):
+    """
+    Start a process that outlives the current one (and isn't waited for).
+    """
+    import subprocess
+
+    subprocess.Popen(
+        args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        start_new_session=True,
+        # `-m yapom.notify` has to find the yapom package
+        cwd=Path(__file__).parent.parent,
+    )
+
+
+def has_display() -> bool:
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def detect() -> str:
+    """
+    Return the name of the best available notifier (without using the cache).
+    """
+    if has_display() and utils.is_tcl_installed():
+        return TkNotifier.name
+    if has_display() and utils.is_notify_send_installed():
+        return NotifySendNotifier.name
+    return BellNotifier.name
+
+
+def environment_key() -> str:
+    """
+    The parts of the environment that `detect()` depends on - the cached notifier
+    is only valid as long as they don't change.
+    """
+    return "|".join(
+        [
+            os.environ.get("PATH", ""),
+            str(has_display()),
+            os.environ.get("XDG_SESSION_TYPE", ""),
+        ]
+    )
+
+
+def detect_cached() -> str:
+    cache_path = Path(utils.HOME_DIR).expanduser() / CACHE_FILE
+    key = environment_key()
+    try:
+        cached = json.loads(cache_path.read_text())
+        if cached.get("key") == key:
+            return cached["notifier"]
+    except (OSError, ValueError, KeyError):
+        pass
+    name = detect()
+    try:
+        cache_path.write_text(json.dumps({"notifier": name, "key": key}))
+    except OSError:
+        pass
+    return name
+
+
+def get_notifier(name: str | None = None) -> Notifier:
+    """
+    Return the notifier called `name` - by default the one configured with
+    `YAPOM_NOTIFIER` or, if that's not set, the detected one.
+    """
+    name = name or os.environ.get(NOTIFIER_ENV) or detect_cached()
+    if name.startswith("file:"):
+        return FileNotifier(Path(name.removeprefix("file:")).expanduser())
+    for notifier in (TkNotifier, NotifySendNotifier, BellNotifier, NullNotifier):
+        if notifier.name == name:
+            return notifier()
+    raise ValueError(f"Unknown notifier: '{name}'")
+
+
+FALLBACKS = {
+    TkNotifier.name: NotifySendNotifier.name,
+    NotifySendNotifier.name: BellNotifier.name,
+}
+
+
+def notify(
+    message: str, timeout: int = NOTIFY_TIMEOUT, notifier: Notifier | None = None
+):
+    """
+    Deliver `message` (asynchronously), falling back to simpler notifiers if the
+    preferred one can't be started.
+    """
+    notifier = notifier or get_notifier()
+    while True:
+        try:
+            notifier.notify(message, timeout)
+            return
+        except Exception as ex:
+            if not (fallback := FALLBACKS.get(notifier.name)):
+                print(pomtext(f"[WARNING] Notification failed: {ex}"))
+                return
+            print(pomtext(f"[WARNING] '{notifier.name}' notification failed: {ex}"))
+            notifier = get_notifier(fallback)
+
+
+def session_finished():
+    notify(SESSION_FINISHED)
+
+
+def show_tk_dialog(message: str, timeout: int = NOTIFY_TIMEOUT):
+    """
+    Show a message box and wait until the user closes it (or `timeout` seconds have
+    passed).
+
+    This blocks - it's run in a separate process (see `TkNotifier`).
+    """
+    import tkinter as tk
+
+    root = None
+    try:
+        # TODO Fails when used from within a virtual environment
+        root = tk.Tk()
+        # Hide the main window
+        root.withdraw()
+
+        # Create a custom dialog window
+        dialog = tk.Toplevel(root)
+        dialog.title("Pomodoro Notification")
+        dialog.resizable(False, False)
+        dialog.geometry("300x150")
+        dialog.configure(bg=BG_DARK)  # Dark background
+
+        try:
+            # Emojione - tomato Emoji - U+1F345
+            # Source: https://commons.wikimedia.org/wiki/File:Emojione_1F345.svg
+            image_path = (
+                Path(__file__).parent / "resources/icons/Emojione_1F345_32px.svg.png"
+            )
+            icon = tk.PhotoImage(file=image_path).subsample(2, 2)
+            dialog.iconphoto(False, icon)
+            message_label = tk.Label(
+                dialog,
+                text=message,
+                fg="white",
+                bg=BG_DARK,
+                padx=5,
+                wraplength=280,
+                image=icon,
+                compound="left",
+            )
+        except Exception as e:
+            print(pomtext(f"Failed to load Pomodoro icon: {e}"))
+            message_label = tk.Label(
+                dialog, text=message, fg="white", bg=BG_DARK, wraplength=280
+            )
+
+        # Message label
+        message_label.pack(pady=20)
+
+        # OK button
+        ok_button = tk.Button(
+            dialog, text="OK", command=root.quit, bg="#444444", fg="white"
+        )
+        ok_button.pack()
+        dialog.protocol("WM_DELETE_WINDOW", root.quit)
+
+        # Don't wait forever for somebody to click 'OK'
+        root.after(timeout * 1000, root.quit)
+        root.mainloop()
+    finally:
+        if root:
+            # Ensure that Tk 'root' is destroyed "no matter what"
+            root.destroy()
+
+
+if __name__ == "__main__":
+    # Message box process started by `TkNotifier`
+    *_, notification, timeout_str = sys.argv
+    try:
+        show_tk_dialog(notification, int(timeout_str))
+    except Exception as ex:
+        print(pomtext(f"[WARNING] Tcl notification failed: {ex}"), file=sys.stderr)
+        notify(notification, int(timeout_str), notifier=NotifySendNotifier())
@@ -1,164 +1,265 @@
 import sys
 
 import yapom.utils as utils
-import yapom.history as history
+import yapom.trace as trace
+import yapom.cycle as cycle
 import yapom.session as session
 
 from datetime import datetime
 
 from yapom.utils import Status, pomtext
+from yapom.session import SessionState
 
+# NOTE Every command below accepts an (optional) `SessionState`. If none is given, the
+#  session file is read once and the resulting state is passed on from there, so that
+#  a command costs a single read and at most a single write of the session file.
 
-def status() -> str:
+
+@trace.traced("pomodoro.status")
+def status(state: SessionState | None = None) -> str:
     """
     Return a string describing the 'state' of the current (or 'latest') Pomodoro session.
 
     This function returns a 'pomtext' string.
     """
-    if latest := session.read():
-        runtime = int(latest["runtime"])
-        runtime_fmt = utils.format_runtime(runtime) or "-"
-        latest_status = Status(latest["status"]).name
-        start_time = latest["start"]
-        day_start, start_time = start_time.split()
-        elapsed, remaining = session.get_runtimes()
+    latest = state if state is not None else session.load()
+    # I.e. `if latest:` - spelled out, so that type checkers know start is set
+    if latest.status is not None and latest.start is not None:
+        runtime_fmt = utils.format_runtime(latest.runtime) or "-"
+        latest_status = latest.status.name
+        day_start, start_time = latest.start.strftime(utils.DATETIME_FORMAT).split()
+        elapsed, remaining = session.get_runtimes(latest)
         elapsed_str = utils.format_runtime(elapsed)
         remaining_str = utils.format_runtime(remaining)
-        if end_time := latest.get("end"):
-            day_end, end_time = end_time.split()
+        if latest.end:
+            day_end, end_time = latest.end.strftime(utils.DATETIME_FORMAT).split()
             if day_start == day_end:
                 return pomtext(
-                    f"{latest_status} ({runtime_fmt}) (start {start_time}) (end {end_time}) [{day_start}]"
+                    f"{latest_status} ({runtime_fmt}) (start {start_time}) (end {end_time}) [{day_start}]{format_tags(latest.tags)}"
                 )
             return pomtext(
-                f"{latest_status} (start {start_time} [{day_start}]) (end {end_time} [{day_end}])"
+                f"{latest_status} (start {start_time} [{day_start}]) (end {end_time} [{day_end}]){format_tags(latest.tags)}"
             )
         runtime_info = (
             f"(total {runtime_fmt}) (elapsed {elapsed_str} | remaining {remaining_str})"
         )
-        return pomtext(
-            f"{latest_status} {runtime_info} (start: {start_time}) [{day_start}]"
+        text = pomtext(
+            f"{latest_status} {runtime_info} (start: {start_time}) [{day_start}]{format_tags(latest.tags)}"
         )
+        if plan := cycle.load_for(latest):
+            text += "\n" + cycle.describe(plan, latest)
+        return text
     return pomtext("No Pomodoro session found.")
 
 
-def start(runtime: int) -> str:
-    if session.is_in_progress():
+def format_tags(tags: tuple[str, ...]) -> str:
+    return "".join(f" #{tag}" for tag in tags)
+
+
+@trace.traced("pomodoro.start")
+def start(
+    runtime: int, state: SessionState | None = None, tags: tuple[str, ...] = ()
+) -> str:
+    state = state if state is not None else session.load()
+    if state.is_in_progress():
         return pomtext("A Pomodoro session is already in progress.")
     pid, start_time = session.start_timer(runtime=runtime)
-    session_data = {
-        "pid": pid,
-        "start": start_time.strftime(utils.DATETIME_FORMAT),
-        "stop": "",
-        "end": "",
-        "runtime": runtime,
-        "status": Status.RUNNING.value,
-    }
-    session.write(session_data)
-    return status()
+    started = SessionState(
+        pid=pid, start=start_time, runtime=runtime, status=Status.RUNNING, tags=tags
+    )
+    session.save(started, event="start")
+    return status(started)
+
+
+@trace.traced("pomodoro.start_plan")
+def start_plan(
+    spec: str, state: SessionState | None = None, tags: tuple[str, ...] = ()
+) -> str:
+    """
+    Start a cycle plan (e.g. "4x25m/5m/15m", see `utils.phases_from_string()`) as a
+    single session.
+    """
+    state = state if state is not None else session.load()
+    if state.is_in_progress():
+        return pomtext("A Pomodoro session is already in progress.")
+    try:
+        phases = utils.phases_from_string(spec)
+    except ValueError as ex:
+        sys.exit(pomtext(str(ex)))
+    runtime = sum(phase_runtime for _, phase_runtime in phases)
+    # The plan has to be in place before its timer starts
+    start_time = datetime.now()
+    cycle.save(
+        cycle.Plan(int(start_time.timestamp()), spec, phases, [start_time.timestamp()])
+    )
+    pid, _ = session.start_timer(runtime=runtime, plan=True)
+    started = SessionState(
+        pid=pid,
+        start=start_time,
+        runtime=runtime,
+        status=Status.RUNNING,
+        tags=tags,
+        plan=spec,
+    )
+    session.save(started, event="start")
+    return status(started)
 
 
-def stop() -> str:
+@trace.traced("pomodoro.stop")
+def stop(state: SessionState | None = None) -> str:
     """
     Stop or pause the current Pomodoro session.
 
     The session can be resumed later.
     """
-    if session.has_ended():
+    state = state if state is not None else session.load()
+    if state.has_ended():
         return utils.no_session_in_progress_message("nothing to stop.")
-    if session.is_running():
-        session.kill_current()
-        stopped_data = {
-            "pid": "",
-            "stop": datetime.now().strftime(utils.DATETIME_FORMAT),
-            "status": Status.STOPPED.value,
-        }
-        session.update(stopped_data)
-        elapsed, remaining = session.get_runtimes()
+    if state.is_running():
+        # The timer process is paused in place (and resumed by `resume()` later);
+        # if that fails, there's no timer left to resume.
+        if not session.pause_timer(state):
+            session.kill_current(state)
+            state.pid = None
+        state.stop = datetime.now()
+        state.status = Status.STOPPED
+        session.save(state, event="pause")
+        elapsed, remaining = session.get_runtimes(state)
         print(
             utils.pomtext(
                 f"Session stopped - ({utils.time_elapsed_remaining_message(elapsed=elapsed, remaining=remaining)})"
             )
         )
     # If session has already been stopped, this would just echo the current 'stopped' status.
-    return status()
+    return status(state)
 
 
-def resume():
+@trace.traced("pomodoro.resume")
+def resume(state: SessionState | None = None) -> str:
     """
     Resume a stopped Pomodoro session.
     """
-    if session.has_ended():
+    state = state if state is not None else session.load()
+    if state.has_ended():
         return utils.no_session_in_progress_message("nothing to resume.")
-    if session.is_running():
+    if state.is_running() or not state:
         # 'Resuming' an already running session shouldn't do anything.
-        return status()
-
-    elapsed, remaining = session.get_runtimes()
-
-    # Start the timer again with the remaining runtime
-    # (NOTE start_time stays the same!)
-    pid, _ = session.start_timer(remaining)
-    session.update(
-        {
-            "pid": pid,
-            "status": Status.RUNNING.value,
-            # Remove the 'stop' field by setting it to an empty string
-            "stop": "",
-        }
-    )
+        return status(state)
+
+    elapsed, remaining = session.get_runtimes(state)
+
+    # Resume the paused timer or, if it's gone, start a new one with the remaining
+    # runtime (NOTE start_time stays the same!)
+    if not session.resume_timer(state):
+        plan = cycle.load_for(state) is not None
+        state.pid, _ = session.start_timer(remaining, plan=plan)
+    state.status = Status.RUNNING
+    # Remove the 'stop' time (and account for the pause)
+    if state.stop is not None:
+        state.paused += int((datetime.now() - state.stop).total_seconds())
+    state.stop = None
+    session.save(state, event="resume")
     print(
         utils.pomtext(
             f"Session restarted - ({utils.time_elapsed_remaining_message(elapsed=elapsed, remaining=remaining)})"
         )
     )
-    return status()
+    return status(state)
 
 
-def finish(end_time: datetime, with_status: Status = Status.FINISHED) -> Status:
+@trace.traced("pomodoro.finish")
+def finish(
+    end_time: datetime,
+    with_status: Status = Status.FINISHED,
+    state: SessionState | None = None,
+    latency: float | None = None,
+) -> Status:
     """
     Finish pomodoro session (either because time is up or it has been cancelled).
+
+    `latency` is the number of seconds the timer fired late (if it's known).
     """
-    # Update session file
-    end_str = end_time.strftime(utils.DATETIME_FORMAT)
-    updated = session.update({"stop": "", "end": end_str, "status": with_status.value})
-    history.create_db_table()
-    history.archive_pomodoro_session(updated)
+    state = state if state is not None else session.load()
+    # Update session file (a session that's cancelled while paused ends its pause)
+    if state.stop:
+        state.paused += int((end_time - state.stop).total_seconds())
+    state.stop = None
+    state.end = end_time
+    state.status = with_status
+    session.save(state, event="finish" if with_status == Status.FINISHED else "cancel")
+    # sqlite3 is only needed when a session gets archived
+    import yapom.history as history
+
+    history.ensure_schema()
+    latency_ms = round(latency * 1000) if latency is not None else None
+    if plan := cycle.load_for(state):
+        # Phases are archived as sessions of their own - all of them at once
+        rows = cycle.history_rows(
+            plan, end_time, with_status, latency_ms, paused=state.paused
+        )
+        history.archive_pomodoro_sessions([{**row, "tags": state.tags} for row in rows])
+        cycle.remove()
+        return with_status
+    session_data = state.to_dict()
+    if latency_ms is not None:
+        session_data["latency_ms"] = latency_ms
+    history.archive_pomodoro_session(session_data)
     return with_status
 
 
-def cancel() -> str:
+@trace.traced("pomodoro.cancel")
+def cancel(state: SessionState | None = None) -> str:
     """
     Cancel the current Pomodoro session if it hasn't finished.
     """
-    if session.has_ended():
+    state = state if state is not None else session.load()
+    if state.has_ended() or not state:
         return utils.no_session_in_progress_message("nothing to cancel.")
     try:
-        session.kill_current()
-        finish(end_time=datetime.now(), with_status=Status.CANCELLED)
-        return status()
+        session.kill_current(state)
+        finish(end_time=datetime.now(), with_status=Status.CANCELLED, state=state)
+        return status(state)
     except Exception as ex:
         sys.exit(f"Failed to cancel current Pomodoro session: {ex}")
 
 
-def reset() -> str:
+@trace.traced("pomodoro.reset")
+def reset(state: SessionState | None = None) -> str:
     """
     Reset the start date of the current session to 'now' and then restart it.
     """
-    if session.has_ended():
+    state = state if state is not None else session.load()
+    if state.has_ended() or not state:
         return utils.no_session_in_progress_message("nothing to reset / restart")
-    session.kill_current()
-    updated = session.update({"status": Status.CANCELLED.value})
-    return start(int(updated["runtime"]))
+    if plan := cycle.load_for(state):
+        # Plans start over from the first phase (with a new timer)
+        session.kill_current(state)
+        state.status = Status.CANCELLED
+        return start_plan(plan.spec, state=state, tags=state.tags)
+    if session.restart_timer(state):
+        state.start = datetime.now()
+        state.stop, state.paused = None, 0
+        state.status = Status.RUNNING
+        session.save(state, event="reset")
+        return status(state)
+    session.kill_current(state)
+    # The session gets replaced right away, so there's no need to save it here
+    state.status = Status.CANCELLED
+    return start(state.runtime, state=state, tags=state.tags)
 
 
-def repeat() -> str:
+@trace.traced("pomodoro.repeat")
+def repeat(state: SessionState | None = None) -> str:
     """
     Run the last Pomodoro session again with the same runtime.
     """
-    if session.is_in_progress():
+    state = state if state is not None else session.load()
+    if state.is_in_progress():
         return utils.pomtext(
             "Can't repeat last session because it's still in progress."
         )
-    last_runtime = int(session.read()["runtime"])
-    return start(runtime=last_runtime)
+    if not state:
+        return pomtext("No Pomodoro session found.")
+    if state.plan:
+        return start_plan(state.plan, state=state, tags=state.tags)
+    return start(runtime=state.runtime, state=state, tags=state.tags)
@@ -0,0 +1,156 @@
+"""
+Fixed-layout binary session record (`~/.yapom/.session.bin`).
+
+This is an alternative to the session journal (see `yapom.journal`) for setups that
+poll `yapom status` at a high frequency: reading the record is a single
+`struct.unpack_from` on a memory-mapped file - no JSON parsing, no `strptime`.
+
+The record is opt-in: it's used as soon as it exists (see `migrate()`). The JSON
+session file remains the fallback and export format (see `export()`).
+"""
+
+import os
+import mmap
+import struct
+
+import yapom.utils as utils
+
+from pathlib import Path
+from datetime import datetime
+
+from yapom.utils import STATUS_CODES
+
+RECORD_FILE = ".session.bin"
+VERSION = 4
+
+# version, status code, (padding), pid, runtime, start, stop, end, paused
+# Timestamps are epoch seconds; 0 means "not set". The layout is followed by the
+# session's plan spec and its tags (UTF-8, one per line - the first line is the plan,
+# empty if there is none) up to the end of the record.
+LAYOUT = struct.Struct("<BBxxiqdddq")
+# Older records are still read: version 1 (without `paused`), 2 (without tags) and 3
+# (without the plan)
+LAYOUT_V1 = struct.Struct("<BBxxiqddd")
+
+STATUS_BY_CODE = {code: status for status, code in STATUS_CODES.items()}
+
+
+class RecordError(ValueError):
+    pass
+
+
+def get_filepath() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / RECORD_FILE
+
+
+def exists() -> bool:
+    return get_filepath().exists()
+
+
+def pack(state) -> bytes:
+    def epoch(value: datetime | None) -> float:
+        return value.timestamp() if value else 0.0
+
+    return (
+        LAYOUT.pack(
+            VERSION,
+            STATUS_CODES.get(state.status, 0),
+            state.pid or 0,
+            state.runtime,
+            epoch(state.start),
+            epoch(state.stop),
+            epoch(state.end),
+            state.paused,
+        )
+        + "\n".join((state.plan or "", *state.tags)).encode()
+    )
+
+
+def unpack(buffer) -> tuple:
+    """
+    Unpack a session record into a tuple (pid, start, stop, end, runtime, status,
+    paused, tags, plan).
+    """
+    if not len(buffer):
+        raise RecordError("Empty session record")
+    version = buffer[0]
+    layout = {VERSION: LAYOUT, 3: LAYOUT, 2: LAYOUT, 1: LAYOUT_V1}.get(version)
+    if layout is None:
+        raise RecordError(f"Unsupported session record version: {version}")
+    if len(buffer) < layout.size:
+        raise RecordError(f"Session record too short: {len(buffer)} bytes")
+    _, status, pid, runtime, start, stop, end, *paused = layout.unpack_from(buffer)
+
+    def to_datetime(epoch: float) -> datetime | None:
+        return datetime.fromtimestamp(epoch) if epoch else None
+
+    lines = bytes(buffer[layout.size :]).decode().split("\n")
+    plan = lines.pop(0) if version == VERSION else ""
+    return (
+        pid or None,
+        to_datetime(start),
+        to_datetime(stop),
+        to_datetime(end),
+        runtime,
+        STATUS_BY_CODE.get(status),
+        paused[0] if paused else 0,
+        tuple(tag for tag in lines if tag),
+        plan or None,
+    )
+
+
+def read(path: Path | None = None) -> tuple:
+    """
+    Read the session record via `mmap`.
+
+    Raises `FileNotFoundError` if there's no record and `RecordError` if the record
+    can't be used.
+    """
+    with (path or get_filepath()).open("rb") as fp:
+        try:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return unpack(mapped)
+        except ValueError as ex:
+            # mmap refuses to map empty files
+            raise RecordError(str(ex)) from ex
+
+
+def write(state, path: Path | None = None):
+    """
+    Write the session record atomically (write to a temporary file, then rename).
+
+    Readers that still have the old record mapped keep seeing a consistent record.
+    """
+    path = path or utils.home_dir() / RECORD_FILE
+    # One temporary file per writer - e.g. the timer finishing while the user pauses
+    tmp_path = path.with_name(f"{RECORD_FILE}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as fp:
+        fp.write(pack(state))
+    os.replace(tmp_path, path)
+
+
+def migrate() -> Path:
+    """
+    Convert the session journal (or the JSON session file) into a session record.
+
+    From then on, the session is stored in the record only.
+    """
+    import yapom.session as session
+    import yapom.journal as journal
+
+    state = session.load()
+    write(state)
+    journal.remove()
+    return get_filepath()
+
+
+def export() -> Path:
+    """
+    Convert the session record back into a JSON session file and remove the record.
+    """
+    import yapom.session as session
+
+    state = session.load()
+    session.save_json(state)
+    get_filepath().unlink(missing_ok=True)
+    return session.get_filepath()
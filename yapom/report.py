@@ -0,0 +1,140 @@
+"""
+`yapom report` - statistics about archived Pomodoro sessions.
+"""
+
+import sys
+import math
+
+import yapom.utils as utils
+import yapom.history as history
+
+from datetime import datetime, date, time, timedelta
+
+from yapom.utils import Status, pomtext
+
+DEFAULT_PERIOD = "--day"
+
+
+def parse_period(
+    args: list[str], today: date | None = None
+) -> tuple[str, datetime | None, datetime | None]:
+    """
+    Parse the report period from command line arguments.
+
+    Supported: `--day`, `--week`, `--month` (each up to and including today) and
+    `--range A..B` (dates as YYYY-MM-DD, both inclusive; either can be omitted).
+
+    Returns a tuple (label, since, until) - `until` is exclusive, `None` means
+    "no limit".
+    """
+    today = today or date.today()
+    tomorrow = datetime.combine(today + timedelta(days=1), time())
+    match args or [DEFAULT_PERIOD]:
+        case ["--day"]:
+            return "today", datetime.combine(today, time()), tomorrow
+        case ["--week"]:
+            monday = today - timedelta(days=today.weekday())
+            return "this week", datetime.combine(monday, time()), tomorrow
+        case ["--month"]:
+            first = today.replace(day=1)
+            return "this month", datetime.combine(first, time()), tomorrow
+        case ["--range", date_range]:
+            start_str, separator, end_str = date_range.partition("..")
+            if not separator:
+                raise ValueError(f"Invalid range (expected A..B): '{date_range}'")
+            since = datetime.strptime(start_str, "%Y-%m-%d") if start_str else None
+            until = (
+                datetime.strptime(end_str, "%Y-%m-%d") + timedelta(days=1)
+                if end_str
+                else None
+            )
+            return f"{start_str or '...'} - {end_str or '...'}", since, until
+    raise ValueError(f"Invalid report period: '{' '.join(args)}'")
+
+
+# Percentiles of the timers' firing latency shown in reports
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def percentile(histogram: list[tuple[int, int]], p: int | float) -> int:
+    """
+    Nearest-rank percentile `p` (0 < p <= 100) of a non-empty histogram, given as
+    sorted tuples (value, count).
+    """
+    total = sum(count for _, count in histogram)
+    rank = max(math.ceil(total * p / 100), 1)
+    for value, count in histogram:
+        rank -= count
+        if rank <= 0:
+            return value
+    return histogram[-1][0]
+
+
+def format_latencies(histogram: list[tuple[int, int]]) -> str:
+    parts = [f"p{p} {percentile(histogram, p)}ms" for p in LATENCY_PERCENTILES]
+    parts.append(f"max {histogram[-1][0]}ms")
+    return ", ".join(parts)
+
+
+def report(
+    label: str,
+    since: datetime | None,
+    until: datetime | None,
+    tag: str | None = None,
+) -> str:
+    history.ensure_schema()
+    summary = history.summarize(since=since, until=until, tag=tag)
+    count = sum(count for count, _ in summary.values())
+    if tag is not None:
+        label = f"{label} tagged #{tag}"
+    if not count:
+        return pomtext(f"No Pomodoro sessions {label}.")
+    total = sum(total for _, total in summary.values())
+    finished, _ = summary.get(Status.FINISHED, (0, 0))
+    cancelled, _ = summary.get(Status.CANCELLED, (0, 0))
+    completion_rate = finished / (finished + cancelled) if finished + cancelled else 0
+
+    lines = [
+        pomtext(f"Report ({label})"),
+        f"  sessions:        {count}",
+        f"  total time:      {utils.format_runtime(total) or '-'}",
+        f"  average time:    {utils.format_runtime(total // count) or '-'}",
+        f"  completion rate: {completion_rate:.0%}",
+    ]
+    for status in Status:
+        if status in summary:
+            status_count, status_total = summary[status]
+            time_spent = utils.format_runtime(status_total) or "-"
+            lines.append(f"  {status.value:<16} {status_count} ({time_spent})")
+    # Latencies are about the timers, not about what the sessions were for
+    if tag is None and (latencies := history.latencies(since=since, until=until)):
+        lines.append(f"  timer latency:   {format_latencies(latencies)}")
+    return "\n".join(lines)
+
+
+def report_by_tag(label: str, since: datetime | None, until: datetime | None) -> str:
+    history.ensure_schema()
+    summary = history.summarize_by_tag(since=since, until=until)
+    if not summary:
+        return pomtext(f"No tagged Pomodoro sessions {label}.")
+    width = max(len(tag) for tag in summary) + 1
+    lines = [pomtext(f"Report by tag ({label})")]
+    # Most time spent first
+    for tag, (count, total) in sorted(summary.items(), key=lambda item: -item[1][1]):
+        time_spent = utils.format_runtime(total) or "-"
+        lines.append(f"  #{tag:<{width}} {count} ({time_spent})")
+    return "\n".join(lines)
+
+
+def main(args: list[str]) -> str:
+    try:
+        tag = utils.pop_option(args, "--tag")
+        by_tag = utils.pop_flag(args, "--by-tag")
+        label, since, until = parse_period(args)
+    except ValueError as ex:
+        sys.exit(pomtext(str(ex)))
+    if by_tag:
+        if tag is not None:
+            sys.exit(pomtext("Use either --by-tag or --tag TAG, not both."))
+        return report_by_tag(label, since, until)
+    return report(label, since, until, tag)
@@ -0,0 +1,150 @@
+"""
+The timer scheduler: a single background process that fires all named timers (see
+`yapom.timers`).
+
+The scheduler keeps the deadlines of all running timers in a min-heap and sleeps
+until the earliest one - or until it's woken up by `WAKE` (SIGUSR1), which the CLI
+sends after every change of the timer store. It exits as soon as no timer is left
+running, and is started again by the next `yapom start --name ...`.
+
+Its PID is kept in `~/.yapom/scheduler.pid`. Both the scheduler and the CLI only look
+at (or change) the PID file while holding the timer store's lock, so a timer can't
+be added in the moment the scheduler decides to exit.
+"""
+
+import os
+import sys
+import time
+import heapq
+import signal
+
+import yapom.utils as utils
+import yapom.timers as timers
+
+from pathlib import Path
+from datetime import datetime
+
+from yapom.utils import Status
+
+WAKE = signal.SIGUSR1
+PID_FILE = "scheduler.pid"
+# Command line marker of the scheduler process (see `is_scheduler()`)
+MARKER = b"yapom.scheduler"
+# Check the clock at least this often (the system might have been suspended)
+MAX_WAIT = 5.0
+
+
+def get_pid_path() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / PID_FILE
+
+
+def read_pid() -> int | None:
+    try:
+        return int(get_pid_path().read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def is_scheduler(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as file:
+            return MARKER in file.read()
+    except OSError:
+        return False
+
+
+def wake():
+    """
+    Wake up the scheduler - or start it, if it isn't running.
+
+    Must be called while holding the timer store's lock (see `timers.locked()`).
+    """
+    if (pid := read_pid()) and pid != os.getpid() and is_scheduler(pid):
+        try:
+            os.kill(pid, WAKE)
+            return
+        except ProcessLookupError:
+            pass
+    if pid == os.getpid():
+        return
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, "-S", "-m", "yapom.scheduler"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        start_new_session=True,
+        cwd=Path(__file__).parent.parent,
+    )
+
+
+def deadlines(named_timers: dict) -> list[tuple[float, str]]:
+    """
+    Min-heap of (deadline, name) of all running timers.
+    """
+    heap = [
+        (timer.deadline, name)
+        for name, timer in named_timers.items()
+        if timer.is_running() and timer.deadline is not None
+    ]
+    heapq.heapify(heap)
+    return heap
+
+
+def fire(due: list[tuple[float, str]]) -> list:
+    """
+    Finish the timers that are due - if they haven't been changed in the meantime.
+
+    Returns the finished timers.
+    """
+    finished = []
+    with timers.locked():
+        named_timers = timers.load()
+        now = datetime.now()
+        for deadline, name in due:
+            timer = named_timers.get(name)
+            if timer and timer.is_running() and timer.deadline == deadline:
+                timer.end, timer.status = now, Status.FINISHED
+                finished.append(timer)
+        if finished:
+            timers.save(named_timers)
+    return finished
+
+
+def run():
+    # Queue wake-ups until `sigtimedwait()` picks them up
+    signal.signal(WAKE, lambda signum, frame: None)
+    signal.pthread_sigmask(signal.SIG_BLOCK, {WAKE})
+    with timers.locked():
+        if (pid := read_pid()) and pid != os.getpid() and is_scheduler(pid):
+            # Somebody else was faster
+            return
+        get_pid_path().write_text(str(os.getpid()))
+        heap = deadlines(timers.load())
+
+    while True:
+        now = time.time()
+        due = []
+        while heap and heap[0][0] <= now:
+            due.append(heapq.heappop(heap))
+        if due:
+            for timer in fire(due):
+                timers.archive(timer)
+                import yapom.notify as notify
+
+                notify.notify(f"Timer '{timer.name}' finished!")
+        if not heap:
+            with timers.locked():
+                if not (heap := deadlines(timers.load())):
+                    get_pid_path().unlink(missing_ok=True)
+                    return
+            continue
+        timeout = min(heap[0][0] - time.time(), MAX_WAIT)
+        if timeout > 0 and signal.sigtimedwait({WAKE}, timeout) is not None:
+            # The timer store has changed
+            with timers.locked():
+                heap = deadlines(timers.load())
+
+
+if __name__ == "__main__":
+    run()
@@ -1,110 +1,307 @@
 import os
 import json
-import signal
-import subprocess
 
 import yapom.utils as utils
+import yapom.trace as trace
+import yapom.hooks as hooks
+import yapom.record as record
+import yapom.journal as journal
+import yapom.supervisor as supervisor
 
 from pathlib import Path
 from datetime import datetime
 
 from yapom.utils import Status, DATETIME_FORMAT
 
+# Instead of `typing.TYPE_CHECKING` - importing `typing` would slow down every command
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from yapom.daemon import Timers
 
-def get_filepath() -> Path:
-    if not (session_file := utils.home_dir() / Path(".session")).exists():
-        session_file.touch()
-    return session_file
+SESSION_FILE = ".session"
+# Timer processes sleep through the whole session: skip the `site` module (and all
+# `.pth` files) - `pomtimer.py` only needs the standard library and yapom itself,
+# which is next to it.
+TIMER_PYTHON_FLAGS = ("-S",)
+
+# Set by yapomd (see `yapom.daemon`): timers are then scheduled in the daemon's event
+# loop instead of spawning one `pomtimer.py` process per session.
+timer_backend: "Timers | None" = None
+
+
+class SessionState:
+    """
+    Snapshot of the current (or latest) Pomodoro session.
+
+    A command loads the session state once (see `load()`), hands it to whatever
+    needs it and writes it back (at most) once via `save()`.
+
+    `paused` is the number of seconds the session has been paused for (not counting
+    a pause that's still going on, which began at `stop`). `tags` are the labels the
+    session was started with (`yapom start --tag ...`), `plan` is the spec of the
+    cycle plan the session runs (`yapom plan ...`, see `yapom.cycle`) - if any.
+    """
+
+    __slots__ = (
+        "pid",
+        "start",
+        "stop",
+        "end",
+        "runtime",
+        "status",
+        "paused",
+        "tags",
+        "plan",
+    )
+
+    def __init__(
+        self,
+        pid: int | None = None,
+        start: datetime | None = None,
+        stop: datetime | None = None,
+        end: datetime | None = None,
+        runtime: int = 0,
+        status: Status | None = None,
+        paused: int = 0,
+        tags: tuple[str, ...] = (),
+        plan: str | None = None,
+    ):
+        self.pid = pid
+        self.start = start
+        self.stop = stop
+        self.end = end
+        self.runtime = runtime
+        self.status = status
+        self.paused = paused
+        self.tags = tuple(tags)
+        self.plan = plan
+
+    def __bool__(self) -> bool:
+        # An 'empty' state means that there's no session (yet)
+        return self.status is not None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"SessionState({fields})"
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SessionState":
+        def to_datetime(value: str | None) -> datetime | None:
+            return datetime.strptime(value, DATETIME_FORMAT) if value else None
 
+        status = data.get("status")
+        return cls(
+            pid=data.get("pid") or None,
+            start=to_datetime(data.get("start")),
+            stop=to_datetime(data.get("stop")),
+            end=to_datetime(data.get("end")),
+            runtime=int(data.get("runtime") or 0),
+            status=Status(status) if status else None,
+            paused=int(data.get("paused") or 0),
+            tags=data.get("tags") or (),
+            plan=data.get("plan") or None,
+        )
 
-def read() -> dict:
-    with get_filepath().open("r") as session_file:
-        try:
-            return json.load(session_file)
-        except json.decoder.JSONDecodeError:
-            return {}
+    def to_dict(self) -> dict:
+        """
+        Return the session state in the format of the session file.
+        """
 
+        def to_str(value: datetime | None) -> str:
+            return value.strftime(DATETIME_FORMAT) if value else ""
 
-def write(data: dict) -> dict:
-    current_session_file = read()
-    current_session_file.update(data)
-    with get_filepath().open(mode="w+") as session_file:
-        json.dump(obj=current_session_file, fp=session_file)
-        return current_session_file
+        return {
+            "pid": self.pid or "",
+            "start": to_str(self.start),
+            "stop": to_str(self.stop),
+            "end": to_str(self.end),
+            "runtime": self.runtime,
+            "status": self.status.value if self.status else "",
+            "paused": self.paused,
+            "tags": list(self.tags),
+            "plan": self.plan or "",
+        }
 
+    def is_running(self) -> bool:
+        return self.status == Status.RUNNING
 
-def update(data: dict) -> dict:
-    current = read()
-    current.update(data)
-    write(current)
-    return current
+    def is_in_progress(self) -> bool:
+        return self.status in {Status.STOPPED, Status.RUNNING}
 
+    def has_ended(self) -> bool:
+        return self.status in {Status.FINISHED, Status.CANCELLED}
 
-def get_current_status() -> Status | None:
+
+def get_filepath() -> Path:
+    return utils.home_dir() / Path(SESSION_FILE)
+
+
+@trace.traced("session.load")
+def load() -> SessionState:
     """
-    Get the status of the current (or latest) Pomodoro session.
+    Read the current session and return it as `SessionState`.
+
+    The binary session record is used if there is one (see `yapom.record`),
+    otherwise the last record of the session journal (see `yapom.journal`) and, if
+    the journal is empty, the JSON session file. If there's none of them, an 'empty'
+    session state is returned.
     """
-    if current_status := read().get("status"):
-        return Status(current_status)
-    return None
+    try:
+        return SessionState(*record.read())
+    except FileNotFoundError:
+        pass
+    except record.RecordError as ex:
+        print(utils.pomtext(f"[WARNING] Ignoring session record: {ex}"))
+    if (entry := journal.tail()) is not None:
+        return SessionState.from_dict(entry)
+    return load_json()
 
 
-def is_running() -> bool:
-    return get_current_status() == Status.RUNNING
+@trace.traced("session.save")
+def save(state: SessionState, event: str = "update") -> SessionState:
+    """
+    Write the session state - `event` is the transition that led to it (start,
+    pause, resume, ...), as recorded in the session journal. Afterwards, the hooks
+    of the event are started (see `yapom.hooks`).
+    """
+    if record.exists():
+        record.write(state)
+    else:
+        journal.append(event, state.to_dict())
+    hooks.fire(event, state)
+    return state
 
 
-def is_in_progress() -> bool:
-    return get_current_status() in {Status.STOPPED, Status.RUNNING}
+def load_json() -> SessionState:
+    session_file = Path(utils.HOME_DIR).expanduser() / SESSION_FILE
+    try:
+        with session_file.open("r") as fp:
+            return SessionState.from_dict(json.load(fp))
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        return SessionState()
 
 
-def has_ended() -> bool:
-    return get_current_status() in {Status.FINISHED, Status.CANCELLED}
+def save_json(state: SessionState) -> SessionState:
+    write_json(state.to_dict())
+    return state
 
 
-def get_runtimes() -> tuple[int, int]:
+def write_json(data: dict):
     """
-    Returns tuple (`time elapsed`, `time remaining`).
+    Write the JSON session file atomically (write to a temporary file, then rename).
     """
-    data = read()
-    original_runtime = data["runtime"]
-    if has_ended():
-        return int(original_runtime), 0
-    start_time_str = data["start"]
-    if time_ref := data.get("stop"):
-        time_ref = datetime.strptime(time_ref, DATETIME_FORMAT)
-    else:
-        time_ref = datetime.now()
+    path = get_filepath()
+    tmp_path = path.with_name(f"{SESSION_FILE}.{os.getpid()}.tmp")
+    with tmp_path.open("w") as session_file:
+        json.dump(obj=data, fp=session_file)
+        session_file.flush()
+        os.fsync(session_file.fileno())
+    os.replace(tmp_path, path)
 
-    start_time = datetime.strptime(start_time_str, DATETIME_FORMAT)
 
-    # Calculate elapsed time and remaining runtime
-    time_elapsed = int((time_ref - start_time).total_seconds())
-    remaining_runtime = int(original_runtime - time_elapsed)
+def get_runtimes(state: SessionState, now: datetime | None = None) -> tuple[int, int]:
+    """
+    Returns tuple (`time elapsed`, `time remaining`).
+    """
+    if state.has_ended():
+        return state.runtime, 0
+    if state.start is None:
+        # No session (yet)
+        return 0, state.runtime
+    time_ref = state.stop or now or datetime.now()
+
+    # Calculate elapsed time (without the time spent paused) and remaining runtime
+    time_elapsed = int((time_ref - state.start).total_seconds()) - state.paused
+    remaining_runtime = int(state.runtime - time_elapsed)
 
     return time_elapsed, remaining_runtime
 
 
-def start_timer(runtime: int) -> tuple[int, datetime]:
+def start_timer(runtime: int, plan: bool = False) -> tuple[int, datetime]:
     """
     Start a new Pomodoro timer for the current session.
 
+    With `plan=True`, the timer walks through the phases of the current cycle plan
+    (see `yapom.cycle`) - `runtime` is what's left of the whole plan then.
+
     Returns PID and start time (as `datetime`) for the timer process.
     """
+    if timer_backend and not plan:
+        return timer_backend.start(runtime)
+    import subprocess
+
+    requested_at = datetime.now()
     pomtimer_file = Path(__file__).parent / Path("../pomtimer.py")
-    process = subprocess.Popen(f"python3 {pomtimer_file} {runtime}".split())
-    return process.pid, datetime.now()
+    # The timer deducts its own startup time from the runtime (see `supervisor`)
+    with trace.span("session.start_timer"):
+        process = subprocess.Popen(
+            [
+                "python3",
+                *TIMER_PYTHON_FLAGS,
+                str(pomtimer_file),
+                str(runtime),
+                str(requested_at.timestamp()),
+                *(["--plan"] if plan else []),
+            ]
+        )
+    return process.pid, requested_at
 
 
-def kill_current() -> int | None:
+@trace.traced("session.kill_current")
+def kill_current(state: SessionState) -> int | None:
     """
-    (Try to) Kill the currently running pomodoro process (i.e. 'python3 session.py').
+    (Try to) Kill the currently running pomodoro process (i.e. 'python3 pomtimer.py').
 
     If successful, return the PID of this process; if no such process exists at the
     moment, return `None`.
     """
-    try:
-        pid = read()["pid"]
-        os.kill(pid, signal.SIGKILL)
-        return pid
-    except ProcessLookupError:
+    if not (pid := state.pid):
         return None
+    if timer_backend and pid == os.getpid():
+        timer_backend.cancel()
+        return pid
+    return pid if supervisor.terminate(pid) else None
+
+
+@trace.traced("session.pause_timer")
+def pause_timer(state: SessionState) -> bool:
+    """
+    Pause the timer of the current session without stopping its process.
+
+    Returns `False` if the timer couldn't be paused (e.g. because it's gone).
+    """
+    if not state.pid:
+        return False
+    if timer_backend and state.pid == os.getpid():
+        return timer_backend.pause()
+    return supervisor.pause(state.pid)
+
+
+@trace.traced("session.resume_timer")
+def resume_timer(state: SessionState) -> bool:
+    """
+    Resume the (paused) timer of the current session.
+
+    Returns `False` if there's no paused timer to resume - a new one has to be
+    started with `start_timer()` then.
+    """
+    if not state.pid:
+        return False
+    if timer_backend and state.pid == os.getpid():
+        return timer_backend.resume()
+    return supervisor.resume(state.pid)
+
+
+@trace.traced("session.restart_timer")
+def restart_timer(state: SessionState) -> bool:
+    """
+    Restart the timer of the current session with its original runtime.
+
+    Returns `False` if there's no timer to restart.
+    """
+    if not state.pid:
+        return False
+    if timer_backend and state.pid == os.getpid():
+        timer_backend.start(state.runtime)
+        return True
+    return supervisor.restart(state.pid)
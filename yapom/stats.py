@@ -0,0 +1,386 @@
+"""
+`yapom stats` - streaks, a heatmap of the last year and runtimes per weekday.
+
+These are computed from a columnar cache of the session history (`~/.yapom/stats/`):
+start time, runtime and status of every session - one file per column, each of them
+a plain array of fixed-size values (see `COLUMNS`), in the order of the sessions
+table. `yapom stats` maps the columns into memory and processes them column by
+column - with NumPy if it's installed, in pure Python otherwise.
+
+`history.archive_pomodoro_session(s)` append new sessions to the cache (if there is
+one). Sessions that got into the history some other way (e.g. `yapom import`) are
+appended by the next `yapom stats`, and if the cache doesn't match the history at
+all (e.g. because it's missing, or sessions were removed or compacted), it's rebuilt.
+"""
+
+import os
+import json
+import mmap
+
+import yapom.utils as utils
+import yapom.history as history
+
+from array import array
+from pathlib import Path
+from datetime import date
+from contextlib import contextmanager, ExitStack
+from collections import Counter, defaultdict
+
+from yapom.utils import Status, STATUS_CODES, pomtext
+
+# Instead of `typing.TYPE_CHECKING` - importing `typing` would slow down every command
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Literal
+
+    # The (integer) typecodes that `memoryview.cast()` knows
+    Typecode = Literal["q", "i", "B"]
+
+STATS_DIR = "stats"
+META_FILE = "meta.json"
+LOCK_FILE = "lock"
+VERSION = 1
+# Column name -> `array` typecode
+COLUMNS: "dict[str, Typecode]" = {"start": "q", "runtime": "i", "status": "B"}
+COLUMN_SUFFIX = ".col"
+REBUILD_BATCH_SIZE = 50_000
+
+SELECT_SESSIONS = """SELECT id, start, runtime, status FROM sessions
+                     WHERE id > ?
+                     ORDER BY id"""
+# Compacted sessions don't have an id in the history (anymore). Sessions that are in
+# the history as well (after an interrupted compaction) are read from there.
+SELECT_COMPACTED = """SELECT 0, start, runtime, status FROM cold.sessions AS c
+                      WHERE NOT EXISTS (
+                          SELECT 1 FROM main.sessions AS m
+                          WHERE m.start = c.start AND m.status = c.status
+                            AND m.runtime = c.runtime AND m.end IS c.end
+                      )"""
+
+DAY = 86400
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+HEATMAP_WEEKS = 53
+# Heatmap cells: no session, then (up to) 25 / 50 / 75 / 100% of the busiest day
+HEATMAP_LEVELS = "·░▒▓█"
+RUNTIME_PERCENTILES = (50, 90)
+
+
+def get_dirpath() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / STATS_DIR
+
+
+def exists() -> bool:
+    return (get_dirpath() / META_FILE).exists()
+
+
+@contextmanager
+def locked():
+    """
+    Hold the (exclusive) lock of the cache.
+    """
+    import fcntl
+
+    directory = get_dirpath()
+    directory.mkdir(exist_ok=True)
+    with open(directory / LOCK_FILE, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_meta() -> dict | None:
+    """
+    Return the metadata of the cache - `None` if there's no (intact) cache.
+
+    The metadata is written after the columns, so if the columns don't have exactly
+    as many rows as the metadata says, an update was interrupted.
+    """
+    directory = get_dirpath()
+    try:
+        with (directory / META_FILE).open("r") as fp:
+            meta = json.load(fp)
+        sizes = {
+            name: (directory / (name + COLUMN_SUFFIX)).stat().st_size
+            for name in COLUMNS
+        }
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get("version") != VERSION:
+        return None
+    for name, typecode in COLUMNS.items():
+        if sizes[name] != meta["rows"] * array(typecode).itemsize:
+            return None
+    return meta
+
+
+def write_meta(meta: dict):
+    path = get_dirpath() / META_FILE
+    tmp_path = path.with_name(f"{META_FILE}.{os.getpid()}.tmp")
+    with tmp_path.open("w") as fp:
+        json.dump(meta, fp)
+    os.replace(tmp_path, path)
+
+
+def append_rows(rows, meta: dict, mode: str = "ab") -> dict:
+    """
+    Append the sessions (id, start, runtime, status) `rows` to the columns and
+    update the metadata accordingly. Returns the new metadata.
+    """
+    from itertools import islice
+
+    directory = get_dirpath()
+    meta = dict(meta)
+    files = {name: (directory / (name + COLUMN_SUFFIX)).open(mode) for name in COLUMNS}
+    rows = iter(rows)
+    try:
+        while batch := list(islice(rows, REBUILD_BATCH_SIZE)):
+            ids, starts, runtimes, statuses = zip(*batch)
+            for name, values in zip(COLUMNS, (starts, runtimes, statuses)):
+                array(COLUMNS[name], values).tofile(files[name])
+            meta["last_id"], meta["rows"] = ids[-1], meta["rows"] + len(batch)
+    finally:
+        for fp in files.values():
+            fp.close()
+    write_meta(meta)
+    return meta
+
+
+def append(conn):
+    """
+    Append the sessions that have been added to the history since the cache was
+    last updated - if there is a cache. This is what keeps the cache up to date when
+    sessions are archived.
+    """
+    if not exists():
+        return
+    with locked():
+        if (meta := read_meta()) is not None:
+            append_rows(conn.execute(SELECT_SESSIONS, (meta["last_id"],)), meta)
+
+
+def rebuild(conn) -> dict:
+    """
+    Recreate the cache from the whole history - compacted sessions (see
+    `history.compact()`) first. Returns the new metadata.
+    """
+    meta = {"version": VERSION, "last_id": 0, "rows": 0}
+    meta = append_rows(history.iter_partitions(SELECT_COMPACTED), meta, mode="wb")
+    meta["compacted"], meta["last_id"] = meta["rows"], 0
+    return append_rows(conn.execute(SELECT_SESSIONS, (0,)), meta)
+
+
+def sync(conn) -> dict:
+    """
+    Bring the cache up to date with the history (see the module docstring) and return
+    its metadata.
+    """
+    with locked():
+        last_id, count = conn.execute(
+            "SELECT IFNULL(MAX(id), 0), COUNT(*) FROM sessions"
+        ).fetchone()
+        if (meta := read_meta()) is None:
+            return rebuild(conn)
+        cached = meta["rows"] - meta["compacted"]
+        if meta["last_id"] == last_id and cached == count:
+            return meta
+        # Unless sessions have been removed, only the new ones are missing
+        (new,) = conn.execute(
+            "SELECT COUNT(*) FROM sessions WHERE id > ?", (meta["last_id"],)
+        ).fetchone()
+        if cached + new != count:
+            return rebuild(conn)
+        return append_rows(conn.execute(SELECT_SESSIONS, (meta["last_id"],)), meta)
+
+
+@contextmanager
+def mapped_columns(rows: int):
+    """
+    Map the columns into memory and yield them as a dict (column name -> memoryview
+    of the first `rows` values).
+    """
+    directory = get_dirpath()
+    with ExitStack() as stack:
+        columns = {}
+        for name, typecode in COLUMNS.items():
+            if not rows:
+                columns[name] = memoryview(b"").cast(typecode)
+                continue
+            fp = stack.enter_context((directory / (name + COLUMN_SUFFIX)).open("rb"))
+            mapped = stack.enter_context(
+                mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            )
+            # Sessions archived in the meantime aren't included
+            view = memoryview(mapped).cast(typecode)[:rows]
+            stack.callback(view.release)
+            columns[name] = view
+        yield columns
+
+
+# --- Stats ---
+#
+# Days are local days, numbered since 1970-01-01. Both implementations boil the
+# finished sessions down to the number of sessions per (day, runtime); everything
+# else is computed from that.
+
+
+def utc_offsets(first: int, last: int) -> tuple[int, list[int]]:
+    """
+    Return the first UTC day of [`first`, `last`] (epoch seconds) and the local UTC
+    offset of each day from there on (at noon - DST changes at night).
+    """
+    import time
+
+    base = first // DAY
+    return base, [
+        time.localtime(day * DAY + DAY // 2).tm_gmtoff
+        for day in range(base, last // DAY + 1)
+    ]
+
+
+def count_sessions_python(columns: dict) -> Counter:
+    from itertools import compress
+
+    finished = list(map(STATUS_CODES[Status.FINISHED].__eq__, columns["status"]))
+    starts = list(compress(columns["start"], finished))
+    if not starts:
+        return Counter()
+    runtimes = compress(columns["runtime"], finished)
+    base, offsets = utc_offsets(min(starts), max(starts))
+    days = [(start + offsets[start // DAY - base]) // DAY for start in starts]
+    return Counter(zip(days, runtimes))
+
+
+def count_sessions_numpy(columns: dict, numpy) -> Counter:
+    finished = (
+        numpy.frombuffer(columns["status"], dtype=numpy.uint8)
+        == (STATUS_CODES[Status.FINISHED])
+    )
+    starts = numpy.frombuffer(columns["start"], dtype=numpy.int64)[finished]
+    if not len(starts):
+        return Counter()
+    runtimes = numpy.frombuffer(columns["runtime"], dtype=numpy.int32)[finished]
+    base, offsets = utc_offsets(int(starts.min()), int(starts.max()))
+    days = (starts + numpy.array(offsets)[starts // DAY - base]) // DAY
+    # Runtimes are 32-bit, so (day, runtime) fits into a single 64-bit key
+    keys, counts = numpy.unique(
+        (days << 32) | runtimes.astype(numpy.int64), return_counts=True
+    )
+    return Counter(
+        {
+            (key >> 32, key & 0xFFFFFFFF): count
+            for key, count in zip(keys.tolist(), counts.tolist())
+        }
+    )
+
+
+def count_sessions(columns: dict) -> Counter:
+    """
+    Count the finished sessions per (local day, runtime).
+    """
+    try:
+        import numpy
+    except ImportError:
+        return count_sessions_python(columns)
+    return count_sessions_numpy(columns, numpy)
+
+
+def streaks(days: list[int]) -> list[tuple[int, int]]:
+    """
+    Return the streaks (first day, last day) of the sorted days `days`.
+    """
+    result = []
+    for day in days:
+        if result and result[-1][1] == day - 1:
+            result[-1] = (result[-1][0], day)
+        else:
+            result.append((day, day))
+    return result
+
+
+def to_date(day: int) -> date:
+    return date.fromordinal(day + EPOCH_ORDINAL)
+
+
+def format_streak(streak: tuple[int, int] | None) -> str:
+    if streak is None:
+        return "0 days"
+    first, last = streak
+    length = last - first + 1
+    return (
+        f"{length} day{'s' if length != 1 else ''} ({to_date(first)} - {to_date(last)})"
+    )
+
+
+def format_heatmap(per_day: Counter, today: int) -> list[str]:
+    """
+    Return a heatmap of the sessions per day of the last `HEATMAP_WEEKS` weeks: one
+    line per weekday, one column per week (oldest first).
+    """
+    monday = today - to_date(today).weekday()
+    first = monday - 7 * (HEATMAP_WEEKS - 1)
+    busiest = max((per_day[day] for day in range(first, today + 1)), default=0)
+    lines = []
+    for weekday, name in enumerate(WEEKDAYS):
+        cells = []
+        for week in range(HEATMAP_WEEKS):
+            day = first + 7 * week + weekday
+            if day > today:
+                break
+            count = per_day.get(day, 0)
+            level = -(-count * (len(HEATMAP_LEVELS) - 1) // busiest) if count else 0
+            cells.append(HEATMAP_LEVELS[level])
+        lines.append(f"  {name} {''.join(cells)}")
+    return lines
+
+
+def stats(today: date | None = None) -> str:
+    history.ensure_schema()
+    meta = sync(history.get_db_connection())
+    with mapped_columns(meta["rows"]) as columns:
+        sessions = count_sessions(columns)
+    if not sessions:
+        return pomtext("No finished Pomodoro sessions yet.")
+
+    today_day = (today or date.today()).toordinal() - EPOCH_ORDINAL
+    per_day, per_weekday = Counter(), defaultdict(Counter)
+    for (day, runtime), count in sessions.items():
+        per_day[day] += count
+        per_weekday[to_date(day).weekday()][runtime] += count
+    all_streaks = streaks(sorted(per_day))
+    longest = max(all_streaks, key=lambda streak: streak[1] - streak[0])
+    # Today's streak isn't broken until the day is over
+    current = all_streaks[-1] if all_streaks[-1][1] >= today_day - 1 else None
+
+    import yapom.report as report
+
+    lines = [
+        pomtext(f"Stats ({sum(per_day.values())} finished sessions)"),
+        f"  current streak:  {format_streak(current)}",
+        f"  longest streak:  {format_streak(longest)}",
+        "",
+        f"  sessions per day (last {HEATMAP_WEEKS} weeks):",
+        *format_heatmap(per_day, today_day),
+        "",
+        f"  runtime per weekday ({' / '.join(f'p{p}' for p in RUNTIME_PERCENTILES)}):",
+    ]
+    for weekday, name in enumerate(WEEKDAYS):
+        if not (runtimes := per_weekday.get(weekday)):
+            continue
+        histogram = sorted(runtimes.items())
+        percentiles = " / ".join(
+            utils.format_runtime(report.percentile(histogram, p)) or "0s"
+            for p in RUNTIME_PERCENTILES
+        )
+        lines.append(f"  {name} {percentiles} ({runtimes.total()} sessions)")
+    return "\n".join(lines)
+
+
+def main(args: list[str]) -> str:
+    if args:
+        import sys
+
+        sys.exit(pomtext(f"Unknown stats option: '{' '.join(args)}'"))
+    return stats()
@@ -0,0 +1,193 @@
+"""
+Timer supervision: pause, resume and restart a running timer process in place.
+
+A timer process (`pomtimer.py`) counts down in `countdown()` and reacts to the
+following signals:
+
+- `PAUSE` (SIGUSR1): stop the countdown, keep the remaining time
+- `RESUME` (SIGUSR2): continue a paused countdown
+- `RESTART` (SIGHUP): start the countdown over with the original runtime
+
+So pausing and resuming a session doesn't require killing the timer and spawning a
+new interpreter.
+
+Timer processes stay resident for a whole session, so this module sticks to a few
+builtin modules (no `pathlib`, no other yapom modules).
+
+Signals are sent through a pidfd (`os.pidfd_open`) where available. The process
+behind a pidfd is verified to be a yapom timer *before* the signal is sent, and
+since a pidfd always refers to the same process, a PID that has been reused in the
+meantime can't receive the signal.
+"""
+
+import os
+import time
+import signal
+
+PAUSE = signal.SIGUSR1
+RESUME = signal.SIGUSR2
+RESTART = signal.SIGHUP
+TIMER_SIGNALS = {PAUSE, RESUME, RESTART}
+
+# Command line markers of processes that may receive timer signals
+TIMER_PROCESSES = (b"pomtimer.py",)
+
+# Clock for timer deadlines (see `boottime()`) and maximum time between checks
+CLOCK = getattr(time, "CLOCK_BOOTTIME", time.CLOCK_MONOTONIC)
+MAX_WAIT = 5.0
+
+# A freshly spawned timer needs a moment until it handles timer signals
+READY_TIMEOUT = 2.0
+READY_POLL_INTERVAL = 0.005
+
+
+def block_signals():
+    """
+    Block timer signals, so that they're queued until `countdown()` picks them up
+    (instead of terminating the process).
+
+    Timer processes should call this as early as possible.
+    """
+    for signum in TIMER_SIGNALS:
+        # Never actually called - but it shows up in `/proc/<pid>/status` and lets
+        # `handles_timer_signals()` know that the timer is ready.
+        signal.signal(signum, _ignore)
+    signal.pthread_sigmask(signal.SIG_BLOCK, TIMER_SIGNALS)
+
+
+def _ignore(signum, frame):
+    pass
+
+
+def boottime() -> float:
+    """
+    Seconds on a clock that keeps running while the system is suspended and isn't
+    affected by changes to the system time (e.g. NTP).
+    """
+    return time.clock_gettime(CLOCK)
+
+
+def countdown(
+    runtime: int | float, requested_at: float | None = None, clock=boottime
+) -> float:
+    """
+    Wait for `runtime` seconds, honoring pause / resume / restart signals.
+
+    `requested_at` is the (epoch) time at which the timer was requested - time that
+    passed since then (e.g. for starting the interpreter) is deducted from the first
+    countdown.
+
+    Returns how late the countdown finished, in seconds (i.e. the firing latency).
+    """
+    block_signals()
+    startup_delay = max(time.time() - requested_at, 0.0) if requested_at else 0.0
+    deadline = clock() + runtime - startup_delay
+    while (remaining := deadline - clock()) > 0:
+        # Wake up every now and then: a relative timeout doesn't include time spent
+        # in suspend, the deadline (on a suspend-aware clock) does.
+        timeout = min(remaining, MAX_WAIT)
+        if (info := signal.sigtimedwait(TIMER_SIGNALS, timeout)) is None:
+            continue
+        signum = info.si_signo
+        if signum == PAUSE:
+            remaining = deadline - clock()
+            # Block (without using any CPU) until the timer is resumed or restarted
+            while (signum := signal.sigwait(TIMER_SIGNALS)) == PAUSE:
+                pass
+        if signum == RESUME:
+            deadline = clock() + remaining
+        elif signum == RESTART:
+            deadline = clock() + runtime
+    return clock() - deadline
+
+
+def is_timer_process(pid: int) -> bool | None:
+    """
+    Check whether `pid` is a yapom timer process.
+
+    Returns `None` if that can't be determined (i.e. there's no `/proc`).
+    """
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as file:
+            cmdline = file.read()
+    except FileNotFoundError:
+        return False if os.path.exists("/proc/self") else None
+    except OSError:
+        return None
+    return any(marker in cmdline for marker in TIMER_PROCESSES)
+
+
+def handles_timer_signals(pid: int) -> bool | None:
+    """
+    Check whether `pid` handles timer signals (see `block_signals()`).
+
+    Returns `None` if that can't be determined (i.e. there's no `/proc`).
+    """
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            status = file.read()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("SigCgt:"):
+            caught = int(line.split()[1], 16)
+            return all(caught & (1 << (signum - 1)) for signum in TIMER_SIGNALS)
+    return None
+
+
+def wait_until_ready(pid: int, timeout: float = READY_TIMEOUT) -> bool:
+    deadline = time.monotonic() + timeout
+    while handles_timer_signals(pid) is False:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(READY_POLL_INTERVAL)
+    return True
+
+
+def send(pid: int, signum: int) -> bool:
+    """
+    Send a signal to the timer process `pid`.
+
+    Returns `False` if there's no such process or if it isn't a yapom timer.
+    """
+    if is_timer_process(pid) is False:
+        return False
+    if signum in TIMER_SIGNALS and not wait_until_ready(pid):
+        return False
+    if hasattr(os, "pidfd_open"):
+        try:
+            pidfd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            return False
+        try:
+            if is_timer_process(pid) is False:
+                return False
+            # If the signal can be delivered, the process behind the pidfd is still
+            # alive - so it's also the process that `is_timer_process()` looked at.
+            signal.pidfd_send_signal(pidfd, signum)
+            return True
+        except ProcessLookupError:
+            return False
+        finally:
+            os.close(pidfd)
+    try:
+        os.kill(pid, signum)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+def pause(pid: int) -> bool:
+    return send(pid, PAUSE)
+
+
+def resume(pid: int) -> bool:
+    return send(pid, RESUME)
+
+
+def restart(pid: int) -> bool:
+    return send(pid, RESTART)
+
+
+def terminate(pid: int) -> bool:
+    return send(pid, signal.SIGKILL)
@@ -0,0 +1,17 @@
+import pytest
+
+import yapom.utils as utils
+import yapom.history as history
+
+
+@pytest.fixture
+def yapom_home(tmp_path, monkeypatch):
+    """
+    Point yapom's HOME directory to a temporary directory, so that tests never touch
+    the real `~/.yapom` (and never show any notifications).
+    """
+    monkeypatch.setattr(utils, "HOME_DIR", str(tmp_path))
+    monkeypatch.setenv("YAPOM_HOME", str(tmp_path))
+    monkeypatch.setenv("YAPOM_NOTIFIER", "none")
+    yield tmp_path
+    history.close_db_connection()
@@ -0,0 +1,50 @@
+"""
+Helpers shared by the tests and the benchmarks (see `benchmarks/`).
+"""
+
+import io
+import sqlite3
+
+from pathlib import Path
+from datetime import datetime
+
+import pytest
+
+import yapom.utils as utils
+import yapom.history as history
+
+from yapom.utils import Status, STATUS_CODES
+
+
+class NullWriter(io.TextIOBase):
+    """
+    A text stream that throws away everything written to it.
+    """
+
+    def write(self, s: str) -> int:
+        return len(s)
+
+
+def fill_history(home: Path, rows: int):
+    """
+    Add `rows` sessions (one every 5 minutes, starting 2015-01-01; every 4th one
+    cancelled) to the history in `home`.
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(utils, "HOME_DIR", str(home))
+        history.ensure_schema()
+        history.close_db_connection()
+    # Generating the rows in SQLite is a lot faster than doing it in Python
+    query = """WITH RECURSIVE seq(i) AS (
+                   SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i < ?
+               )
+               INSERT INTO sessions (start, end, runtime, status)
+               SELECT ? + i * 300,
+                      ? + i * 300 + 240,
+                      240,
+                      CASE WHEN i % 4 = 3 THEN ? ELSE ? END
+               FROM seq"""
+    first = history.to_epoch(datetime(2015, 1, 1))
+    cancelled, finished = STATUS_CODES[Status.CANCELLED], STATUS_CODES[Status.FINISHED]
+    with sqlite3.connect(Path(home) / history.DATABASE) as conn:
+        conn.execute(query, (rows - 1, first, first, cancelled, finished))
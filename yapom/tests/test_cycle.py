@@ -0,0 +1,148 @@
+import time
+
+from datetime import datetime
+
+import pytest
+
+import yapom.cycle as cycle
+import yapom.history as history
+import yapom.pomodoro as pomodoro
+import yapom.session as session
+
+from yapom.utils import Status, WORK, SHORT_BREAK, LONG_BREAK
+from yapom.session import SessionState
+
+PHASES = [(WORK, 1500), (SHORT_BREAK, 300), (WORK, 1500), (LONG_BREAK, 900)]
+START = datetime(2025, 6, 1, 9, 0, 0)
+
+
+def make_plan(*phase_offsets: int) -> cycle.Plan:
+    """
+    A plan started at `START`, whose phases began `phase_offsets` seconds later.
+    """
+    start = START.timestamp()
+    return cycle.Plan(
+        int(start), "2x25m/5m/15m", PHASES, [start + offset for offset in phase_offsets]
+    )
+
+
+@pytest.mark.parametrize(
+    "elapsed, phase",
+    [
+        (0, (0, 0)),
+        (1499, (0, 1499)),
+        (1500, (1, 0)),
+        (2000, (2, 200)),
+        (9999, (3, 900)),
+    ],
+)
+def test_locate(elapsed, phase):
+    assert make_plan().locate(elapsed) == phase
+
+
+def test_describe():
+    plan = make_plan(0, 1500)
+    state = SessionState(pid=42, start=START, runtime=4200, status=Status.RUNNING)
+    now = datetime.fromtimestamp(START.timestamp() + 1600)
+    assert cycle.describe(plan, state, now=now) == (
+        "  phase 2/4: short break (3m20s left) | next: work 25m, long break 15m"
+    )
+
+
+def test_describe_paused_plan():
+    # The first phase was paused for 2 minutes, the current one for 30 seconds
+    plan = make_plan(0, 1620)
+    state = SessionState(
+        pid=42, start=START, runtime=4200, status=Status.RUNNING, paused=150
+    )
+    now = datetime.fromtimestamp(START.timestamp() + 1620 + 130)
+    assert cycle.describe(plan, state, now=now).startswith(
+        "  phase 2/4: short break (3m20s left)"
+    )
+    # ... and while it's paused, the time left stays the same
+    state.stop, state.status = now, Status.STOPPED
+    later = datetime.fromtimestamp(now.timestamp() + 600)
+    assert "(3m20s left)" in cycle.describe(plan, state, now=later)
+
+
+def test_history_rows_of_paused_plan():
+    # Paused for 2 minutes in the first work phase, 1 minute in the break and 45
+    # seconds in the second work phase
+    plan = make_plan(0, 1620, 1980)
+    end_time = datetime.fromtimestamp(START.timestamp() + 1980 + 645)
+    rows = cycle.history_rows(plan, end_time, Status.CANCELLED, paused=225)
+    assert [(row["end"], row["paused"]) for row in rows] == [
+        ("2025-06-01 09:27:00", 120),
+        ("2025-06-01 09:43:45", 45),
+    ]
+
+
+def test_history_rows_of_cancelled_plan():
+    plan = make_plan(0, 1500, 1800)
+    end_time = datetime.fromtimestamp(START.timestamp() + 2400)
+    rows = cycle.history_rows(plan, end_time, Status.CANCELLED)
+    # Breaks aren't archived - the phase that's running when the plan is cancelled
+    # is cancelled, all others have finished
+    assert [(row["start"], row["end"], row["status"]) for row in rows] == [
+        ("2025-06-01 09:00:00", "2025-06-01 09:25:00", "finished"),
+        ("2025-06-01 09:30:00", "2025-06-01 09:40:00", "cancelled"),
+    ]
+
+
+def test_plan_runs_in_a_single_timer(yapom_home, monkeypatch):
+    notifications = yapom_home / "notifications"
+    monkeypatch.setenv("YAPOM_NOTIFIER", f"file:{notifications}")
+    pomodoro.start_plan("2x1s/1s")
+    pid = session.load().pid
+
+    deadline = time.monotonic() + 10
+    while (state := session.load()).is_in_progress():
+        assert time.monotonic() < deadline
+        # The same timer process walks through all phases
+        assert state.pid == pid
+        time.sleep(0.1)
+
+    assert state.status == Status.FINISHED
+    assert state.plan == "2x1s/1s"
+    history.ensure_schema()
+    # The session is saved right before its phases are archived
+    while not (summary := history.summarize(since=datetime(2000, 1, 1))):
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+    assert summary[Status.FINISHED][0] == 2
+    # ... and the last notification is sent after that
+    while len(notifications.read_text().splitlines()) < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+    assert notifications.read_text().splitlines() == [
+        "Work finished - next: short break (1s)",
+        "Short break finished - next: work (1s)",
+        "Pomodoro session finished!",
+    ]
+
+
+def test_cancel_applies_to_whole_plan(yapom_home):
+    pomodoro.start_plan("4x25m/5m/15m")
+    state = session.load()
+    assert "phase 1/8: work" in pomodoro.status(state)
+    pomodoro.cancel(state)
+
+    assert session.load().status == Status.CANCELLED
+    history.ensure_schema()
+    assert history.summarize(since=datetime(2000, 1, 1)) == {Status.CANCELLED: (1, 0)}
+    # The plan is gone with its session
+    assert not cycle.get_filepath().exists()
+
+
+def test_repeat_plan(yapom_home):
+    pomodoro.start_plan("2x25m/5m")
+    pomodoro.cancel()
+    assert cycle.load() is None
+    pomodoro.repeat()
+    state = session.load()
+    try:
+        assert state.runtime == 2 * 1500 + 300
+        plan = cycle.load_for(state)
+        assert plan is not None and plan.spec == "2x25m/5m"
+    finally:
+        pomodoro.cancel(state)
@@ -0,0 +1,69 @@
+import sys
+import time
+import subprocess
+
+import pytest
+
+import yapom.client as client
+import yapom.session as session
+
+from pathlib import Path
+
+from yapom.utils import Status
+
+YAPOMD_PY = Path(__file__).parent.parent.parent / "yapomd.py"
+
+
+@pytest.fixture
+def yapomd(yapom_home):
+    process = subprocess.Popen([sys.executable, str(YAPOMD_PY)])
+    for _ in range(100):
+        if client.send({"command": "status"}) is not None:
+            break
+        time.sleep(0.05)
+    yield process
+    if process.poll() is None:
+        client.request("shutdown")
+        process.wait(timeout=5)
+
+
+def request(command: str, **arguments) -> str:
+    output = client.request(command, **arguments)
+    assert output is not None, "yapomd isn't running"
+    return output
+
+
+def test_no_daemon(yapom_home):
+    assert client.request("status") is None
+    # Stale socket files are ignored as well
+    client.get_socket_path().touch()
+    assert client.request("status") is None
+
+
+def test_daemon_owns_timer(yapomd):
+    assert "RUNNING" in request("start", runtime=60)
+    state = session.load()
+    assert state.pid == yapomd.pid and state.status == Status.RUNNING
+
+    assert "Session stopped" in request("stop")
+    assert "Session restarted" in request("resume")
+    assert session.load().pid == yapomd.pid
+
+    assert "CANCELLED" in request("cancel")
+    assert yapomd.poll() is None
+
+
+def test_unknown_command(yapomd):
+    with pytest.raises(client.DaemonError):
+        client.request("explode")
+
+
+def test_shutdown_hands_over_running_session(yapomd):
+    client.request("start", runtime=60)
+    client.request("shutdown")
+    yapomd.wait(timeout=5)
+
+    state = session.load()
+    assert state.status == Status.RUNNING and state.pid != yapomd.pid
+    session.kill_current(state)
+    assert not client.get_socket_path().exists()
@@ -0,0 +1,99 @@
+import io
+import csv
+import json
+import tracemalloc
+
+from datetime import datetime
+
+import pytest
+
+import yapom.export as export
+import yapom.history as history
+
+from yapom.tests.helpers import NullWriter, fill_history
+
+SESSION = {
+    "start": "2025-06-01 12:00:00",
+    "end": "2025-06-01 12:25:00",
+    "runtime": 1500,
+    "status": "finished",
+}
+# ... as exported
+EXPORTED = {**SESSION, "latency_ms": None, "timer": None, "paused": 0, "tags": []}
+
+
+def test_csv_matches_archived_sessions(yapom_home):
+    history.ensure_schema()
+    history.archive_pomodoro_session(SESSION)
+    output = io.StringIO()
+    export.export(output, "csv")
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert rows == [
+        {
+            **SESSION,
+            "runtime": "1500",
+            "latency_ms": "",
+            "timer": "",
+            "paused": "0",
+            "tags": "",
+        }
+    ]
+
+
+def test_jsonl_with_range(yapom_home):
+    history.ensure_schema()
+    history.archive_pomodoro_session(SESSION)
+    history.archive_pomodoro_session({**SESSION, "start": "2025-07-01 12:00:00"})
+    output = io.StringIO()
+    export.export(
+        output, "jsonl", since=datetime(2025, 6, 1), until=datetime(2025, 6, 2)
+    )
+    assert [json.loads(line) for line in output.getvalue().splitlines()] == [EXPORTED]
+
+
+def test_everything_is_exported(yapom_home):
+    history.ensure_schema()
+    session = {
+        **SESSION,
+        "latency_ms": 12,
+        "timer": "review",
+        "paused": 60,
+        "tags": ["projectX", "review"],
+    }
+    history.archive_pomodoro_session(session)
+    output = io.StringIO()
+    export.export(output, "jsonl")
+    assert json.loads(output.getvalue()) == session
+
+
+def test_unknown_format(yapom_home):
+    with pytest.raises(ValueError):
+        export.export(io.StringIO(), "xml")
+
+
+def peak_memory(export_format: str) -> int:
+    tracemalloc.start()
+    export.export(NullWriter(), export_format)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+@pytest.mark.parametrize("export_format", export.FORMATS)
+def test_constant_memory(yapom_home, export_format):
+    fill_history(yapom_home, 1_000)
+    small_peak = peak_memory(export_format)
+    fill_history(yapom_home, 20_000)
+    # 20x the rows, (roughly) the same memory
+    assert peak_memory(export_format) < 2 * small_peak
+
+
+@pytest.mark.parametrize("export_format", export.FORMATS)
+def test_exports_every_row(yapom_home, export_format):
+    rows = 10_000
+    fill_history(yapom_home, rows)
+    output = io.StringIO()
+    export.export(output, export_format)
+    # (CSV has a header)
+    header = 1 if export_format == "csv" else 0
+    assert len(output.getvalue().splitlines()) == rows + header
@@ -0,0 +1,491 @@
+import sqlite3
+
+from pathlib import Path
+from datetime import datetime
+
+import pytest
+
+import yapom.utils as utils
+import yapom.stats as stats
+import yapom.history as history
+
+from yapom.utils import Status, STATUS_CODES
+
+DUMMY_SQL = Path(__file__).parent / "dummy.sql"
+
+
+@pytest.fixture
+def legacy_db(yapom_home) -> Path:
+    """
+    History database as created before schema versioning (see `dummy.sql`).
+    """
+    db_path = yapom_home / history.DATABASE
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(DUMMY_SQL.read_text())
+    return db_path
+
+
+def test_fresh_database(yapom_home):
+    history.ensure_schema()
+    with history.get_db_connection() as conn:
+        assert history.get_schema_version(conn) == history.SCHEMA_VERSION
+        indexes = {
+            name
+            for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+    assert {"sessions_start", "sessions_status"} <= indexes
+
+
+def test_migrate_legacy_database(legacy_db):
+    history.ensure_schema()
+    with sqlite3.connect(legacy_db) as conn:
+        assert history.get_schema_version(conn) == history.SCHEMA_VERSION
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+        rows = conn.execute("SELECT * FROM sessions").fetchall()
+    assert columns == [
+        "id",
+        "start",
+        "end",
+        "runtime",
+        "status",
+        "latency_ms",
+        "timer",
+        "paused",
+    ]
+    assert rows == [
+        (
+            1,
+            int(datetime(2025, 6, 1, 12, 0, 0).timestamp()),
+            int(datetime(2025, 6, 1, 12, 5, 0).timestamp()),
+            300,
+            STATUS_CODES[Status.FINISHED],
+            None,
+            None,
+            0,
+        )
+    ]
+
+
+def test_session_ids_are_not_reused(legacy_db):
+    history.ensure_schema()
+    conn = history.get_db_connection()
+    # The ids of existing sessions are kept
+    assert conn.execute("SELECT id FROM sessions").fetchall() == [(1,)]
+    conn.execute("DELETE FROM sessions")
+    history.archive_pomodoro_session(
+        {"start": "2025-06-02 12:00:00", "end": "", "runtime": 1, "status": "running"}
+    )
+    assert conn.execute("SELECT id FROM sessions").fetchall() == [(2,)]
+    assert history.check_rollups() == []
+
+
+def test_migration_is_idempotent(legacy_db):
+    history.ensure_schema()
+    history.ensure_schema()
+    with sqlite3.connect(legacy_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone() == (1,)
+
+
+def test_newer_schema_is_rejected(yapom_home):
+    with history.get_db_connection() as conn:
+        conn.execute(f"PRAGMA user_version = {history.SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        history.ensure_schema()
+
+
+def test_archive(yapom_home):
+    history.ensure_schema()
+    history.archive_pomodoro_session(
+        {
+            "start": "2025-06-01 12:00:00",
+            "end": "2025-06-01 12:25:00",
+            "runtime": 1500,
+            "status": "finished",
+        }
+    )
+    summary = history.summarize(since=datetime(2025, 6, 1), until=datetime(2025, 6, 2))
+    assert summary == {Status.FINISHED: (1, 1500)}
+
+
+def archive_many(home: str, worker: int, count: int, barrier) -> int:
+    import yapom.utils as utils
+
+    utils.HOME_DIR = home
+    barrier.wait()
+    for i in range(count):
+        history.ensure_schema()
+        history.archive_pomodoro_session(
+            {
+                "start": datetime(2025, 6, 1, worker, i).strftime(
+                    utils.DATETIME_FORMAT
+                ),
+                "end": "",
+                "runtime": 60,
+                "status": "finished",
+            }
+        )
+    return count
+
+
+def test_concurrent_archiving(yapom_home):
+    import multiprocessing
+
+    workers, sessions_per_worker = 12, 50
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Manager().Barrier(workers)
+    with context.Pool(workers) as pool:
+        results = pool.starmap(
+            archive_many,
+            [
+                (str(yapom_home), worker, sessions_per_worker, barrier)
+                for worker in range(workers)
+            ],
+        )
+    assert sum(results) == workers * sessions_per_worker
+    with history.get_db_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        count = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    assert count == workers * sessions_per_worker
+
+
+def test_connection_is_reused(yapom_home):
+    assert history.get_db_connection() is history.get_db_connection()
+    history.close_db_connection()
+    assert history.get_db_connection() is not None
+
+
+def test_legacy_sessions_are_rolled_up(legacy_db):
+    history.ensure_schema()
+    assert history.check_rollups() == []
+    rollups = history.get_db_connection().execute("SELECT * FROM daily_rollup")
+    assert rollups.fetchall() == [("2025-06-01", STATUS_CODES[Status.FINISHED], 1, 300)]
+
+
+def test_rollups_follow_sessions(yapom_home):
+    history.ensure_schema()
+    for start, end, status in [
+        ("2025-06-01 09:00:00", "2025-06-01 09:25:00", "finished"),
+        ("2025-06-01 10:00:00", "2025-06-01 10:05:00", "cancelled"),
+        ("2025-06-01 23:50:00", "2025-06-02 00:15:00", "finished"),
+        ("2025-06-02 09:00:00", "", "stopped"),
+    ]:
+        history.archive_pomodoro_session(
+            {"start": start, "end": end, "runtime": 1500, "status": status}
+        )
+    assert history.check_rollups() == []
+
+    # Whole days come from the rollups, anything else from the sessions table
+    day, next_day = datetime(2025, 6, 1), datetime(2025, 6, 2)
+    expected = {Status.FINISHED: (2, 3000), Status.CANCELLED: (1, 300)}
+    assert history.summarize(since=day, until=next_day) == expected
+    assert history.summarize(since=day, until=next_day.replace(second=1)) == expected
+
+    with history.get_db_connection() as conn:
+        conn.execute(
+            "DELETE FROM sessions WHERE status = ?", (STATUS_CODES[Status.CANCELLED],)
+        )
+    assert history.check_rollups() == []
+    assert history.summarize(since=day, until=next_day) == {Status.FINISHED: (2, 3000)}
+
+
+def test_rebuild_rollups(yapom_home):
+    history.ensure_schema()
+    history.archive_pomodoro_session(
+        {
+            "start": "2025-06-01 09:00:00",
+            "end": "2025-06-01 09:25:00",
+            "runtime": 1500,
+            "status": "finished",
+        }
+    )
+    with history.get_db_connection() as conn:
+        conn.execute("UPDATE daily_rollup SET count = 7")
+        conn.execute("INSERT INTO daily_rollup VALUES ('2020-01-01', 1, 1, 60)")
+    assert [(day, raw) for day, _, raw, _ in history.check_rollups()] == [
+        ("2020-01-01", (None, None)),
+        ("2025-06-01", (1, 1500)),
+    ]
+    assert history.rebuild_rollups() == 1
+    assert history.check_rollups() == []
+
+
+def test_latencies(yapom_home):
+    history.ensure_schema()
+    for start, latency_ms in [
+        ("12:00", 7),
+        ("12:30", None),
+        ("13:00", 2),
+        ("13:30", 2),
+    ]:
+        history.archive_pomodoro_session(
+            {
+                "start": f"2025-06-01 {start}:00",
+                "end": "",
+                "runtime": 1500,
+                "status": "finished",
+                "latency_ms": latency_ms,
+            }
+        )
+    assert history.latencies(datetime(2025, 6, 1), datetime(2025, 6, 2)) == [
+        (2, 2),
+        (7, 1),
+    ]
+    assert history.latencies(since=datetime(2025, 6, 1, 12, 30)) == [(2, 2)]
+
+
+@pytest.fixture
+def other_db(yapom_home, monkeypatch, tmp_path_factory) -> Path:
+    """
+    History database of another machine with three sessions.
+    """
+    other_home = tmp_path_factory.mktemp("other")
+    monkeypatch.setattr(utils, "HOME_DIR", str(other_home))
+    history.ensure_schema()
+    history.archive_pomodoro_sessions(
+        [
+            {
+                "start": f"2025-06-0{day} 12:00:00",
+                "end": f"2025-06-0{day} 12:25:00",
+                "runtime": 1500,
+                "status": "finished",
+                "paused": 60,
+                "tags": ["projectX"] if day > 1 else [],
+            }
+            for day in (1, 2, 3)
+        ]
+    )
+    monkeypatch.setattr(utils, "HOME_DIR", str(yapom_home))
+    history.ensure_schema()
+    return other_home / history.DATABASE
+
+
+def test_merge(yapom_home, other_db):
+    history.archive_pomodoro_session(
+        {
+            "start": "2025-06-01 12:00:00",
+            "end": "2025-06-01 12:25:00",
+            "runtime": 1500,
+            "status": "finished",
+        }
+    )
+    # The session of June 1st is already there
+    assert history.merge(other_db) == 2
+    assert history.merge(other_db) == 0
+    assert history.check_rollups() == []
+
+    conn = history.get_db_connection()
+    assert conn.execute("SELECT COUNT(*), SUM(paused) FROM sessions").fetchone() == (
+        3,
+        120,
+    )
+    assert history.summarize_by_tag() == {"projectX": (2, 2880)}
+
+    # Only sessions added since the last merge are read
+    with sqlite3.connect(other_db) as other:
+        other.execute(
+            "UPDATE sessions SET start = start + 86400 * 30, end = end + 86400 * 30"
+        )
+        other.execute(
+            "INSERT INTO sessions (start, end, runtime, status) VALUES (1, 2, 1, ?)",
+            (STATUS_CODES[Status.FINISHED],),
+        )
+    assert history.merge(other_db) == 1
+
+
+def test_merge_after_deleting_the_latest_session(yapom_home, other_db):
+    assert history.merge(other_db) == 3
+    # The id of the deleted session isn't given out again - the new session is past
+    # the high-water mark
+    with sqlite3.connect(other_db) as other:
+        other.execute("DELETE FROM sessions WHERE id = 3")
+        other.execute(
+            "INSERT INTO sessions (start, end, runtime, status) VALUES (1, 2, 1, ?)",
+            (STATUS_CODES[Status.FINISHED],),
+        )
+    assert history.merge(other_db) == 1
+
+
+def test_merge_skips_compacted_sessions(yapom_home, other_db):
+    assert history.merge(other_db) == 3
+    assert history.compact(datetime(2025, 6, 2)) == {2025: 1}
+    history.get_db_connection().execute("DELETE FROM merge_sources")
+    # The session of June 1st is in the partition now
+    assert history.merge(other_db) == 0
+    assert len(list(history.iter_sessions())) == 3
+    assert history.summarize_by_tag() == {"projectX": (2, 2880)}
+
+
+def test_merge_compacted_database(yapom_home, other_db, monkeypatch):
+    # The other database has moved the sessions of June 1st and 2nd to its partition
+    monkeypatch.setattr(utils, "HOME_DIR", str(other_db.parent))
+    assert history.compact(datetime(2025, 6, 3)) == {2025: 2}
+    monkeypatch.setattr(utils, "HOME_DIR", str(yapom_home))
+
+    assert history.merge(other_db) == 3
+    assert history.merge(other_db) == 0
+    assert history.check_rollups() == []
+    assert len(list(history.iter_sessions())) == 3
+    assert history.summarize_by_tag() == {"projectX": (2, 2880)}
+    # Sessions that are in the partitions of both histories aren't copied again
+    assert history.compact(datetime(2025, 6, 3)) == {2025: 2}
+    history.get_db_connection().execute("DELETE FROM merge_sources")
+    assert history.merge(other_db) == 0
+    assert len(list(history.iter_sessions())) == 3
+
+
+def test_merge_into_itself(yapom_home):
+    history.ensure_schema()
+    history.archive_pomodoro_session(
+        {"start": "2025-06-01 12:00:00", "end": "", "runtime": 1, "status": "running"}
+    )
+    assert history.merge(history.get_db_path()) == 0
+    assert history.get_db_connection().execute(
+        "SELECT COUNT(*) FROM merge_sources"
+    ).fetchone() == (0,)
+
+
+def test_merge_missing_database(yapom_home, tmp_path):
+    history.ensure_schema()
+    with pytest.raises(FileNotFoundError):
+        history.merge(tmp_path / "missing.db")
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_compact(yapom_home):
+    history.ensure_schema()
+    history.archive_pomodoro_sessions(
+        [
+            {
+                "start": f"{year}-06-01 12:00:00",
+                "end": f"{year}-06-01 12:25:00",
+                "runtime": 1500,
+                "status": "finished",
+                "latency_ms": 10 * (year - 2018),
+                "tags": ["projectX"] if year < 2025 else ["review"],
+            }
+            for year in (2019, 2019, 2020, 2025)
+        ]
+    )
+    everything = list(history.iter_sessions())
+    summary = history.summarize(since=datetime(2000, 1, 1, 12))
+
+    assert history.compact(datetime(2021, 1, 1)) == {2019: 2, 2020: 1}
+    assert sorted(history.partitions()) == [2019, 2020]
+    conn = history.get_db_connection()
+    assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone() == (1,)
+
+    # Compacted sessions are still part of the history ...
+    assert list(history.iter_sessions()) == everything
+    assert history.summarize(since=datetime(2000, 1, 1, 12)) == summary
+    assert history.summarize(since=datetime(2000, 1, 1)) == summary
+    assert history.latencies() == [(10, 2), (20, 1), (70, 1)]
+    # ... with their tags
+    assert conn.execute("SELECT COUNT(*) FROM session_tags").fetchone() == (1,)
+    assert history.summarize_by_tag() == {
+        "projectX": (3, 4500),
+        "review": (1, 1500),
+    }
+    assert history.summarize(tag="projectX") == {Status.FINISHED: (3, 4500)}
+    assert history.check_rollups() == []
+    history.rebuild_rollups()
+    assert history.check_rollups() == []
+    # ... and compacting them again doesn't change anything
+    assert history.compact(datetime(2021, 1, 1)) == {}
+
+
+def archive_yearly_sessions(years: tuple[int, ...]):
+    history.ensure_schema()
+    history.archive_pomodoro_sessions(
+        [
+            {
+                "start": f"{year}-06-01 12:00:00",
+                "end": f"{year}-06-01 12:25:00",
+                "runtime": 1500,
+                "status": "finished",
+                "latency_ms": 10 * (year - 2018),
+                "tags": ["projectX"],
+            }
+            for year in years
+        ]
+    )
+
+
+def copy_to_partition(year: int):
+    """
+    Do the first half of compacting `year`: copy its sessions to the partition, but
+    leave them in the history database.
+    """
+    conn = history.get_db_connection()
+    history.get_archive_dirpath().mkdir(exist_ok=True)
+    with history.attached(conn, history.get_archive_dirpath() / f"{year}.db"):
+        conn.execute(history.CREATE_PARTITION)
+        conn.execute(history.CREATE_PARTITION_INDEX)
+        conn.execute(history.CREATE_PARTITION_TAGS)
+        conn.execute(history.CREATE_PARTITION_TAGS_INDEX)
+        with conn:
+            conn.execute(history.MOVE_TO_PARTITION, history.year_bounds(year))
+            conn.execute(history.MOVE_TAGS_TO_PARTITION, history.year_bounds(year))
+
+
+def test_interrupted_compaction(yapom_home):
+    archive_yearly_sessions((2019, 2025))
+    everything = list(history.iter_sessions())
+    summary = history.summarize(since=datetime(2000, 1, 1, 12))
+
+    copy_to_partition(2019)
+    # Sessions that are in both databases count once
+    assert list(history.iter_sessions()) == everything
+    assert history.summarize(since=datetime(2000, 1, 1, 12)) == summary
+    assert history.summarize(since=datetime(2000, 1, 1)) == summary
+    assert history.latencies() == [(10, 1), (70, 1)]
+    assert history.latencies(since=datetime(2000, 1, 1, 12)) == [(10, 1), (70, 1)]
+    assert history.summarize_by_tag() == {"projectX": (2, 3000)}
+    assert history.summarize(tag="projectX") == {Status.FINISHED: (2, 3000)}
+    assert history.check_rollups() == []
+    assert stats.stats().startswith(stats.pomtext("Stats (2 finished sessions)"))
+
+    # The next compaction finishes the job
+    assert history.compact(datetime(2020, 1, 1)) == {2019: 1}
+    assert list(history.iter_sessions()) == everything
+    assert history.latencies() == [(10, 1), (70, 1)]
+    assert history.check_rollups() == []
+
+
+def test_whole_days_without_partitions(yapom_home):
+    archive_yearly_sessions((2019, 2020, 2025))
+    history.compact(datetime(2021, 1, 1))
+    # Reports on whole days don't read the partitions at all
+    history.get_archive_dirpath().rename(yapom_home / "elsewhere")
+    assert history.summarize() == {Status.FINISHED: (3, 4500)}
+    assert history.latencies() == [(10, 1), (20, 1), (70, 1)]
+    assert history.latencies(since=datetime(2020, 1, 1)) == [(20, 1), (70, 1)]
+
+
+def test_latency_rollups_of_older_compactions(yapom_home):
+    archive_yearly_sessions((2019, 2025))
+    history.compact(datetime(2020, 1, 1))
+    # As if the partition had been created before there were latency rollups
+    with history.get_db_connection() as conn:
+        conn.execute("DROP TABLE latency_rollup")
+        conn.execute("PRAGMA user_version = 8")
+    history.ensure_schema()
+    assert history.latencies() == [(10, 1), (70, 1)]
+
+
+def test_segments(yapom_home):
+    history.get_archive_dirpath().mkdir()
+    for year in (2019, 2020):
+        (history.get_archive_dirpath() / f"{year}.db").touch()
+    y2019, y2020 = history.year_bounds(2019), history.year_bounds(2020)
+    # Periods that don't overlap any partition only read the history database
+    assert history.segments(0, y2019[0]) == [(0, y2019[0], None)]
+    assert history.segments(y2020[1], history.MAX_EPOCH) == [
+        (y2020[1], history.MAX_EPOCH, None)
+    ]
+    assert history.segments(y2019[0] + 10, y2020[1] + 10) == [
+        (y2019[0] + 10, y2019[1], history.get_archive_dirpath() / "2019.db"),
+        (y2020[0], y2020[1], history.get_archive_dirpath() / "2020.db"),
+        (y2020[1], y2020[1] + 10, None),
+    ]
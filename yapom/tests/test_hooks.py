@@ -0,0 +1,115 @@
+import json
+import time
+
+from datetime import datetime
+
+import pytest
+
+import yapom.hooks as hooks
+import yapom.session as session
+
+from yapom.utils import Status
+from yapom.session import SessionState
+
+
+@pytest.fixture
+def state() -> SessionState:
+    return SessionState(
+        pid=42,
+        start=datetime(2025, 6, 1, 12, 0, 0),
+        runtime=300,
+        status=Status.RUNNING,
+        tags=("projectX",),
+    )
+
+
+def add_hook(name: str, script: str, executable: bool = True):
+    hooks.get_dirpath().mkdir(exist_ok=True)
+    path = hooks.get_dirpath() / name
+    path.write_text(f"#!/bin/sh\n{script}\n")
+    path.chmod(0o755 if executable else 0o644)
+    return path
+
+
+def wait_for(path, timeout: float = 10.0) -> str:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if path.exists() and (text := path.read_text()):
+            return text
+        time.sleep(0.05)
+    raise AssertionError(f"{path} wasn't written")
+
+
+def test_find(yapom_home):
+    assert hooks.find("start") == []
+    add_hook("on_start", "true")
+    add_hook("on_start.slack", "true")
+    add_hook("on_start.disabled", "true", executable=False)
+    add_hook("on_started", "true")
+    add_hook("on_pause", "true")
+    assert [path.name for path in hooks.find("start")] == ["on_start", "on_start.slack"]
+
+
+def test_run_all(yapom_home, tmp_path):
+    output = tmp_path / "output.json"
+    add_hook("on_start", f'echo "$YAPOM_EVENT" > {output}.event; cat > {output}')
+    add_hook("on_start.broken", "echo 'no such channel' >&2; exit 3")
+    add_hook("on_start.slow", "sleep 10")
+
+    started = time.monotonic()
+    lines = hooks.run_all("start", b'{"status": "running"}', timeout=0.5)
+    # Hooks run in parallel, and the slow one gets killed
+    assert time.monotonic() - started < 5
+    assert json.loads(output.read_text()) == {"status": "running"}
+    assert (tmp_path / "output.json.event").read_text() == "start\n"
+
+    outcomes = sorted(line.split(" ", 3)[-1].rsplit(" (", 1)[0] for line in lines)
+    assert outcomes == [
+        "on_start.broken: exit 3: no such channel",
+        "on_start.slow: timed out after 0.5s",
+        "on_start: exit 0",
+    ]
+    assert hooks.get_log_path().read_text().splitlines() == lines
+
+
+def test_hooks_dont_block(yapom_home, tmp_path, state):
+    output = tmp_path / "output.json"
+    add_hook("on_start", f"sleep 1; cat > {output}")
+
+    started = time.monotonic()
+    session.save(state, event="start")
+    assert time.monotonic() - started < 0.5
+    payload = json.loads(wait_for(output))
+    assert payload["event"] == "start"
+    assert SessionState.from_dict(payload).to_dict() == state.to_dict()
+    assert "on_start: exit 0" in wait_for(hooks.get_log_path())
+
+
+def test_hooks_run_in_order(yapom_home, state):
+    # The first event's hook takes the longest - the second one's still waits for it
+    add_hook("on_start", "sleep 0.5")
+    add_hook("on_pause", "true")
+
+    hooks.fire("start", state)
+    state.stop, state.status = datetime(2025, 6, 1, 12, 1, 0), Status.STOPPED
+    hooks.fire("pause", state)
+    deadline = time.monotonic() + 10.0
+    while len(lines := wait_for(hooks.get_log_path()).splitlines()) < 2:
+        assert time.monotonic() < deadline, lines
+        time.sleep(0.05)
+    assert [line.split()[2:4] for line in lines] == [
+        ["start", "on_start:"],
+        ["pause", "on_pause:"],
+    ]
+    assert list(hooks.get_queue_dirpath().iterdir()) == []
+
+
+def test_no_hooks_for_other_events(yapom_home, tmp_path, state, monkeypatch):
+    add_hook("on_update", "true")
+    spawned = []
+    monkeypatch.setattr(
+        "subprocess.Popen", lambda *args, **kwargs: spawned.append(args)
+    )
+    session.save(state, event="update")
+    hooks.fire("pause", state)
+    assert spawned == []
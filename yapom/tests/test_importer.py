@@ -0,0 +1,133 @@
+import io
+
+from datetime import datetime, timezone
+
+import pytest
+
+import yapom.export as export
+import yapom.history as history
+import yapom.importer as importer
+
+from yapom.utils import Status, STATUS_CODES
+
+OPEN_POMODORO_HISTORY = """\
+2019-01-01T09:00:00-06:00 description="Write report" duration=25 tags=work
+2019-01-01T10:00:00Z duration=30
+
+2019-01-01T11:00:00Z description="No duration"
+"""
+
+
+def write_csv(path, rows: list[str]):
+    path.write_text("\n".join(["start,end,runtime,status", *rows]) + "\n")
+
+
+def test_csv_import_skips_duplicates(yapom_home):
+    csv_file = yapom_home / "sessions.csv"
+    write_csv(
+        csv_file,
+        [
+            "2025-06-01 12:00:00,2025-06-01 12:25:00,1500,finished",
+            "2025-06-01 13:00:00,2025-06-01 13:10:00,1500,cancelled",
+            # Duplicate within the same file
+            "2025-06-01 12:00:00,2025-06-01 12:25:00,1500,finished",
+        ],
+    )
+    inserted, stats = importer.import_file(csv_file)
+    assert (inserted, stats.parsed, stats.invalid) == (2, 3, 0)
+
+    # Importing the same file again doesn't add anything
+    inserted, _ = importer.import_file(csv_file)
+    assert inserted == 0
+
+
+def test_import_skips_compacted_sessions(yapom_home):
+    csv_file = yapom_home / "sessions.csv"
+    write_csv(
+        csv_file,
+        [
+            "2019-06-01 12:00:00,2019-06-01 12:25:00,1500,finished",
+            "2025-06-01 12:00:00,2025-06-01 12:25:00,1500,finished",
+        ],
+    )
+    importer.import_file(csv_file)
+    assert history.compact(datetime(2020, 1, 1)) == {2019: 1}
+
+    # The session of 2019 is in its partition now
+    inserted, _ = importer.import_file(csv_file)
+    assert inserted == 0
+    assert len(list(history.iter_sessions())) == 2
+
+
+def test_csv_round_trip(yapom_home):
+    csv_file = yapom_home / "sessions.csv"
+    csv_file.write_text(
+        "start,end,runtime,status,latency_ms,timer,paused,tags\n"
+        "2025-06-01 12:00:00,,1500,stopped,,,0,\n"
+        '2025-06-01 13:00:00,2025-06-01 13:30:00,1500,finished,8,review,300,"[""a"",""b""]"\n'
+    )
+    importer.import_file(csv_file)
+    output = io.StringIO()
+    export.export(output, "csv")
+    assert output.getvalue() == csv_file.read_text()
+    assert history.summarize_by_tag() == {"a": (1, 1500), "b": (1, 1500)}
+
+
+def test_legacy_csv(yapom_home):
+    csv_file = yapom_home / "sessions.csv"
+    write_csv(csv_file, ["2025-06-01 12:00:00,2025-06-01 12:25:00,1500,finished"])
+    assert importer.detect_format(csv_file) == "csv"
+    inserted, _ = importer.import_file(csv_file)
+    assert inserted == 1
+
+
+def test_invalid_rows(yapom_home):
+    csv_file = yapom_home / "sessions.csv"
+    write_csv(
+        csv_file,
+        [
+            "2025-06-01 12:00:00,2025-06-01 12:25:00,1500,paused",
+            "yesterday,2025-06-01 12:25:00,1500,finished",
+            "2025-06-01 12:00:00,2025-06-01 12:25:00,1500,finished",
+        ],
+    )
+    inserted, stats = importer.import_file(csv_file)
+    assert (inserted, stats.invalid) == (1, 2)
+    assert stats.errors[0].startswith("line 2:")
+
+
+def test_unexpected_csv_header(yapom_home):
+    csv_file = yapom_home / "sessions.csv"
+    csv_file.write_text("date,minutes\n2025-06-01,25\n")
+    with pytest.raises(ValueError):
+        importer.import_file(csv_file)
+
+
+def test_open_pomodoro_import(yapom_home):
+    history_file = yapom_home / "history"
+    history_file.write_text(OPEN_POMODORO_HISTORY)
+    assert importer.detect_format(history_file) == "openpomodoro"
+    inserted, _ = importer.import_file(history_file)
+    assert inserted == 3
+    rows = history.get_db_connection().execute(
+        "SELECT start, end - start, status FROM sessions ORDER BY start"
+    )
+    finished = STATUS_CODES[Status.FINISHED]
+    first = int(datetime(2019, 1, 1, 10, 0, tzinfo=timezone.utc).timestamp())
+    assert rows.fetchall() == [
+        (first, 1800, finished),
+        (first + 3600, 1500, finished),
+        (first + 5 * 3600, 1500, finished),
+    ]
+
+
+def test_imports_every_row(yapom_home):
+    rows = 10_000
+    history_file = yapom_home / "history"
+    with history_file.open("w") as fp:
+        for i in range(rows):
+            fp.write(f"{datetime.fromtimestamp(i * 1800).isoformat()} duration=25\n")
+    inserted, _ = importer.import_file(history_file)
+    assert inserted == rows
+    conn = history.get_db_connection()
+    assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone() == (rows,)
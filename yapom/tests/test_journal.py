@@ -0,0 +1,103 @@
+import json
+import sqlite3
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import yapom.history as history
+import yapom.journal as journal
+import yapom.pomodoro as pomodoro
+import yapom.session as session
+
+from yapom.utils import Status
+from yapom.session import SessionState
+
+
+@pytest.fixture
+def state() -> SessionState:
+    return SessionState(
+        pid=42, start=datetime(2025, 6, 1, 12, 0, 0), runtime=300, status=Status.RUNNING
+    )
+
+
+def test_every_transition_is_appended(yapom_home, state):
+    session.save(state, event="start")
+    state.stop, state.status = datetime(2025, 6, 1, 12, 1, 0), Status.STOPPED
+    session.save(state, event="pause")
+
+    lines = journal.get_filepath().read_text().splitlines()
+    assert len(lines) == 2
+    record = journal.tail()
+    assert record is not None and record["event"] == "pause"
+    assert session.load().to_dict() == state.to_dict()
+    # Nothing else gets written
+    assert not session.get_filepath().exists()
+
+
+def test_partial_last_record_is_skipped(yapom_home, state):
+    session.save(state, event="start")
+    # A crash in the middle of a write
+    with journal.get_filepath().open("a") as fp:
+        fp.write('{"event": "pause", "pid": 42, "sta')
+    assert session.load().status == Status.RUNNING
+
+    # The next record starts on a line of its own
+    state.status = Status.CANCELLED
+    session.save(state, event="cancel")
+    assert session.load().status == Status.CANCELLED
+
+
+def test_compaction(yapom_home, monkeypatch, state):
+    monkeypatch.setattr(journal, "COMPACT_SIZE", 1024)
+    for _ in range(20):
+        session.save(state, event="update")
+    assert journal.get_filepath().stat().st_size <= 1024
+    assert session.load_json().to_dict() == state.to_dict()
+    assert session.load().to_dict() == state.to_dict()
+
+    # Right after a compaction, the JSON session file is the current state
+    journal.get_filepath().write_bytes(b"")
+    assert session.load().to_dict() == state.to_dict()
+
+
+def test_legacy_session_file(yapom_home, state):
+    session.save_json(state)
+    assert session.load().to_dict() == state.to_dict()
+
+
+def test_runtimes_without_paused_time(state):
+    state.paused = 100
+    now = state.start + timedelta(seconds=160)
+    assert session.get_runtimes(state, now=now) == (60, 240)
+
+
+def test_paused_time_is_archived(yapom_home, monkeypatch):
+    monkeypatch.setattr(
+        session, "start_timer", lambda runtime, plan=False: (42, datetime.now())
+    )
+    monkeypatch.setattr(session, "pause_timer", lambda state: True)
+    monkeypatch.setattr(session, "resume_timer", lambda state: True)
+    monkeypatch.setattr(session, "kill_current", lambda state: state.pid)
+
+    pomodoro.start(300)
+    pomodoro.stop()
+    # Pretend that the session has been paused for two minutes
+    paused = session.load()
+    assert paused.stop is not None and paused.start is not None
+    paused.stop -= timedelta(seconds=120)
+    paused.start -= timedelta(seconds=120)
+    session.save(paused)
+    pomodoro.resume()
+    assert 119 <= session.load().paused <= 121
+    pomodoro.cancel()
+
+    lines = journal.get_filepath().read_text().splitlines()
+    events = [json.loads(line)["event"] for line in lines]
+    assert events == ["start", "pause", "update", "resume", "cancel"]
+    with sqlite3.connect(history.get_db_path()) as conn:
+        (row,) = conn.execute("SELECT end - start, paused FROM sessions").fetchall()
+        (total,) = conn.execute("SELECT total FROM daily_rollup").fetchone()
+    assert 119 <= row[1] <= 121
+    # Only the time that wasn't paused counts
+    assert total == row[0] - row[1] < 5
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import subprocess
+
+from pathlib import Path
+from datetime import datetime
+
+import pytest
+
+import yapom.utils as utils
+import yapom.notify as notify
+import yapom.session as session
+import yapom.history as history
+
+from yapom.utils import Status
+from yapom.session import SessionState
+
+POMTIMER_PY = Path(__file__).parent.parent.parent / "pomtimer.py"
+
+
+def test_file_notifier(yapom_home):
+    path = yapom_home / "notifications"
+    notifier = notify.get_notifier(f"file:{path}")
+    notify.notify("first", notifier=notifier)
+    notify.notify("second", notifier=notifier)
+    assert path.read_text() == "first\nsecond\n"
+
+
+def test_fifo_without_reader_does_not_block(yapom_home):
+    fifo = yapom_home / "notifications.fifo"
+    os.mkfifo(fifo)
+    start = time.monotonic()
+    notify.notify("nobody's listening", notifier=notify.FileNotifier(fifo))
+    assert time.monotonic() - start < 0.5
+
+
+def test_notifier_from_environment(yapom_home, monkeypatch):
+    assert isinstance(notify.get_notifier(), notify.NullNotifier)
+    monkeypatch.setenv(notify.NOTIFIER_ENV, "bell")
+    assert isinstance(notify.get_notifier(), notify.BellNotifier)
+    with pytest.raises(ValueError):
+        notify.get_notifier("carrier-pigeon")
+
+
+def test_detection_is_cached(yapom_home, monkeypatch):
+    lookups = []
+
+    def is_installed(name: str) -> bool:
+        lookups.append(name)
+        return name == "tclsh"
+
+    monkeypatch.setattr(utils, "is_installed", is_installed)
+    monkeypatch.setenv("DISPLAY", ":0")
+    assert notify.detect_cached() == "tk"
+    assert notify.detect_cached() == "tk"
+    assert lookups == ["tclsh"]
+
+    # A different environment means another detection
+    monkeypatch.delenv("DISPLAY")
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    assert notify.detect_cached() == "bell"
+
+
+def test_fallback(yapom_home, monkeypatch):
+    spawned = []
+
+    def spawn_detached(args: list[str]):
+        if args[0] == sys.executable:
+            raise RuntimeError("Tk's broken")
+        spawned.append(args[0])
+
+    monkeypatch.setattr(notify, "spawn_detached", spawn_detached)
+    notify.notify("hello", notifier=notify.TkNotifier())
+    assert spawned == [utils.NOTIFY_TOOL]
+
+
+def test_timer_exits_right_after_notifying(yapom_home):
+    notifications = yapom_home / "notifications"
+    session.save(SessionState(start=datetime.now(), runtime=1, status=Status.RUNNING))
+    start = time.monotonic()
+    subprocess.run(
+        [sys.executable, str(POMTIMER_PY), "1"],
+        env={**os.environ, notify.NOTIFIER_ENV: f"file:{notifications}"},
+        check=True,
+        timeout=10,
+    )
+    assert time.monotonic() - start < 3
+    assert notifications.read_text() == f"{notify.SESSION_FINISHED}\n"
+    assert session.load().status == Status.FINISHED
+    assert history.summarize() == {Status.FINISHED: (1, 1)}
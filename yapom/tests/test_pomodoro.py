@@ -35,3 +35,34 @@ def test_runtime_formatting(runtime, format_str):
 )
 def test_runtime_from_string(input_string: str, expected_runtime: int):
     assert utils.runtime_from_string(input_string) == expected_runtime
+
+
+@pytest.mark.parametrize(
+    "input_string, expected_phases",
+    [
+        ("25m", [(utils.WORK, 1500)]),
+        ("2x25m", [(utils.WORK, 1500), (utils.WORK, 1500)]),
+        (
+            "2x25m/5m",
+            [(utils.WORK, 1500), (utils.SHORT_BREAK, 300), (utils.WORK, 1500)],
+        ),
+        (
+            "2x25m/5m/15m",
+            [
+                (utils.WORK, 1500),
+                (utils.SHORT_BREAK, 300),
+                (utils.WORK, 1500),
+                (utils.LONG_BREAK, 900),
+            ],
+        ),
+        ("1x50m/10m/1h", [(utils.WORK, 3000), (utils.LONG_BREAK, 3600)]),
+    ],
+)
+def test_phases_from_string(input_string, expected_phases):
+    assert utils.phases_from_string(input_string) == expected_phases
+
+
+@pytest.mark.parametrize("input_string", ["0x25m", "4x", "ax25m", "4x25m/5m/15m/1m"])
+def test_invalid_plans(input_string):
+    with pytest.raises(ValueError):
+        utils.phases_from_string(input_string)
@@ -0,0 +1,120 @@
+from datetime import datetime
+
+import pytest
+
+import yapom.record as record
+import yapom.journal as journal
+import yapom.session as session
+
+from yapom.utils import Status, STATUS_CODES
+from yapom.session import SessionState
+
+
+@pytest.fixture
+def running_state() -> SessionState:
+    return SessionState(
+        pid=4242,
+        start=datetime(2025, 6, 1, 12, 0, 0),
+        stop=datetime(2025, 6, 1, 12, 1, 30),
+        runtime=1500,
+        status=Status.STOPPED,
+    )
+
+
+def test_pack_unpack(running_state):
+    buffer = record.pack(running_state)
+    assert len(buffer) == record.LAYOUT.size
+    assert SessionState(*record.unpack(buffer)).to_dict() == running_state.to_dict()
+
+
+def test_tags_round_trip(running_state):
+    running_state.tags = ("projectX", "review")
+    buffer = record.pack(running_state)
+    assert SessionState(*record.unpack(buffer)).tags == ("projectX", "review")
+
+
+def test_plan_round_trip(running_state):
+    running_state.plan, running_state.tags = "4x25m/5m/15m", ("projectX",)
+    state = SessionState(*record.unpack(record.pack(running_state)))
+    assert (state.plan, state.tags) == ("4x25m/5m/15m", ("projectX",))
+
+
+def test_read_version_3_record(running_state):
+    running_state.tags = ("projectX", "review")
+    buffer = bytearray(record.pack(running_state))
+    # Version 3 records end with the tags only
+    buffer[0] = 3
+    buffer[record.LAYOUT.size :] = b"projectX\nreview"
+    state = SessionState(*record.unpack(buffer))
+    assert (state.plan, state.tags) == (None, ("projectX", "review"))
+
+
+def test_read_version_1_record(running_state):
+    buffer = record.LAYOUT_V1.pack(
+        1, STATUS_CODES[Status.STOPPED], 4242, 1500, 1.0, 2.0, 0.0
+    )
+    pid, start, stop, end, runtime, status, paused, tags, plan = record.unpack(buffer)
+    assert (pid, runtime, status, paused, tags, plan) == (
+        4242,
+        1500,
+        Status.STOPPED,
+        0,
+        (),
+        None,
+    )
+
+
+def test_invalid_record(yapom_home, running_state):
+    record.get_filepath().write_bytes(b"\x00" * 3)
+    with pytest.raises(record.RecordError):
+        record.read()
+    # Broken records fall back to the JSON session file
+    session.save_json(running_state)
+    assert session.load().to_dict() == running_state.to_dict()
+
+
+def test_migrate_and_export(yapom_home, running_state):
+    session.save(running_state)
+    assert not record.exists()
+
+    record.migrate()
+    assert record.exists()
+    assert journal.tail() is None
+    assert session.load().to_dict() == running_state.to_dict()
+
+    # While the record exists, it's the only thing that gets written
+    running_state.status = Status.CANCELLED
+    session.save(running_state)
+    assert journal.tail() is None
+    assert not session.load_json()
+    assert session.load().status == Status.CANCELLED
+
+    record.export()
+    assert not record.exists()
+    assert session.load_json().status == Status.CANCELLED
+
+
+def write_many(home: str, state: SessionState, count: int):
+    import yapom.utils as utils
+
+    utils.HOME_DIR = home
+    for _ in range(count):
+        record.write(state)
+
+
+def test_concurrent_writers(yapom_home, running_state):
+    import multiprocessing
+
+    # E.g. the timer process finishing the session while the user pauses it
+    processes = [
+        multiprocessing.Process(
+            target=write_many, args=(str(yapom_home), running_state, 200)
+        )
+        for _ in range(2)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0, 0]
+    assert SessionState(*record.read()).to_dict() == running_state.to_dict()
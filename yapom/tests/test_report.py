@@ -0,0 +1,133 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import yapom.report as report
+import yapom.history as history
+
+from yapom.utils import Status, DATETIME_FORMAT
+
+
+def archive(start: datetime, runtime: int, elapsed: int, status: Status):
+    history.archive_pomodoro_session(
+        {
+            "start": start.strftime(DATETIME_FORMAT),
+            "end": (start + timedelta(seconds=elapsed)).strftime(DATETIME_FORMAT),
+            "runtime": runtime,
+            "status": status.value,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "args, since, until",
+    [
+        ([], datetime(2025, 6, 4), datetime(2025, 6, 5)),
+        (["--day"], datetime(2025, 6, 4), datetime(2025, 6, 5)),
+        (["--week"], datetime(2025, 6, 2), datetime(2025, 6, 5)),
+        (["--month"], datetime(2025, 6, 1), datetime(2025, 6, 5)),
+        (
+            ["--range", "2025-01-01..2025-01-31"],
+            datetime(2025, 1, 1),
+            datetime(2025, 2, 1),
+        ),
+        (["--range", "2025-01-01.."], datetime(2025, 1, 1), None),
+    ],
+)
+def test_parse_period(args, since, until):
+    _, parsed_since, parsed_until = report.parse_period(args, today=date(2025, 6, 4))
+    assert (parsed_since, parsed_until) == (since, until)
+
+
+@pytest.mark.parametrize("args", [["--year"], ["--range", "2025-01-01"]])
+def test_invalid_period(args):
+    with pytest.raises(ValueError):
+        report.parse_period(args)
+
+
+def test_summarize(yapom_home):
+    history.ensure_schema()
+    day = datetime(2025, 6, 1, 9, 0, 0)
+    archive(day, runtime=1500, elapsed=1500, status=Status.FINISHED)
+    archive(day + timedelta(hours=1), 1500, 1500, Status.FINISHED)
+    archive(day + timedelta(hours=2), 1500, 600, Status.CANCELLED)
+    # Different day
+    archive(day + timedelta(days=1), 1500, 1500, Status.FINISHED)
+
+    summary = history.summarize(since=day, until=day + timedelta(hours=12))
+    assert summary == {Status.FINISHED: (2, 3000), Status.CANCELLED: (1, 600)}
+
+    output = report.report("test", day, day + timedelta(hours=12))
+    assert "sessions:        3" in output
+    assert "completion rate: 67%" in output
+    assert "average time:    20m" in output
+
+
+def test_latency_percentiles(yapom_home):
+    histogram = [(latency, 1) for latency in range(1, 101)]
+    assert [report.percentile(histogram, p) for p in (50, 90, 99, 100)] == [
+        50,
+        90,
+        99,
+        100,
+    ]
+    assert report.percentile([(3, 1)], 50) == 3
+    assert report.percentile([(1, 98), (500, 2)], 99) == 500
+
+    history.ensure_schema()
+    day = datetime(2025, 6, 1, 9, 0, 0)
+    for minute, latency_ms in enumerate([4, 1, 2, 3, 250]):
+        history.archive_pomodoro_session(
+            {
+                "start": (day + timedelta(minutes=minute)).strftime(DATETIME_FORMAT),
+                "end": "",
+                "runtime": 60,
+                "status": Status.FINISHED.value,
+                "latency_ms": latency_ms,
+            }
+        )
+    output = report.report("test", day, day + timedelta(days=1))
+    assert "timer latency:   p50 3ms, p90 250ms, p99 250ms, max 250ms" in output
+
+
+def test_tags(yapom_home):
+    history.ensure_schema()
+    day = datetime(2025, 6, 1, 9, 0, 0)
+    history.archive_pomodoro_sessions(
+        [
+            {
+                "start": (day + timedelta(hours=hour)).strftime(DATETIME_FORMAT),
+                "end": (day + timedelta(hours=hour, minutes=25)).strftime(
+                    DATETIME_FORMAT
+                ),
+                "runtime": 1500,
+                "status": Status.FINISHED.value,
+                "tags": tags,
+            }
+            for hour, tags in enumerate([["projectX", "review"], ["projectX"], []])
+        ]
+    )
+    until = day + timedelta(days=1)
+    assert history.summarize_by_tag(since=day, until=until) == {
+        "projectX": (2, 3000),
+        "review": (1, 1500),
+    }
+    # The primary key of the tags does the lookup
+    plan = history.get_db_connection().execute(
+        "EXPLAIN QUERY PLAN " + history.SUMMARIZE_TAG.format(schema="main", unique=""),
+        (0, history.MAX_EPOCH, "review"),
+    )
+    assert any("USING PRIMARY KEY (tag=?)" in row[-1] for row in plan)
+
+    output = report.report("test", day, until, tag="review")
+    assert "Report (test tagged #review)" in output
+    assert "sessions:        1" in output
+    assert "No Pomodoro sessions test tagged #other." in report.report(
+        "test", day, until, tag="other"
+    )
+    output = report.report_by_tag("test", day, until)
+    assert output.splitlines()[1:] == ["  #projectX  2 (50m)", "  #review    1 (25m)"]
+
+
+def test_empty_report(yapom_home):
+    assert "No Pomodoro sessions" in report.main(["--day"])
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import yapom.pomodoro as pomodoro
+import yapom.session as session
+
+from yapom.utils import Status
+from yapom.session import SessionState
+
+
+@pytest.fixture
+def io_calls(yapom_home, monkeypatch):
+    """
+    Count session file reads and writes and replace the timer process with a no-op.
+    """
+    calls = {"load": 0, "save": 0}
+    load, save = session.load, session.save
+
+    def counting_load():
+        calls["load"] += 1
+        return load()
+
+    def counting_save(state, event="update"):
+        calls["save"] += 1
+        return save(state, event)
+
+    monkeypatch.setattr(session, "load", counting_load)
+    monkeypatch.setattr(session, "save", counting_save)
+    monkeypatch.setattr(
+        session, "start_timer", lambda runtime, plan=False: (42, datetime.now())
+    )
+    monkeypatch.setattr(session, "kill_current", lambda state: state.pid)
+    monkeypatch.setattr(pomodoro, "finish", lambda end_time, with_status, state: None)
+    return calls
+
+
+def test_state_round_trip(yapom_home):
+    start = datetime(2025, 6, 1, 12, 0, 0)
+    state = SessionState(pid=42, start=start, runtime=300, status=Status.RUNNING)
+    session.save(state)
+    loaded = session.load()
+    assert loaded.to_dict() == state.to_dict()
+    assert loaded.start == start and loaded.stop is None
+
+
+def test_missing_session_file(yapom_home):
+    assert not session.load()
+    assert pomodoro.status() == pomodoro.pomtext("No Pomodoro session found.")
+
+
+def test_runtimes():
+    start = datetime(2025, 6, 1, 12, 0, 0)
+    state = SessionState(start=start, runtime=300, status=Status.RUNNING)
+    assert session.get_runtimes(state, now=start + timedelta(seconds=60)) == (60, 240)
+    state.stop, state.status = start + timedelta(seconds=100), Status.STOPPED
+    assert session.get_runtimes(state, now=start + timedelta(seconds=200)) == (100, 200)
+    state.status = Status.FINISHED
+    assert session.get_runtimes(state) == (300, 0)
+
+
+@pytest.mark.parametrize(
+    "command, saves",
+    [
+        (pomodoro.status, 0),
+        (pomodoro.stop, 1),
+        (pomodoro.resume, 0),
+        (pomodoro.reset, 1),
+        (pomodoro.repeat, 0),
+    ],
+)
+def test_single_read_per_command(io_calls, command, saves):
+    session.save(SessionState(start=datetime.now(), runtime=60, status=Status.RUNNING))
+    io_calls["save"] = 0
+    command()
+    assert io_calls == {"load": 1, "save": saves}
+
+
+def test_stop_and_resume(io_calls):
+    pomodoro.start(60)
+    pomodoro.stop()
+    assert session.load().status == Status.STOPPED
+    pomodoro.resume()
+    resumed = session.load()
+    assert resumed.status == Status.RUNNING and resumed.stop is None
+    assert io_calls["save"] == 3
@@ -0,0 +1,109 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+from pathlib import Path
+
+MAIN_PY = Path(__file__).parent.parent.parent / "main.py"
+POMTIMER_PY = MAIN_PY.parent / "pomtimer.py"
+
+# Budget (in microseconds) for the time spent importing yapom's own modules on the way
+# to answering a command. The sum of each module's best time over several runs is
+# compared against it - a single slow import (e.g. while other tests keep the machine
+# busy) doesn't count then.
+IMPORT_BUDGET_US = 15_000
+RUNS = 5
+
+# Modules that must only be loaded when a notification or an archive actually happens
+HEAVY_MODULES = {"tkinter", "_tkinter", "sqlite3", "_sqlite3", "subprocess"}
+
+
+def import_times(command: str, home: Path) -> dict[str, int]:
+    """
+    Run `main.py <command>` with `-X importtime` and return a mapping of imported
+    module names to their 'self' import time (i.e. without nested imports).
+    """
+    env = {**os.environ, "YAPOM_HOME": str(home)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(MAIN_PY), command],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, _, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(self_time)
+    return times
+
+
+@pytest.mark.parametrize("command", ["help", "tomato", "status"])
+def test_no_heavy_imports(command, tmp_path):
+    assert not HEAVY_MODULES & set(import_times(command, tmp_path))
+
+
+def test_help_imports_nothing_from_yapom(tmp_path):
+    assert not any(name.startswith("yapom") for name in import_times("help", tmp_path))
+
+
+@pytest.mark.parametrize("command", ["help", "tomato", "status"])
+def test_import_time_budget(command, tmp_path):
+    runs = [import_times(command, tmp_path) for _ in range(RUNS)]
+    modules = {
+        name for times in runs for name in times if name.split(".")[0] == "yapom"
+    }
+    best = sum(min(times.get(name, 0) for times in runs) for name in modules)
+    assert best < IMPORT_BUDGET_US
+
+
+# Budget for a timer process that's sleeping through a session (see `pomtimer.py`):
+# resident memory in kB and the number of modules imported besides the ones the
+# interpreter loads on its own
+TIMER_RSS_BUDGET_KB = 12_000
+TIMER_MODULE_BUDGET = 40
+
+
+def test_sleeping_timer_footprint(yapom_home):
+    import yapom.session as session
+    import yapom.supervisor as supervisor
+
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            *session.TIMER_PYTHON_FLAGS,
+            "-X",
+            "importtime",
+            str(POMTIMER_PY),
+            "60",
+        ],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # Ready means sleeping - nothing else is imported until the timer goes off
+        assert supervisor.wait_until_ready(process.pid)
+        with open(f"/proc/{process.pid}/status") as file:
+            rss_line = next(line for line in file if line.startswith("VmRSS:"))
+        rss_kb = int(rss_line.split()[1])
+    finally:
+        process.kill()
+        _, stderr = process.communicate()
+    modules = {
+        line.split("|")[-1].strip()
+        for line in stderr.splitlines()
+        if line.startswith("import time:") and "cumulative" not in line
+    }
+
+    assert rss_kb < TIMER_RSS_BUDGET_KB
+    assert len(modules) < TIMER_MODULE_BUDGET
+    assert not HEAVY_MODULES & modules
+    assert {name for name in modules if name.startswith("yapom")} == {
+        "yapom",
+        "yapom.trace",
+        "yapom.supervisor",
+    }
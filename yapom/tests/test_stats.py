@@ -0,0 +1,119 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import yapom.stats as stats
+import yapom.history as history
+
+from yapom.utils import DATETIME_FORMAT
+
+
+def archive(start: datetime, runtime: int = 1500, status: str = "finished"):
+    history.ensure_schema()
+    history.archive_pomodoro_session(
+        {
+            "start": start.strftime(DATETIME_FORMAT),
+            "end": (start + timedelta(seconds=runtime)).strftime(DATETIME_FORMAT),
+            "runtime": runtime,
+            "status": status,
+        }
+    )
+
+
+def cached_rows() -> list[tuple]:
+    meta = stats.read_meta()
+    assert meta is not None
+    with stats.mapped_columns(meta["rows"]) as columns:
+        return list(zip(*(column.tolist() for column in columns.values())))
+
+
+def test_streaks():
+    assert stats.streaks([1, 2, 3, 5, 7, 8]) == [(1, 3), (5, 5), (7, 8)]
+    assert stats.streaks([]) == []
+
+
+def test_no_sessions(yapom_home):
+    assert stats.stats() == stats.pomtext("No finished Pomodoro sessions yet.")
+
+
+def test_stats(yapom_home):
+    today = date(2025, 6, 10)  # a Tuesday
+    noon = datetime(2025, 6, 10, 12, 0, 0)
+    for days_ago in (0, 1, 2, 5, 6, 7, 8):
+        archive(noon - timedelta(days=days_ago))
+    archive(noon, runtime=3000)
+    archive(noon, status="cancelled")
+
+    lines = stats.stats(today=today).splitlines()
+    assert lines[0] == stats.pomtext("Stats (8 finished sessions)")
+    assert lines[1] == "  current streak:  3 days (2025-06-08 - 2025-06-10)"
+    assert lines[2] == "  longest streak:  4 days (2025-06-02 - 2025-06-05)"
+    heatmap = lines[5:12]
+    assert heatmap[0].startswith("  Mon ") and heatmap[1].startswith("  Tue ")
+    # This week: Monday and (two sessions on) Tuesday, nothing after today
+    assert heatmap[0].endswith("▒▒") and heatmap[1].endswith("▒█")
+    assert heatmap[2].endswith("·▒") and len(heatmap[2]) == len(heatmap[1]) - 1
+    assert "  Tue 25m / 50m (3 sessions)" in lines
+
+
+def test_numpy_counts_like_python(yapom_home):
+    numpy = pytest.importorskip("numpy")
+    # Across a DST change, with sessions of different runtimes and statuses
+    noon = datetime(2025, 3, 20, 12, 0, 0)
+    for days in range(20):
+        for hours, runtime in enumerate((1500, 1500, 3000)[: days % 3 + 1]):
+            start = noon + timedelta(days=days, hours=hours)
+            archive(start, runtime=runtime)
+        archive(noon + timedelta(days=days, hours=23), status="cancelled")
+    stats.stats()
+    meta = stats.read_meta()
+    assert meta is not None
+    with stats.mapped_columns(meta["rows"]) as columns:
+        expected = stats.count_sessions_python(columns)
+        assert stats.count_sessions_numpy(columns, numpy) == expected
+    assert sum(expected.values()) == 39
+
+
+def test_cache_follows_history(yapom_home):
+    archive(datetime(2025, 6, 1, 12, 0, 0))
+    assert not stats.exists()
+    stats.stats()
+    assert len(cached_rows()) == 1
+
+    # Archived sessions are appended right away ...
+    archive(datetime(2025, 6, 2, 12, 0, 0), runtime=300, status="cancelled")
+    assert cached_rows()[-1][1:] == (300, 3)
+
+    # ... and everything else by the next `yapom stats`
+    conn = history.get_db_connection()
+    with conn:
+        conn.execute("DELETE FROM sessions WHERE runtime = 300")
+    stats.stats()
+    assert len(cached_rows()) == 1
+
+
+def test_interrupted_update_is_rebuilt(yapom_home):
+    archive(datetime(2025, 6, 1, 12, 0, 0))
+    stats.stats()
+    # Only one of the columns got appended to
+    with (stats.get_dirpath() / "start.col").open("ab") as fp:
+        fp.write(b"\x00" * 8)
+    assert stats.read_meta() is None
+    archive(datetime(2025, 6, 2, 12, 0, 0))
+    stats.stats()
+    assert len(cached_rows()) == 2
+
+
+def test_compacted_sessions(yapom_home):
+    archive(datetime(2019, 6, 1, 12, 0, 0))
+    archive(datetime(2025, 6, 1, 12, 0, 0))
+    stats.stats()
+    history.compact(datetime(2021, 1, 1))
+
+    stats.stats()
+    meta = stats.read_meta()
+    assert meta is not None and meta["compacted"] == 1
+    assert len(cached_rows()) == 2
+    # Sessions archived after a compaction are appended as usual
+    archive(datetime(2025, 6, 2, 12, 0, 0))
+    assert len(cached_rows()) == 3
@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import subprocess
+
+import pytest
+
+import yapom.supervisor as supervisor
+
+from pathlib import Path
+
+POMTIMER_PY = Path(__file__).parent.parent.parent / "pomtimer.py"
+
+# Upper bound (in seconds) for pausing / resuming a running timer
+SIGNAL_LATENCY_BUDGET = 0.05
+# Latencies are measured this often and the best one is compared against the budget,
+# so that scheduler noise (e.g. from other tests) doesn't count
+LATENCY_RUNS = 5
+SIGNAL_GAP = 0.02
+
+
+@pytest.fixture
+def spawn_timer(yapom_home):
+    processes = []
+
+    def spawn(runtime: int) -> subprocess.Popen:
+        env = {**os.environ, "YAPOM_NOTIFIER": "none"}
+        process = subprocess.Popen(
+            [sys.executable, str(POMTIMER_PY), str(runtime)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        processes.append(process)
+        assert supervisor.wait_until_ready(process.pid)
+        return process
+
+    yield spawn
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def timed(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def test_pause_and_resume(spawn_timer):
+    timer = spawn_timer(1)
+
+    pause_latencies, resume_latencies = [], []
+    for _ in range(LATENCY_RUNS):
+        latency, paused = timed(supervisor.pause, timer.pid)
+        assert paused
+        pause_latencies.append(latency)
+        # Give the timer a moment to pick up each signal - pending signals of the
+        # same kind are merged
+        time.sleep(SIGNAL_GAP)
+        latency, resumed = timed(supervisor.resume, timer.pid)
+        assert resumed
+        resume_latencies.append(latency)
+        time.sleep(SIGNAL_GAP)
+    assert min(pause_latencies) < SIGNAL_LATENCY_BUDGET
+    assert min(resume_latencies) < SIGNAL_LATENCY_BUDGET
+
+    # A paused timer doesn't run out
+    assert supervisor.pause(timer.pid)
+    time.sleep(1.5)
+    assert timer.poll() is None
+
+    assert supervisor.resume(timer.pid)
+
+    # ... and the same process finishes the session once resumed
+    resumed_at = time.monotonic()
+    timer.wait(timeout=5)
+    assert 0.5 < time.monotonic() - resumed_at < 2.0
+
+
+def test_restart(spawn_timer):
+    timer = spawn_timer(2)
+    time.sleep(1)
+    restarted_at = time.monotonic()
+    assert supervisor.restart(timer.pid)
+    timer.wait(timeout=5)
+    assert 1.5 < time.monotonic() - restarted_at
+
+
+def test_terminate(spawn_timer):
+    timer = spawn_timer(60)
+    assert supervisor.pause(timer.pid)
+    assert supervisor.terminate(timer.pid)
+    assert timer.wait(timeout=5) != 0
+    assert not supervisor.terminate(timer.pid)
+
+
+def test_no_signals_for_other_processes():
+    # SIGUSR1 would terminate 'sleep' - it must not be sent at all
+    process = subprocess.Popen(["sleep", "30"])
+    try:
+        assert not supervisor.pause(process.pid)
+        assert not supervisor.terminate(process.pid)
+        assert process.poll() is None
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_countdown_reports_latency():
+    latencies = []
+    for _ in range(LATENCY_RUNS):
+        started = time.monotonic()
+        latencies.append(supervisor.countdown(0.1))
+        assert time.monotonic() - started >= 0.1
+    assert all(latency >= 0.0 for latency in latencies)
+    assert min(latencies) < SIGNAL_LATENCY_BUDGET
+
+
+def test_countdown_deducts_startup_delay():
+    # The timer was requested a second ago - only the rest of the runtime is left
+    started = time.monotonic()
+    supervisor.countdown(1.2, requested_at=time.time() - 1.0)
+    assert time.monotonic() - started < 0.5
@@ -0,0 +1,99 @@
+import os
+import time
+import signal
+import sqlite3
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import yapom.timers as timers
+import yapom.history as history
+import yapom.scheduler as scheduler
+
+from yapom.utils import Status
+
+
+@pytest.fixture
+def timer_home(yapom_home):
+    yield yapom_home
+    # Don't leave a scheduler behind
+    if (pid := scheduler.read_pid()) and scheduler.is_scheduler(pid):
+        os.kill(pid, signal.SIGKILL)
+
+
+def wait_until_ended(*names: str, timeout: float = 10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        named = timers.load()
+        if not any(timer.is_in_progress() for timer in named.values()):
+            return {name: named[name] for name in names}
+        assert time.monotonic() < deadline, named
+        time.sleep(0.05)
+
+
+def wait_for_scheduler(timeout: float = 10.0) -> int:
+    # The scheduler writes its pid file after it has started up
+    deadline = time.monotonic() + timeout
+    while (pid := scheduler.read_pid()) is None:
+        assert time.monotonic() < deadline, "The scheduler didn't start"
+        time.sleep(0.01)
+    return pid
+
+
+def test_round_trip(yapom_home):
+    start = datetime(2025, 6, 1, 12, 0, 0)
+    timer = timers.NamedTimer(
+        "review",
+        deadline=start.timestamp() + 300,
+        start=start,
+        stop=start + timedelta(seconds=100),
+        runtime=300,
+        status=Status.STOPPED,
+    )
+    timers.save({"review": timer})
+    loaded = timers.load()["review"]
+    assert loaded.to_dict() == timer.to_dict()
+    # Paused: what's left is what was left when the timer was paused
+    assert loaded.remaining() == 200
+
+
+def test_pause_and_resume(timer_home):
+    timers.start("review", 60)
+    assert "STOPPED" in timers.update("review", "pause")
+    time.sleep(0.5)
+    timers.update("review", "resume")
+    timer = timers.load()["review"]
+    assert timer.start is not None and timer.deadline is not None
+    # The deadline moves by the time the timer was paused
+    assert timer.deadline - timer.start.timestamp() >= 60.5
+    assert "CANCELLED" in timers.update("review", "cancel")
+
+
+def test_timers_run_in_parallel(timer_home):
+    timers.start("review", 1)
+    timers.start("meeting", 2)
+    assert "already in progress" in timers.start("review", 1)
+    pid = wait_for_scheduler()
+
+    ended = wait_until_ended("review", "meeting")
+    assert {timer.status for timer in ended.values()} == {Status.FINISHED}
+    assert ended["review"].end < ended["meeting"].end
+    # One scheduler fired both - and exits once it has archived them
+    deadline = time.monotonic() + 10.0
+    while scheduler.is_scheduler(pid):
+        assert time.monotonic() < deadline, "The scheduler didn't exit"
+        time.sleep(0.01)
+
+    history.ensure_schema()
+    with sqlite3.connect(history.get_db_path()) as conn:
+        rows = conn.execute("SELECT timer, status, runtime FROM sessions ORDER BY 3")
+        assert rows.fetchall() == [("review", 4, 1), ("meeting", 4, 2)]
+
+
+def test_all(timer_home):
+    timers.start("review", 60)
+    timers.start("meeting", 60)
+    output = timers.main("cancel", name=None, every=True)
+    assert "[review] CANCELLED" in output and "[meeting] CANCELLED" in output
+    assert "nothing to cancel" in output
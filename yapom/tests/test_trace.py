@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import subprocess
+
+from pathlib import Path
+
+import yapom.trace as trace
+
+MAIN_PY = Path(__file__).parent.parent.parent / "main.py"
+
+
+def run_main(*args: str, env: dict | None = None) -> str:
+    result = subprocess.run(
+        [sys.executable, str(MAIN_PY), *args],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+        check=True,
+    )
+    return result.stdout
+
+
+def test_disabled_tracing_is_free(monkeypatch):
+    monkeypatch.setattr(trace, "ENABLED", False)
+
+    def function():
+        pass
+
+    # Nothing is wrapped, and spans are a shared no-op
+    assert trace.traced("function")(function) is function
+    assert trace.span("anything") is trace.NULL_SPAN
+
+
+def test_trace_flag(yapom_home):
+    run_main("--trace", "status")
+    records = [json.loads(line) for line in (yapom_home / trace.TRACE_FILE).open("r")]
+    spans = {record["span"] for record in records}
+    assert {"[yapom status]", "import yapom.pomodoro", "session.load"} <= spans
+    assert {record["process"] for record in records} == {"yapom status"}
+    assert all(record["ms"] >= 0 for record in records)
+
+
+def test_no_trace_file_without_tracing(yapom_home, monkeypatch):
+    monkeypatch.delenv(trace.TRACE_ENV, raising=False)
+    run_main("status")
+    assert not (yapom_home / trace.TRACE_FILE).exists()
+
+
+def test_summary(yapom_home):
+    run_main("status", env={trace.TRACE_ENV: "1"})
+    run_main("status", env={trace.TRACE_ENV: "1"})
+    output = run_main("trace", "summary")
+    load_row = next(
+        line for line in output.splitlines() if line.startswith("session.load")
+    )
+    assert load_row.split()[1] == "2"
+    assert "Traces cleared" in run_main("trace", "clear")
+    assert "No traces yet" in run_main("trace", "summary")
+
+
+def test_summarize():
+    records = [{"span": "a", "ms": ms} for ms in (1.0, 2.0, 3.0, 10.0)]
+    records.append({"span": "b", "ms": 100.0})
+    assert trace.summarize(records) == [
+        ("b", 1, 100.0, 100.0, 100.0, 100.0),
+        ("a", 4, 16.0, 2.0, 10.0, 10.0),
+    ]
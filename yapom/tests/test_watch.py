@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import queue
+import threading
+import subprocess
+
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import pytest
+
+import yapom.watch as watch
+import yapom.session as session
+
+from yapom.utils import Status
+from yapom.session import SessionState
+
+MAIN_PY = Path(__file__).parent.parent.parent / "main.py"
+
+
+class StopWatching(Exception):
+    pass
+
+
+class LineQueue:
+    """
+    Output for `watch.watch()` that hands over lines to the test (and stops the
+    watch loop on request).
+    """
+
+    def __init__(self):
+        self.lines = queue.Queue()
+        self.stopped = False
+
+    def write(self, s: str):
+        if self.stopped:
+            raise StopWatching()
+        if s.strip():
+            self.lines.put(s.strip())
+
+    def flush(self):
+        pass
+
+    def next(self, timeout: float = 2.0) -> str:
+        return self.lines.get(timeout=timeout)
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def watching(request, yapom_home):
+    output = LineQueue()
+    watcher = watch.create_watcher(yapom_home, use_inotify=request.param)
+    if request.param:
+        assert isinstance(watcher, watch.InotifyWatcher)
+    else:
+        assert isinstance(watcher, watch.PollingWatcher)
+        watcher.interval = 0.05
+
+    def run():
+        try:
+            watch.watch("{status} {remaining}", output, watcher)
+        except StopWatching:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    yield output
+    output.stopped = True
+    session.save(SessionState(start=datetime.now(), status=Status.CANCELLED))
+    thread.join(timeout=2)
+
+
+def test_render():
+    start = datetime(2025, 6, 1, 12, 0, 0)
+    state = SessionState(start=start, runtime=1500, status=Status.RUNNING)
+    now = start + timedelta(seconds=90)
+    fmt = "{status} {remaining} {elapsed} {runtime} {clock} {start}"
+    assert (
+        watch.render(fmt, state, now=now) == "running 23m30s 1m30s 25m 23:30 12:00:00"
+    )
+    assert watch.render("{status} {clock}", SessionState()) == "idle --:--"
+
+
+def test_reloads_on_change(watching):
+    assert watching.next() == "idle"
+    start = time.monotonic()
+    session.save(SessionState(start=datetime.now(), runtime=60, status=Status.RUNNING))
+    assert watching.next().startswith("running 1m")
+    assert time.monotonic() - start < 0.5
+    # ... and ticks once per second while the session is running
+    assert watching.next().startswith("running 5")
+
+
+def test_idle_cpu_usage(yapom_home):
+    process = subprocess.Popen(
+        [sys.executable, str(MAIN_PY), "watch"],
+        env={**os.environ, "YAPOM_HOME": str(yapom_home)},
+        stdout=subprocess.PIPE,
+    )
+
+    def cpu_ticks() -> int:
+        fields = Path(f"/proc/{process.pid}/stat").read_text().rsplit(")", 1)[1].split()
+        # utime + stime (fields 14 and 15 of /proc/<pid>/stat)
+        return int(fields[11]) + int(fields[12])
+
+    assert process.stdout is not None
+    try:
+        assert process.stdout.readline()
+        before = cpu_ticks()
+        time.sleep(2)
+        assert cpu_ticks() - before <= 1
+    finally:
+        process.kill()
+        process.wait()
@@ -0,0 +1,236 @@
+"""
+Named timers (`yapom start 25m --name review`) that run alongside the current session.
+
+All named timers live in one keyed store, `~/.yapom/timers.json` (name -> timer),
+and are fired by a single scheduler process (see `yapom.scheduler`) - no matter how
+many of them are running. Every change of the store happens under an exclusive lock
+(`locked()`), and the scheduler is woken up afterwards, so that it picks up new
+deadlines right away.
+"""
+
+import os
+import sys
+import json
+
+import yapom.utils as utils
+
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+from yapom.utils import Status, pomtext
+from yapom.session import SessionState
+
+TIMERS_FILE = "timers.json"
+LOCK_FILE = "timers.lock"
+DEFAULT_NAME = "default"
+
+
+class NamedTimer(SessionState):
+    """
+    A named timer: a session plus its name and its deadline (epoch seconds).
+
+    While a timer is paused, its deadline is where it was when the timer was paused -
+    i.e. the remaining time is `deadline - stop`.
+    """
+
+    __slots__ = ("name", "deadline")
+
+    def __init__(self, name: str, deadline: float | None = None, **fields):
+        super().__init__(**fields)
+        self.name = name
+        self.deadline = deadline
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NamedTimer":
+        state = SessionState.from_dict(data)
+        fields = {slot: getattr(state, slot) for slot in SessionState.__slots__}
+        return cls(name=data["name"], deadline=data.get("deadline"), **fields)
+
+    def to_dict(self) -> dict:
+        return {**super().to_dict(), "name": self.name, "deadline": self.deadline}
+
+    def remaining(self, now: datetime | None = None) -> float:
+        if self.has_ended() or self.deadline is None:
+            return 0.0
+        time_ref = self.stop or now or datetime.now()
+        return max(self.deadline - time_ref.timestamp(), 0.0)
+
+
+def get_filepath() -> Path:
+    return Path(utils.HOME_DIR).expanduser() / TIMERS_FILE
+
+
+@contextmanager
+def locked():
+    """
+    Hold the (exclusive) lock of the timer store.
+    """
+    import fcntl
+
+    with open(utils.home_dir() / LOCK_FILE, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load() -> dict[str, NamedTimer]:
+    try:
+        with get_filepath().open("r") as fp:
+            data = json.load(fp)
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        return {}
+    return {name: NamedTimer.from_dict(timer) for name, timer in data.items()}
+
+
+def save(timers: dict[str, NamedTimer]):
+    path = get_filepath()
+    tmp_path = path.with_name(f"{TIMERS_FILE}.{os.getpid()}.tmp")
+    with tmp_path.open("w") as fp:
+        json.dump({name: timer.to_dict() for name, timer in timers.items()}, fp)
+    os.replace(tmp_path, path)
+
+
+def archive(timer: NamedTimer):
+    """
+    Add an ended timer to the history (with its name).
+    """
+    import yapom.history as history
+
+    history.ensure_schema()
+    history.archive_pomodoro_session({**timer.to_dict(), "timer": timer.name})
+
+
+# --- Commands ---
+#
+# Each command changes the store under its lock and wakes up the scheduler (while
+# still holding the lock - see `scheduler.wake()`).
+
+
+def status(timer: NamedTimer) -> str:
+    if timer.status is None or timer.start is None:
+        # Timers are stored once they've started - but type checkers can't know that
+        return pomtext(f"[{timer.name}] not started")
+    runtime_fmt = utils.format_runtime(timer.runtime) or "-"
+    tags = "".join(f" #{tag}" for tag in timer.tags)
+    day_start, start_time = timer.start.strftime(utils.DATETIME_FORMAT).split()
+    if timer.end:
+        end_time = timer.end.strftime("%H:%M:%S")
+        return pomtext(
+            f"[{timer.name}] {timer.status.name} ({runtime_fmt}) (start {start_time}) (end {end_time}) [{day_start}]{tags}"
+        )
+    remaining = round(timer.remaining())
+    elapsed_str = utils.format_runtime(max(timer.runtime - remaining, 0))
+    remaining_str = utils.format_runtime(remaining)
+    return pomtext(
+        f"[{timer.name}] {timer.status.name} (total {runtime_fmt}) (elapsed {elapsed_str} | remaining {remaining_str}) (start: {start_time}) [{day_start}]{tags}"
+    )
+
+
+def start(name: str, runtime: int, tags: tuple[str, ...] = ()) -> str:
+    import yapom.scheduler as scheduler
+
+    with locked():
+        timers = load()
+        if (timer := timers.get(name)) and timer.is_in_progress():
+            return pomtext(f"Timer '{name}' is already in progress.")
+        now = datetime.now()
+        timer = NamedTimer(
+            name,
+            deadline=now.timestamp() + runtime,
+            start=now,
+            runtime=runtime,
+            status=Status.RUNNING,
+            tags=tags,
+        )
+        timers[name] = timer
+        save(timers)
+        scheduler.wake()
+    return status(timer)
+
+
+def update(name: str, command: str) -> str:
+    """
+    Run `command` (stop, resume, cancel or reset) on the timer `name`.
+    """
+    import yapom.scheduler as scheduler
+
+    with locked():
+        timers = load()
+        if (timer := timers.get(name)) is None:
+            return pomtext(f"No such timer: '{name}'")
+        if not timer.is_in_progress():
+            return utils.no_session_in_progress_message(
+                f"timer '{name}' has already ended."
+            )
+        now = datetime.now()
+        match command:
+            case "stop" | "pause" if timer.is_running():
+                timer.stop, timer.status = now, Status.STOPPED
+            case "resume" if not timer.is_running() and timer.stop is not None:
+                paused_for = (now - timer.stop).total_seconds()
+                if timer.deadline is not None:
+                    timer.deadline += paused_for
+                timer.paused += int(paused_for)
+                timer.stop, timer.status = None, Status.RUNNING
+            case "cancel":
+                if timer.stop:
+                    timer.paused += int((now - timer.stop).total_seconds())
+                timer.end, timer.status = now, Status.CANCELLED
+            case "reset" | "restart":
+                timer.start, timer.stop, timer.paused = now, None, 0
+                timer.deadline = now.timestamp() + timer.runtime
+                timer.status = Status.RUNNING
+        save(timers)
+        scheduler.wake()
+    if timer.status == Status.CANCELLED:
+        archive(timer)
+    return status(timer)
+
+
+DEFAULT_COMMANDS = {
+    "status": "status",
+    "stop": "stop",
+    "pause": "stop",
+    "resume": "resume",
+    "cancel": "cancel",
+    "reset": "reset",
+    "restart": "reset",
+}
+
+
+def main(
+    command: str, name: str | None, every: bool = False, tags: tuple[str, ...] = ()
+) -> str:
+    """
+    Run `command` for the timer `name` - or for all timers (including the current
+    session) if `every` is set.
+    """
+    if command == "start":
+        if every or not name:
+            sys.exit(pomtext("'start' needs a timer name (--name NAME)."))
+        if name != DEFAULT_NAME:
+            return start(name, utils.determine_runtime(), tags)
+    elif command not in DEFAULT_COMMANDS:
+        sys.exit(pomtext(f"'{command}' doesn't support --name / --all"))
+    if name and name != DEFAULT_NAME:
+        if command == "status":
+            timer = load().get(name)
+            return status(timer) if timer else pomtext(f"No such timer: '{name}'")
+        return update(name, command)
+
+    import yapom.pomodoro as pomodoro
+
+    # The current session is the 'default' timer
+    if command == "start":
+        return pomodoro.start(utils.determine_runtime(), tags=tags)
+    outputs = [getattr(pomodoro, DEFAULT_COMMANDS[command])()]
+    if every:
+        for timer_name, timer in sorted(load().items()):
+            if command == "status":
+                outputs.append(status(timer))
+            elif timer.is_in_progress():
+                outputs.append(update(timer_name, command))
+    return "\n".join(outputs)
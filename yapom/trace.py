@@ -0,0 +1,235 @@
+"""
+Opt-in timing of yapom's phases (imports, session file access, timer processes,
+history database, ...).
+
+Tracing is enabled by setting the environment variable `YAPOM_TRACE` (or with
+`yapom --trace COMMAND`, which sets it for the timer processes, too). Spans are
+collected in memory and appended to `~/.yapom/trace.jsonl` as JSON lines when the
+process exits; `yapom trace summary` aggregates them.
+
+When tracing is off, `traced()` returns functions unchanged and `span()` returns a
+shared no-op context manager - so instrumented code runs at (almost) full speed.
+"""
+
+import os
+import sys
+import time
+
+TRACE_ENV = "YAPOM_TRACE"
+TRACE_FILE = "trace.jsonl"
+
+ENABLED = bool(os.environ.get(TRACE_ENV))
+
+# Finished spans of this process, as dicts (see `Span.__exit__`)
+_spans: list[dict] = []
+_depth = 0
+_process_start = time.perf_counter_ns()
+# Shown in traces (e.g. 'yapom start') - defaults to the script's name
+process = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "python"
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "wall_start", "depth")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        global _depth
+        self.depth = _depth
+        _depth += 1
+        self.wall_start = time.time()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _depth
+        duration_ns = time.perf_counter_ns() - self.start
+        _depth -= 1
+        record: dict[str, object] = {
+            "span": self.name,
+            "ts": round(self.wall_start, 6),
+            "ms": round(duration_ns / 1e6, 3),
+            "depth": self.depth,
+        }
+        if self.attrs:
+            record["attrs"] = self.attrs
+        if exc_info[0] is not None:
+            record["error"] = exc_info[0].__name__
+        _spans.append(record)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name: str, **attrs) -> Span | NullSpan:
+    """
+    Context manager that records how long its body takes (if tracing is enabled).
+    """
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(name, attrs)
+
+
+def traced(name: str):
+    """
+    Decorator that records a span for every call of the decorated function.
+
+    Whether tracing is enabled is checked once, when the function is decorated.
+    """
+
+    def decorate(function):
+        if not ENABLED:
+            return function
+        from functools import wraps
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(name, {}):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def enable():
+    """
+    Turn tracing on for this process and all processes started from it.
+
+    Only affects functions decorated (i.e. modules imported) afterwards.
+    """
+    global ENABLED
+    if not ENABLED:
+        ENABLED = True
+        os.environ[TRACE_ENV] = "1"
+        _register()
+
+
+def get_trace_path():
+    import yapom.utils as utils
+
+    return utils.home_dir() / TRACE_FILE
+
+
+def flush():
+    """
+    Append the spans recorded so far to the trace file.
+
+    Called automatically when the process exits; long-running processes (yapomd)
+    call it after every request.
+    """
+    import json
+
+    if not _spans:
+        return
+    info = {"pid": os.getpid(), "process": process}
+    lines = "".join(json.dumps({**info, **record}) + "\n" for record in _spans)
+    _spans.clear()
+    # A single append per process: lines of concurrent processes don't interleave
+    with open(get_trace_path(), "a") as fp:
+        fp.write(lines)
+
+
+def _finish_process():
+    _spans.append(
+        {
+            "span": f"[{process}]",
+            "ts": round(time.time(), 6),
+            "ms": round((time.perf_counter_ns() - _process_start) / 1e6, 3),
+            "depth": 0,
+        }
+    )
+    flush()
+
+
+def _register():
+    import atexit
+
+    atexit.register(_finish_process)
+
+
+if ENABLED:
+    _register()
+
+
+# --- yapom trace summary ---
+
+
+def load(path=None) -> list[dict]:
+    import json
+
+    path = path or get_trace_path()
+    records = []
+    try:
+        with open(path) as fp:
+            for line in fp:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Cut off (e.g. the disk was full) - skip it
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def summarize(records: list[dict]) -> list[tuple[str, int, float, float, float, float]]:
+    """
+    Aggregate spans by name. Whole processes show up as '[<process>]'.
+
+    Returns tuples (span name, count, total ms, median ms, p95 ms, max ms), sorted by
+    total time (descending).
+    """
+    durations: dict[str, list[float]] = {}
+    for record in records:
+        durations.setdefault(record["span"], []).append(record["ms"])
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        p50 = values[(len(values) - 1) // 2]
+        p95 = values[max(-(-len(values) * 95 // 100), 1) - 1]
+        rows.append((name, len(values), sum(values), p50, p95, values[-1]))
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def format_summary(rows) -> str:
+    lines = [
+        f"{'span':<32} {'count':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'max':>8}"
+    ]
+    for name, count, total, p50, p95, maximum in rows:
+        lines.append(
+            f"{name:<32} {count:>7} {total:>10.2f} {p50:>8.2f} {p95:>8.2f} {maximum:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(args: list[str]) -> str:
+    import yapom.utils as utils
+
+    match args:
+        case [] | ["summary"]:
+            if not (records := load()):
+                return utils.pomtext(
+                    f"No traces yet - set {TRACE_ENV}=1 or use 'yapom --trace COMMAND'."
+                )
+            return format_summary(summarize(records))
+        case ["summary", "--process", name]:
+            records = [r for r in load() if r.get("process") == name]
+            return format_summary(summarize(records))
+        case ["clear"]:
+            get_trace_path().unlink(missing_ok=True)
+            return utils.pomtext("Traces cleared.")
+    sys.exit(utils.pomtext(f"Unknown trace command: '{' '.join(args)}'"))
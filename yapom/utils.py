@@ -1,18 +1,14 @@
-import re
+import os
 import sys
-import shutil
-import subprocess
-
-import tkinter as tk
+import yapom.trace as trace
 
 from enum import Enum
 from pathlib import Path
 
 
-BG_DARK = "#2e2e2e"
 TOMATO = "\U0001f345"
 NOTIFY_TOOL = "notify-send"
-HOME_DIR = "~/.yapom"
+HOME_DIR = os.environ.get("YAPOM_HOME", "~/.yapom")
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 DEFAULT_RUNTIME = "25m"
 
@@ -24,10 +20,15 @@ class Status(Enum):
     FINISHED = "finished"
 
 
+# Compact (integer) representation of `Status` for binary and database storage
+STATUS_CODES = {status: code for code, status in enumerate(Status, start=1)}
+
+
 def pomtext(text: str) -> str:
     return f"( {TOMATO} ) {text}"
 
 
+@trace.traced("utils.home_dir")
 def home_dir() -> Path:
     if not (home_dir_path := Path(HOME_DIR).expanduser().absolute()).exists():
         home_dir_path.mkdir()
@@ -49,6 +50,8 @@ def no_session_in_progress_message(text: str) -> str:
 
 
 def is_installed(name: str) -> bool:
+    import shutil
+
     return any(shutil.which(name) or "")
 
 
@@ -87,6 +90,8 @@ def runtime_from_string(s: str) -> int:
         return int(s)
     except ValueError:
         pass
+    import re
+
     result = 0
     regex = re.compile(r"(\d+h)?(\d+m)?(\d+s)?")
     if match := regex.match(s.strip()):
@@ -102,107 +107,137 @@ def runtime_from_string(s: str) -> int:
     return result
 
 
+# Phases of a cycle plan (see `phases_from_string()`)
+WORK = "work"
+SHORT_BREAK = "short break"
+LONG_BREAK = "long break"
+
+
+def phases_from_string(s: str) -> list[tuple[str, int]]:
+    """
+    Convert a cycle plan string of the form [<N>x]<WORK>[/<SHORT>[/<LONG>]] - each
+    part a runtime as accepted by `runtime_from_string()` - into a list of phases
+    (kind, runtime in seconds).
+
+    Example: "4x25m/5m/15m" = four 25 minute work phases with 5 minute (short)
+    breaks in between and a 15 minute (long) break at the end - 8 phases in total.
+    """
+    count_str, separator, intervals = s.strip().lower().partition("x")
+    if not separator:
+        count_str, intervals = "1", count_str
+    parts = intervals.split("/")
+    if not count_str.isdigit() or int(count_str) < 1 or len(parts) > 3:
+        raise ValueError(
+            f"Invalid plan (expected [N]x<WORK>[/<SHORT>[/<LONG>]]): '{s}'"
+        )
+    runtimes = [runtime_from_string(part) for part in parts]
+    if not all(runtime > 0 for runtime in runtimes):
+        raise ValueError(f"Invalid runtime in plan: '{s}'")
+    work, short_break, long_break = runtimes + [0] * (3 - len(runtimes))
+    count = int(count_str)
+    phases = []
+    for number in range(1, count + 1):
+        phases.append((WORK, work))
+        if number < count and short_break:
+            phases.append((SHORT_BREAK, short_break))
+    if long_break:
+        phases.append((LONG_BREAK, long_break))
+    return phases
+
+
 def time_elapsed_remaining_message(elapsed: int, remaining: int) -> str:
     elapsed_formatted = format_runtime(elapsed)
     remaining_formatted = format_runtime(remaining)
     return f"time elapsed: {elapsed_formatted}, time remaining: {remaining_formatted}"
 
 
-def determine_runtime():
-    try:
-        return runtime_from_string(sys.argv[2].strip())
-    except IndexError:
-        return runtime_from_string(DEFAULT_RUNTIME)
+def get_option(args: list[str], name: str, default: str | None = None) -> str | None:
+    """
+    Return the value of command line option `name` (e.g. `--since`) from `args`.
 
+    Both `--name value` and `--name=value` are supported.
+    """
+    for i, arg in enumerate(args):
+        if arg == name:
+            if i + 1 >= len(args):
+                raise ValueError(f"Missing value for option '{name}'")
+            return args[i + 1]
+        if arg.startswith(f"{name}="):
+            return arg.removeprefix(f"{name}=")
+    return default
 
-class TclNotFoundError(RuntimeError):
-    def __init__(self):
-        super().__init__(
-            "Could not find 'tclsh' - Tcl might not be installed properly."
-        )
+
+def pop_option(args: list[str], name: str) -> str | None:
+    """
+    Remove command line option `name` (and its value) from `args` and return its
+    value (see `get_option()`).
+    """
+    for i, arg in enumerate(args):
+        if arg == name:
+            if i + 1 >= len(args):
+                raise ValueError(f"Missing value for option '{name}'")
+            value = args[i + 1]
+            del args[i : i + 2]
+            return value
+        if arg.startswith(f"{name}="):
+            del args[i]
+            return arg.removeprefix(f"{name}=")
+    return None
+
+
+def pop_options(args: list[str], name: str) -> list[str]:
+    """
+    Remove all occurrences of command line option `name` (e.g. `--tag a --tag b`)
+    from `args` and return their values.
+    """
+    values = []
+    while (value := pop_option(args, name)) is not None:
+        values.append(value)
+    return values
 
 
-def notify_user(message: str):
-    if not is_tcl_installed():
-        raise TclNotFoundError()
+def pop_flag(args: list[str], name: str) -> bool:
+    """
+    Remove command line flag `name` from `args` and return whether it was there.
+    """
+    if name in args:
+        args.remove(name)
+        return True
+    return False
+
+
+def parse_date(s: str):
+    """
+    Parse a date (YYYY-MM-DD) or date and time (see `DATETIME_FORMAT`) string into
+    a `datetime`.
+    """
+    from datetime import datetime
 
-    root = None
     try:
-        # TODO Fails when used from within a virtual environment
-        root = tk.Tk()
-        # Hide the main window
-        root.withdraw()
-
-        # Create a custom dialog window
-        dialog = tk.Toplevel(root)
-        dialog.title("Pomodoro Notification")
-        dialog.resizable(False, False)
-        dialog.geometry("300x150")
-        dialog.configure(bg=BG_DARK)  # Dark background
-
-        try:
-            # Emojione - tomato Emoji - U+1F345
-            # Source: https://commons.wikimedia.org/wiki/File:Emojione_1F345.svg
-            image_path = (
-                Path(__file__).parent / "resources/icons/Emojione_1F345_32px.svg.png"
-            )
-            icon = tk.PhotoImage(file=image_path).subsample(2, 2)
-            dialog.iconphoto(False, icon)
-            message_label = tk.Label(
-                dialog,
-                text=message,
-                fg="white",
-                bg=BG_DARK,
-                padx=5,
-                wraplength=280,
-                image=icon,
-                compound="left",
-            )
-        except Exception as e:
-            print(pomtext(f"Failed to load Pomodoro icon: {e}"))
-            message_label = tk.Label(
-                dialog, text=message, fg="white", bg=BG_DARK, wraplength=280
-            )
-
-        # Message label
-        message_label.pack(pady=20)
-
-        # OK button
-        ok_button = tk.Button(
-            dialog, text="OK", command=dialog.destroy, bg="#444444", fg="white"
-        )
-        ok_button.pack()
+        return datetime.strptime(s, DATETIME_FORMAT)
+    except ValueError:
+        return datetime.strptime(s, "%Y-%m-%d")
 
-        dialog.mainloop()
-        root.destroy()
-    finally:
-        if root:
-            # Ensure that Tk 'root' is destroyed "no matter what"
-            root.destroy()
 
+# Units of `parse_age()` in days
+AGE_UNITS = {"d": 1, "w": 7, "y": 365}
 
-def notify_send(message: str):
-    if not is_notify_send_installed():
-        raise RuntimeError(
-            f"{NOTIFY_TOOL} not found. Please make sure libnotify-bin is installed."
-        )
-    subprocess.run([NOTIFY_TOOL, pomtext(message)], check=True)
+
+def parse_age(s: str):
+    """
+    Parse an age of the form <N>d, <N>w or <N>y (days, weeks, years) into a
+    `timedelta`.
+    """
+    from datetime import timedelta
+
+    number, unit = s[:-1], s[-1:]
+    if not number.isdigit() or unit not in AGE_UNITS:
+        raise ValueError(f"Invalid age (expected e.g. 30d, 8w or 1y): '{s}'")
+    return timedelta(days=int(number) * AGE_UNITS[unit])
 
 
-def notify_session_finished():
-    message = "Pomodoro session finished!"
+def determine_runtime():
     try:
-        notify_user(message)
-    except TclNotFoundError:
-        print(
-            pomtext(
-                "Please ensure (Python) Tcl was installed properly: https://tkdocs.com/tutorial/install.html"
-            )
-        )
-    except Exception as ex:
-        print(pomtext(f"[WARNING] Tcl notification failed: {ex}"))
-        print(pomtext(f"[WARNING] Now trying 'notify-send' ..."))
-        try:
-            notify_send(message)
-        except Exception as ex:
-            sys.exit(pomtext(str(ex)))
+        return runtime_from_string(sys.argv[2].strip())
+    except IndexError:
+        return runtime_from_string(DEFAULT_RUNTIME)
@@ -0,0 +1,206 @@
+"""
+`yapom watch` - a live countdown for status bars (i3blocks, waybar, tmux, ...).
+
+Prints one line per second while a session is running. The session is loaded once
+and the countdown is computed from memory; the session file is only read again when
+it changes (i.e. when another `yapom` command or the timer itself updated it).
+
+Changes are detected with inotify where available and by polling the session files'
+modification times otherwise. While no session is running, `watch` just waits for
+the next change - without using any CPU (with inotify, that is).
+"""
+
+import os
+import sys
+import time
+import select
+
+import yapom.utils as utils
+import yapom.record as record
+import yapom.journal as journal
+import yapom.session as session
+
+from pathlib import Path
+from datetime import datetime
+
+DEFAULT_FORMAT = "{tomato} {status} {remaining}"
+POLL_INTERVAL = 1.0
+
+# Files that make up the session state (see `yapom.session`, `yapom.journal` and
+# `yapom.record`)
+WATCHED_FILES = {session.SESSION_FILE, journal.JOURNAL_FILE, record.RECORD_FILE}
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+# Not IN_CREATE / IN_MODIFY: files would be read before they're completely written
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE
+EVENT_HEADER_SIZE = 16  # struct inotify_event without `name`
+
+
+class InotifyWatcher:
+    """
+    Wait for changes to the session files in `directory` using inotify.
+    """
+
+    def __init__(self, directory: Path):
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify isn't available")
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # The directory is watched (rather than the files), because session records
+        # are replaced by renaming a new file over the old one.
+        if libc.inotify_add_watch(self.fd, bytes(directory), WATCH_MASK) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"Can't watch {directory}")
+
+    def wait(self, timeout: float | None) -> bool:
+        """
+        Wait until a session file changes or `timeout` (seconds) expires.
+
+        Returns `True` if a session file changed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = (
+                None if deadline is None else max(deadline - time.monotonic(), 0)
+            )
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                return False
+            # Other files in yapom's HOME (e.g. the history database) are ignored
+            if WATCHED_FILES & set(self.read_events()):
+                return True
+
+    def read_events(self) -> list[str]:
+        import struct
+
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names, offset = [], 0
+        while offset < len(buffer):
+            _, _, _, length = struct.unpack_from("iIII", buffer, offset)
+            name = buffer[
+                offset + EVENT_HEADER_SIZE : offset + EVENT_HEADER_SIZE + length
+            ]
+            names.append(name.rstrip(b"\0").decode(errors="replace"))
+            offset += EVENT_HEADER_SIZE + length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Wait for changes to the session files in `directory` by polling their
+    modification times (fallback for systems without inotify).
+    """
+
+    def __init__(self, directory: Path, interval: float = POLL_INTERVAL):
+        self.paths = [directory / name for name in sorted(WATCHED_FILES)]
+        self.interval = interval
+        self.snapshot = self.stat()
+
+    def stat(self) -> list[tuple[int, int] | None]:
+        def file_stat(path: Path) -> tuple[int, int] | None:
+            try:
+                stat = path.stat()
+                return stat.st_mtime_ns, stat.st_ino
+            except FileNotFoundError:
+                return None
+
+        return [file_stat(path) for path in self.paths]
+
+    def wait(self, timeout: float | None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if (snapshot := self.stat()) != self.snapshot:
+                self.snapshot = snapshot
+                return True
+            if deadline is None:
+                time.sleep(self.interval)
+            elif (remaining := deadline - time.monotonic()) > 0:
+                time.sleep(min(self.interval, remaining))
+            else:
+                return False
+
+    def close(self):
+        pass
+
+
+def create_watcher(directory: Path, use_inotify: bool = True):
+    if use_inotify:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory)
+
+
+def render(fmt: str, state: session.SessionState, now: datetime | None = None) -> str:
+    """
+    Render a status line. Available fields: `{status}`, `{remaining}`, `{elapsed}`,
+    `{runtime}`, `{clock}` (remaining time as MM:SS), `{start}` and `{tomato}`.
+    """
+    # I.e. `if not state:` - spelled out, so that type checkers know start is set
+    if state.status is None or state.start is None:
+        fields = dict(status="idle", remaining="", elapsed="", runtime="", start="")
+        return fmt.format(tomato=utils.TOMATO, clock="--:--", **fields)
+    elapsed, remaining = session.get_runtimes(state, now=now)
+    remaining = max(remaining, 0)
+    minutes, seconds = divmod(remaining, 60)
+    return fmt.format(
+        tomato=utils.TOMATO,
+        status=state.status.value,
+        remaining=utils.format_runtime(remaining) or "0s",
+        elapsed=utils.format_runtime(elapsed) or "0s",
+        runtime=utils.format_runtime(state.runtime),
+        clock=f"{minutes:02d}:{seconds:02d}",
+        start=state.start.strftime("%H:%M:%S"),
+    )
+
+
+def watch(fmt: str = DEFAULT_FORMAT, output=sys.stdout, watcher=None):
+    """
+    Print a status line for the current session once per second (while a session is
+    running) and whenever the session changes.
+    """
+    watcher = watcher or create_watcher(utils.home_dir())
+    state = session.load()
+    last_line = None
+    try:
+        while True:
+            if (line := render(fmt, state)) != last_line or state.is_running():
+                output.write(line + "\n")
+                output.flush()
+                last_line = line
+            # Tick on whole seconds while the countdown is running, otherwise sleep
+            # until something happens
+            timeout = 1.0 - (time.time() % 1.0) if state.is_running() else None
+            if watcher.wait(timeout):
+                state = session.load()
+    finally:
+        watcher.close()
+
+
+def main(args: list[str]):
+    """
+    `yapom watch [--format FORMAT]`
+    """
+    try:
+        fmt = utils.get_option(args, "--format") or DEFAULT_FORMAT
+        render(fmt, session.SessionState())
+    except (ValueError, KeyError, IndexError) as ex:
+        sys.exit(utils.pomtext(f"Invalid format: {ex}"))
+    try:
+        watch(fmt)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
@@ -0,0 +1,5 @@
+import yapom.daemon as daemon
+
+
+if __name__ == "__main__":
+    daemon.run()